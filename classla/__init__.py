@@ -1,4 +1,5 @@
 from classla.pipeline.core import Pipeline
+from classla.pipeline.async_pipeline import AsyncPipeline
 from classla.models.common.doc import Document
 from classla.resources.common import download
 from classla.resources.installation import install_corenlp, download_corenlp_models
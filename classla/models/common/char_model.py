@@ -1,3 +1,6 @@
+import sys
+from collections import OrderedDict
+
 import torch
 import torch.nn as nn
 from torch.nn.utils.rnn import pack_sequence, pad_packed_sequence, pack_padded_sequence, PackedSequence
@@ -29,8 +32,74 @@ class CharacterModel(nn.Module):
         self.charlstm_c_init = nn.Parameter(torch.zeros(self.num_dir * self.args['char_num_layers'], 1, self.args['char_hidden_dim']))
 
         self.dropout = nn.Dropout(args['dropout'])
+        # optional cache of the representations of word types, see enable_cache
+        self._cache = None
+
+    def enable_cache(self, max_entries=None, max_mb=None):
+        """
+        Keep the representations of word types across batches in a LRU cache of at most max_entries types and/or
+        max_mb megabytes.  The cache is only used for batches of distinct word types (see forward) in evaluation mode.
+        """
+        if not max_entries and not max_mb:
+            raise ValueError("The size of the character representation cache must be given in entries or megabytes")
+        self._cache = OrderedDict()
+        self._cache_max_entries = max_entries
+        self._cache_max_bytes = max_mb * 2 ** 20 if max_mb else None
+        self.clear_cache()
+
+    def disable_cache(self):
+        self._cache = None
+
+    def clear_cache(self):
+        """ Drop the cached representations and reset the statistics. """
+        if self._cache is not None:
+            self._cache.clear()
+        self._cache_bytes = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    def cache_stats(self):
+        """ Return the number of cached types, their approximate size in megabytes, and the hits and misses, or None. """
+        if self._cache is None:
+            return None
+        lookups = self._cache_hits + self._cache_misses
+        return {'entries': len(self._cache), 'size_mb': self._cache_bytes / 2 ** 20, 'hits': self._cache_hits,
+                'misses': self._cache_misses, 'hit_rate': self._cache_hits / lookups if lookups else 0.0}
+
+    def train(self, mode=True):
+        # the cached representations are stale once the weights are trained
+        if mode and self._cache is not None:
+            self.clear_cache()
+        return super().train(mode)
+
+    def _load_from_state_dict(self, *args, **kwargs):
+        if self._cache is not None:
+            self.clear_cache()
+        super()._load_from_state_dict(*args, **kwargs)
+
+    def forward(self, chars, chars_mask, word_orig_idx, sentlens, wordlens, word_type_idx=None):
+        """
+        If word_type_idx is given, chars holds the distinct word types of the batch (see sort_word_types) and
+        word_type_idx the type of every word, so each type is encoded once and its representation copied to its words.
+        """
+        if word_type_idx is not None and self._cache is not None and not self.training:
+            res = self.encode_cached(chars, wordlens)
+        else:
+            res = self.encode(chars, wordlens)
+
+        # recover character order and word separation
+        if word_type_idx is not None:
+            res = res[word_type_idx]
+        else:
+            res = tensor_unsort(res, word_orig_idx)
+        res = pack_sequence(res.split(sentlens))
+        if self.pad:
+            res = pad_packed_sequence(res, batch_first=True)[0]
 
-    def forward(self, chars, chars_mask, word_orig_idx, sentlens, wordlens):
+        return res
+
+    def encode(self, chars, wordlens):
+        """ Encode words sorted by descending length, one representation per row of chars. """
         embs = self.dropout(self.char_emb(chars))
         batch_size = embs.size(0)
         embs = pack_padded_sequence(embs, wordlens, batch_first=True)
@@ -48,15 +117,39 @@ class CharacterModel(nn.Module):
         else:
             h, c = output[1]
             res = h[-2:].transpose(0,1).contiguous().view(batch_size, -1)
-
-        # recover character order and word separation
-        res = tensor_unsort(res, word_orig_idx)
-        res = pack_sequence(res.split(sentlens))
-        if self.pad:
-            res = pad_packed_sequence(res, batch_first=True)[0]
-
         return res
 
+    def encode_cached(self, chars, wordlens):
+        """ Like encode, but look up the distinct words in the cache and encode only the missing ones. """
+        keys = [tuple(row[:n]) for row, n in zip(chars.tolist(), wordlens)]
+        reps = [None] * len(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            rep = self._cache.get(key)
+            if rep is None:
+                missing.append(i)
+            else:
+                self._cache.move_to_end(key)
+                reps[i] = rep
+        self._cache_hits += len(keys) - len(missing)
+        self._cache_misses += len(missing)
+
+        if missing:
+            # the missing words keep the order by descending length
+            encoded = self.encode(chars[missing], [wordlens[i] for i in missing])
+            for i, rep in zip(missing, encoded):
+                reps[i] = rep
+                self._cache_put(keys[i], rep.clone())
+        return torch.stack(reps)
+
+    def _cache_put(self, key, rep):
+        self._cache[key] = rep
+        self._cache_bytes += rep.nelement() * rep.element_size() + sys.getsizeof(key)
+        while self._cache and ((self._cache_max_entries and len(self._cache) > self._cache_max_entries) or
+                               (self._cache_max_bytes and self._cache_bytes > self._cache_max_bytes)):
+            old_key, old_rep = self._cache.popitem(last=False)
+            self._cache_bytes -= old_rep.nelement() * old_rep.element_size() + sys.getsizeof(old_key)
+
 class CharacterLanguageModel(nn.Module):
 
     def __init__(self, args, vocab, pad=False, is_forward_lm=True):
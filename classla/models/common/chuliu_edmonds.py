@@ -45,6 +45,42 @@ def tarjan(tree):
             strong_connect(i)
     return cycles
 
+def find_cycles(tree):
+    """
+    Find the cycles of a tree given as an array of heads, as boolean masks in the same order as tarjan.
+
+    Every node has exactly one head, so the cycles can be found by following the heads from each node, which takes
+    linear time and no recursion.  Tarjan's algorithm finds each cycle when it reaches the smallest node of the cycle,
+    so the cycles are ordered by their smallest node.
+    """
+    heads = tree.tolist()
+    # the walk in which each node was first visited, 0 for unvisited nodes
+    visited = [0] * len(heads)
+    cycles = []
+    for start in range(len(heads)):
+        if visited[start]:
+            continue
+        walk = start + 1
+        i = start
+        while not visited[i]:
+            visited[i] = walk
+            i = heads[i]
+        if visited[i] == walk and heads[i] != i:
+            # the walk ran into itself at i, which is on a new cycle (self loops are not cycles)
+            cycle = [i]
+            j = heads[i]
+            while j != i:
+                cycle.append(j)
+                j = heads[j]
+            cycles.append(cycle)
+    cycles.sort(key=min)
+    masks = []
+    for cycle in cycles:
+        mask = np.zeros(len(heads), dtype=bool)
+        mask[cycle] = True
+        masks.append(mask)
+    return masks
+
 def process_cycle(tree, cycle, scores):
     """
     Build a subproblem with one cycle broken
@@ -65,18 +101,17 @@ def process_cycle(tree, cycle, scores):
     #print(cycle_locs, noncycle_locs)
 
     # scores of cycle's potential heads; (c x n) - (c) + () -> (n x c) in R
-    metanode_head_scores = scores[cycle][:,noncycle] - cycle_scores[:,None] + cycle_score
+    metanode_head_scores = scores[np.ix_(cycle_locs, noncycle_locs)] - cycle_scores[:,None] + cycle_score
     # scores of cycle's potential dependents; (n x c) in R
-    metanode_dep_scores = scores[noncycle][:,cycle]
+    metanode_dep_scores = scores[np.ix_(noncycle_locs, cycle_locs)]
     # best noncycle head for each cycle dependent; (n) in c
     metanode_heads = np.argmax(metanode_head_scores, axis=0)
     # best cycle head for each noncycle dependent; (n) in c
     metanode_deps = np.argmax(metanode_dep_scores, axis=1)
 
-    # scores of noncycle graph; (n x n) in R
-    subscores = scores[noncycle][:,noncycle]
-    # pad to contracted graph; (n+1 x n+1) in R
-    subscores = np.pad(subscores, ( (0,1) , (0,1) ), 'constant')
+    # scores of noncycle graph, padded to the contracted graph; (n+1 x n+1) in R
+    subscores = np.zeros((len(noncycle_locs) + 1, len(noncycle_locs) + 1), dtype=scores.dtype)
+    subscores[:-1, :-1] = scores[np.ix_(noncycle_locs, noncycle_locs)]
     # set the contracted graph scores of cycle's potential heads; (c x n)[:, (n) in n] in R -> (n) in R
     subscores[-1, :-1] = metanode_head_scores[metanode_heads, np.arange(len(noncycle_locs))]
     # set the contracted graph scores of cycle's potential dependents; (n x c)[(n) in n] in R-> (n) in R
@@ -131,7 +166,10 @@ def chuliu_edmonds(scores):
 
     prepare_scores(scores)
     tree = np.argmax(scores, axis=1)
-    cycles = tarjan(tree)
+    cycles = find_cycles(tree)
+    if not cycles:
+        # the greedy heads already form a tree
+        return tree
 
     #print(scores)
     #print(cycles)
@@ -156,7 +194,7 @@ def chuliu_edmonds(scores):
         scores = subscores
         prepare_scores(scores)
         tree = np.argmax(scores, axis=1)
-        cycles = tarjan(tree)
+        cycles = find_cycles(tree)
 
     while len(subtree_stack) > 0:
         contracted_tree = tree
@@ -201,4 +239,10 @@ def chuliu_edmonds_one_root(scores):
             f.write('{}: {}, {}\n'.format(tree, scores, roots_to_try))
             f.write('{}: {}, {}, {}\n'.format(_tree, _scores, tree_probs, tree_score))
         raise
-    return best_tree
\ No newline at end of file
+    return best_tree
+
+def decode_tree(scores, multi_root=False):
+    """ Decode the heads of the words of a sentence from its scores, without the attachment of the root symbol. """
+    if multi_root:
+        return chuliu_edmonds(scores)[1:]
+    return chuliu_edmonds_one_root(scores)[1:]
@@ -37,3 +37,17 @@ def sort_all(batch, lens):
     unsorted_all = [lens] + [range(len(lens))] + list(batch)
     sorted_all = [list(t) for t in zip(*sorted(zip(*unsorted_all), reverse=True))]
     return sorted_all[2:], sorted_all[1]
+
+def sort_word_types(words):
+    """
+    Deduplicate a batch of words given as lists of char ids for the char-RNN.  Returns the distinct word types sorted
+    by descending length and, for every word, the index of its type among them.
+    """
+    type_ids = {}
+    word_type_idx = [type_ids.setdefault(tuple(w), len(type_ids)) for w in words]
+    types = list(type_ids)
+    order = sorted(range(len(types)), key=lambda i: len(types[i]), reverse=True)
+    rank = [0] * len(types)
+    for position, i in enumerate(order):
+        rank[i] = position
+    return [list(types[i]) for i in order], [rank[i] for i in word_type_idx]
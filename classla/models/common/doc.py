@@ -502,6 +502,22 @@ class Sentence(StanzaObject):
                 assert(word.head == head.id)
             self.dependencies.append((head, word.deprel, word))
 
+    def set_dependencies(self, dependencies):
+        """ Set the heads and dependency relations of the words from a list of (head, deprel) pairs, and build the
+        dependency graph at the same time. The heads are expected to be ints.
+        """
+        assert len(dependencies) == len(self.words), "Dependencies must have the same length as the words of the sentence."
+        self.dependencies = []
+        for word, (head, deprel) in zip(self.words, dependencies):
+            word._head = head
+            word._deprel = deprel
+            if head == 0:
+                # make a word for the ROOT
+                head_word = Word({ID: 0, TEXT: "ROOT"})
+            else:
+                head_word = self.words[head - 1]
+            self.dependencies.append((head_word, deprel, word))
+
     def print_dependencies(self, file=None):
         """ Print the dependencies for this sentence. """
         for dep_edge in self.dependencies:
@@ -1,8 +1,11 @@
 """
 Supports for pretrained data.
 """
+import json
 import os
 import re
+import sys
+import threading
 
 import lzma
 import logging
@@ -42,6 +45,13 @@ class Pretrain:
         return self._emb
 
     def load(self):
+        if self.filename is not None and mmap_exists(self.filename):
+            try:
+                return load_mmap(self.filename)
+            except (KeyboardInterrupt, SystemExit):
+                raise
+            except BaseException as e:
+                logger.warning("Memory-mapped pretrain exists but cannot be loaded from {}, due to the following exception:\n\t{}".format(self.filename, e))
         if self.filename is not None and os.path.exists(self.filename):
             try:
                 data = torch.load(self.filename, lambda storage, loc: storage, weights_only=False)
@@ -124,6 +134,122 @@ class Pretrain:
         return words, emb, failed
 
 
+MMAP_EMB_SUFFIX = '.npy'
+MMAP_VOCAB_SUFFIX = '.vocab'
+
+def mmap_filenames(filename):
+    """
+    Return the names of the embedding matrix and vocab files of the memory-mapped format for a pretrain file,
+    e.g. sl.pretrain.npy and sl.pretrain.vocab for sl.pretrain.pt
+    """
+    base = filename[:-3] if filename.endswith('.pt') else filename
+    return base + MMAP_EMB_SUFFIX, base + MMAP_VOCAB_SUFFIX
+
+def mmap_exists(filename):
+    return all(os.path.exists(f) for f in mmap_filenames(filename))
+
+def save_mmap(filename, vocab, emb, dtype=np.float32):
+    """
+    Save a pretrain in the memory-mapped format: a raw .npy matrix plus a vocab file, which holds a json header with the
+    vocab settings on its first line followed by one word per line in id order.
+    """
+    emb_file, vocab_file = mmap_filenames(filename)
+    for unit in vocab._id2unit:
+        if '\n' in unit:
+            raise ValueError("Cannot save word {} containing a newline to the vocab file {}".format(repr(unit), vocab_file))
+    header = {attr: getattr(vocab, attr) for attr in ('lang', 'idx', 'cutoff', 'lower')}
+    with open(vocab_file, 'w', encoding='utf-8', newline='') as fout:
+        fout.write(json.dumps(header))
+        fout.write('\n')
+        fout.write('\n'.join(vocab._id2unit))
+    np.save(emb_file, np.ascontiguousarray(emb, dtype=dtype))
+
+def load_mmap(filename):
+    """
+    Load a pretrain saved with save_mmap.  A float32 matrix is memory-mapped copy-on-write, so the OS page cache is shared
+    by all processes using the file and only the rows that are looked up are read from disk.  A float16 matrix is
+    converted to float32 in memory, as the models expect float32 embeddings.
+    """
+    emb_file, vocab_file = mmap_filenames(filename)
+    with open(vocab_file, encoding='utf-8', newline='') as fin:
+        header, units = fin.read().split('\n', 1)
+    state = json.loads(header)
+    state['_id2unit'] = units.split('\n')
+    state['_unit2id'] = {w: i for i, w in enumerate(state['_id2unit'])}
+    vocab = PretrainedWordVocab.load_state_dict(state)
+    emb = np.load(emb_file, mmap_mode='c')
+    if emb.dtype != np.float32:
+        emb = emb.astype(np.float32)
+    if emb.shape[0] != len(vocab):
+        raise ValueError("Memory-mapped pretrain {} has {} vectors for {} words".format(emb_file, emb.shape[0], len(vocab)))
+    logger.debug("Loaded memory-mapped pretrain from {}".format(emb_file))
+    return vocab, emb
+
+def convert_to_mmap(filename, dtype=np.float32):
+    """ Convert a .pt pretrain file to the memory-mapped format, saved next to it. Returns the new file names. """
+    data = torch.load(filename, lambda storage, loc: storage, weights_only=False)
+    vocab = PretrainedWordVocab.load_state_dict(data['vocab'])
+    save_mmap(filename, vocab, data['emb'], dtype=dtype)
+    return mmap_filenames(filename)
+
+
+# process-wide registry of shared pretrains, keyed by resolved path and modification time
+_shared_pretrains = {}
+_shared_pretrain_requests = {}
+_shared_pretrains_lock = threading.Lock()
+
+def _pretrain_key(filename):
+    path = os.path.realpath(filename)
+    mtimes = [os.path.getmtime(f) for f in (path,) + mmap_filenames(path) if os.path.exists(f)]
+    return path, max(mtimes) if mtimes else None
+
+def load_shared_pretrain(filename):
+    """
+    Return the Pretrain for filename that is shared by all processors and pipelines of this process.
+    The same file is loaded only once; the shared instance must be treated as read-only.
+    """
+    key = _pretrain_key(filename)
+    with _shared_pretrains_lock:
+        if key not in _shared_pretrains:
+            # drop instances of an older version of the same file
+            for stale_key in [k for k in _shared_pretrains if k[0] == key[0]]:
+                del _shared_pretrains[stale_key]
+                del _shared_pretrain_requests[stale_key]
+            _shared_pretrains[key] = Pretrain(filename)
+            _shared_pretrain_requests[key] = 0
+        _shared_pretrain_requests[key] += 1
+        return _shared_pretrains[key]
+
+def clear_shared_pretrains():
+    """ Forget all shared pretrains, so that they are loaded again on the next request. """
+    with _shared_pretrains_lock:
+        _shared_pretrains.clear()
+        _shared_pretrain_requests.clear()
+
+def _pretrain_size(pretrain):
+    """ Approximate memory of a loaded pretrain in bytes, zero if it is not loaded yet. """
+    if not hasattr(pretrain, '_emb'):
+        return 0
+    size = pretrain._emb.nbytes
+    vocab = pretrain._vocab
+    size += sys.getsizeof(vocab._id2unit) + sys.getsizeof(vocab._unit2id)
+    size += sum(sys.getsizeof(unit) for unit in vocab._id2unit)
+    return size
+
+def shared_pretrain_report():
+    """
+    Report the shared pretrains as a list of dicts with the file, the number of requests for it, its approximate size
+    in bytes and the memory saved by sharing it, i.e. the size of the copies the additional requests would have loaded.
+    """
+    with _shared_pretrains_lock:
+        items = [(key, _shared_pretrains[key], _shared_pretrain_requests[key]) for key in _shared_pretrains]
+    report = []
+    for (path, _), pretrain, requests in items:
+        size = _pretrain_size(pretrain)
+        report.append({'file': path, 'requests': requests, 'size': size, 'saved': size * (requests - 1)})
+    return report
+
+
 if __name__ == '__main__':
     with open('test.tmp', 'w') as fout:
         fout.write('3 2\na 1 1\nb -1 -1\nc 0 0\n')
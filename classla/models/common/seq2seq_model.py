@@ -11,7 +11,6 @@ import numpy as np
 import classla.models.common.seq2seq_constant as constant
 from classla.models.common import utils
 from classla.models.common.seq2seq_modules import LSTMAttention
-from classla.models.common.beam import Beam
 
 logger = logging.getLogger('classla')
 
@@ -122,10 +121,13 @@ class Seq2SeqModel(nn.Module):
         cn = torch.cat((cn[-1], cn[-2]), 1)
         return h_in, (hn, cn)
 
-    def decode(self, dec_inputs, hn, cn, ctx, ctx_mask=None):
-        """ Decode a step, based on context encoding and source context states."""
+    def decode(self, dec_inputs, hn, cn, ctx, ctx_mask=None, projected_ctx=None):
+        """
+        Decode a step, based on context encoding and source context states.
+        projected_ctx are the attention projections of ctx from decoder.project_context, reused across steps.
+        """
         dec_hidden = (hn, cn)
-        h_out, dec_hidden = self.decoder(dec_inputs, dec_hidden, ctx, ctx_mask)
+        h_out, dec_hidden = self.decoder(dec_inputs, dec_hidden, ctx, ctx_mask, projected_ctx=projected_ctx)
 
         h_out_reshape = h_out.contiguous().view(h_out.size(0) * h_out.size(1), -1)
         decoder_logits = self.dec2vocab(h_out_reshape)
@@ -184,28 +186,35 @@ class Seq2SeqModel(nn.Module):
             edit_logits = None
 
         # greedy decode by step
+        projected_ctx = self.decoder.project_context(h_in)
         dec_inputs = self.embedding(self.SOS_tensor)
         dec_inputs = dec_inputs.expand(batch_size, dec_inputs.size(0), dec_inputs.size(1))
 
-        done = [False for _ in range(batch_size)]
-        total_done = 0
-        max_len = 0
-        output_seqs = [[] for _ in range(batch_size)]
-
-        while total_done < batch_size and max_len < self.max_dec_len:
-            log_probs, (hn, cn) = self.decode(dec_inputs, hn, cn, h_in, src_mask)
+        # the examples still being decoded; the rows of finished examples are dropped from the decoder inputs
+        active = torch.arange(batch_size, device=hn.device)
+        step_preds, step_active = [], []
+        for _ in range(self.max_dec_len):
+            log_probs, (hn, cn) = self.decode(dec_inputs, hn, cn, h_in, src_mask, projected_ctx)
             assert log_probs.size(1) == 1, "Output must have 1-step of output."
             _, preds = log_probs.squeeze(1).max(1, keepdim=True)
+            step_preds.append(preds.squeeze(1))
+            step_active.append(active)
+            unfinished = preds.squeeze(1).ne(constant.EOS_ID)
+            if not bool(unfinished.any()):
+                break
+            if not bool(unfinished.all()):
+                rows = unfinished.nonzero().squeeze(1)
+                preds, hn, cn, h_in, src_mask = preds[rows], hn[rows], cn[rows], h_in[rows], src_mask[rows]
+                if projected_ctx is not None:
+                    projected_ctx = projected_ctx[rows]
+                active = active[rows]
             dec_inputs = self.embedding(preds) # update decoder inputs
-            max_len += 1
-            for i in range(batch_size):
-                if not done[i]:
-                    token = preds.data[i][0].item()
-                    if token == constant.EOS_ID:
-                        done[i] = True
-                        total_done += 1
-                    else:
-                        output_seqs[i].append(token)
+
+        output_seqs = [[] for _ in range(batch_size)]
+        for preds, active in zip(step_preds, step_active):
+            for i, token in zip(active.tolist(), preds.tolist()):
+                if token != constant.EOS_ID:
+                    output_seqs[i].append(token)
         return output_seqs, edit_logits
 
     def predict(self, src, src_mask, pos=None, beam_size=5):
@@ -232,51 +241,73 @@ class Seq2SeqModel(nn.Module):
             edit_logits = None
 
         # (2) set up beam
+        # the beams of all examples are decoded together, with the rows of the decoder in beam-major order, i.e. row
+        # k * batch_size + b holds beam k of example b
         with torch.no_grad():
+            projected_ctx = self.decoder.project_context(h_in)
+            if projected_ctx is not None:
+                projected_ctx = projected_ctx.repeat(beam_size, 1, 1)
             h_in = h_in.data.repeat(beam_size, 1, 1) # repeat data for beam search
             src_mask = src_mask.repeat(beam_size, 1)
             # repeat decoder hidden states
             hn = hn.data.repeat(beam_size, 1)
             cn = cn.data.repeat(beam_size, 1)
-        beam = [Beam(beam_size, self.use_cuda) for _ in range(batch_size)]
-
-        def update_state(states, idx, positions, beam_size):
-            """ Select the states according to back pointers. """
-            for e in states:
-                br, d = e.size()
-                s = e.contiguous().view(beam_size, br // beam_size, d)[:,idx]
-                s.data.copy_(s.data.index_select(0, positions))
+        device = hn.device
+        batch_idx = torch.arange(batch_size, device=device)
+        beam_idx = torch.arange(beam_size, device=device).unsqueeze(0).expand(batch_size, beam_size)
+        # the current tokens of each beam, [batch, beam]; only the first beam starts with SOS
+        current = torch.full((batch_size, beam_size), constant.PAD_ID, dtype=torch.long, device=device)
+        current[:, 0] = constant.SOS_ID
+        scores = torch.zeros(batch_size, beam_size, device=device)
+        done = torch.zeros(batch_size, dtype=torch.bool, device=device)
+        # tokens, back pointers and whether the example was still decoded, at each step
+        step_tokens, step_origins, step_active = [], [], []
 
         # (3) main loop
         for i in range(self.max_dec_len):
-            dec_inputs = torch.stack([b.get_current_state() for b in beam]).t().contiguous().view(-1, 1)
-            dec_inputs = self.embedding(dec_inputs)
-            log_probs, (hn, cn) = self.decode(dec_inputs, hn, cn, h_in, src_mask)
-            log_probs = log_probs.view(beam_size, batch_size, -1).transpose(0,1)\
-                    .contiguous() # [batch, beam, V]
-
-            # advance each beam
-            done = []
-            for b in range(batch_size):
-                is_done = beam[b].advance(log_probs.data[b])
-                if is_done:
-                    done += [b]
-                # update beam state
-                update_state((hn, cn), b, beam[b].get_current_origin(), beam_size)
-
-            if len(done) == batch_size:
+            dec_inputs = self.embedding(current.t().contiguous().view(-1, 1))
+            log_probs, (hn, cn) = self.decode(dec_inputs, hn, cn, h_in, src_mask, projected_ctx)
+            log_probs = log_probs.view(beam_size, batch_size, -1).transpose(0,1).contiguous() # [batch, beam, V]
+            num_words = log_probs.size(2)
+
+            if i == 0:
+                # first step, expand from the first beam
+                best_scores, best_ids = log_probs[:, 0].topk(beam_size, 1, True, True)
+            else:
+                beam_lk = log_probs + scores.unsqueeze(2)
+                best_scores, best_ids = beam_lk.view(batch_size, -1).topk(beam_size, 1, True, True)
+            origins = best_ids // num_words
+            tokens = best_ids - origins * num_words
+
+            # the beams of finished examples are kept as they are
+            active = ~done
+            keep = active.unsqueeze(1)
+            scores = torch.where(keep, best_scores, scores)
+            origins = torch.where(keep, origins, beam_idx)
+            current = torch.where(keep, tokens, current)
+            step_tokens.append(tokens)
+            step_origins.append(origins)
+            step_active.append(active)
+
+            # select the decoder states according to the back pointers
+            rows = (origins.t() * batch_size + batch_idx).reshape(-1)
+            hn = hn.index_select(0, rows)
+            cn = cn.index_select(0, rows)
+
+            # an example is finished when the top of its beam is EOS
+            done = done | (active & tokens[:, 0].eq(constant.EOS_ID))
+            if bool(done.all()):
                 break
 
         # back trace and find hypothesis
-        all_hyp, all_scores = [], []
-        for b in range(batch_size):
-            scores, ks = beam[b].sort_best()
-            all_scores += [scores[0]]
-            k = ks[0]
-            hyp = beam[b].get_hyp(k)
-            hyp = utils.prune_hyp(hyp)
-            hyp = [i.item() for i in hyp]
-            all_hyp += [hyp]
-
+        _, ks = torch.sort(scores, 1, True)
+        k = ks[:, 0:1]
+        hyps = []
+        for tokens, origins in zip(reversed(step_tokens), reversed(step_origins)):
+            hyps.append(tokens.gather(1, k))
+            k = origins.gather(1, k)
+        hyps = torch.cat(hyps[::-1], 1).tolist()
+        lengths = torch.stack(step_active, 1).sum(1).tolist()
+
+        all_hyp = [utils.prune_hyp(hyp[:length]) for hyp, length in zip(hyps, lengths)]
         return all_hyp, edit_logits
-
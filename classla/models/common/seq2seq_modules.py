@@ -25,16 +25,22 @@ class BasicAttention(nn.Module):
         self.tanh = nn.Tanh()
         self.sm = nn.Softmax(dim=1)
 
-    def forward(self, input, context, mask=None, attn_only=False):
+    def project_context(self, context):
+        """ Compute the part of the attention that only depends on the context, once for all decoding steps. """
+        batch_size, source_len, dim = context.size()
+        return self.linear_c(context.contiguous().view(-1, dim)).view(batch_size, source_len, dim)
+
+    def forward(self, input, context, mask=None, attn_only=False, projected_context=None):
         """
         input: batch x dim
         context: batch x sourceL x dim
+        projected_context: the result of project_context(context), if already computed
         """
         batch_size = context.size(0)
         source_len = context.size(1)
         dim = context.size(2)
         target = self.linear_in(input) # batch x dim
-        source = self.linear_c(context.contiguous().view(-1, dim)).view(batch_size, source_len, dim)
+        source = projected_context if projected_context is not None else self.project_context(context)
         attn = target.unsqueeze(1).expand_as(context) + source
         attn = self.tanh(attn) # batch x sourceL x dim
         attn = self.linear_v(attn.view(-1, dim)).view(batch_size, source_len)
@@ -68,7 +74,11 @@ class SoftDotAttention(nn.Module):
         self.tanh = nn.Tanh()
         self.mask = None
 
-    def forward(self, input, context, mask=None, attn_only=False):
+    def project_context(self, context):
+        """ The context is used as it is. """
+        return None
+
+    def forward(self, input, context, mask=None, attn_only=False, projected_context=None):
         """Propogate input through the network.
 
         input: batch x dim
@@ -111,7 +121,11 @@ class LinearAttention(nn.Module):
         self.tanh = nn.Tanh()
         self.mask = None
 
-    def forward(self, input, context, mask=None, attn_only=False):
+    def project_context(self, context):
+        """ The context is used as it is. """
+        return None
+
+    def forward(self, input, context, mask=None, attn_only=False, projected_context=None):
         """
         input: batch x dim
         context: batch x sourceL x dim
@@ -157,17 +171,21 @@ class DeepAttention(nn.Module):
         self.tanh = nn.Tanh()
         self.mask = None
 
-    def forward(self, input, context, mask=None, attn_only=False):
+    def project_context(self, context):
+        """ Compute the part of the attention that only depends on the context, once for all decoding steps. """
+        batch_size, source_len, dim = context.size()
+        return self.relu(self.linear_in(context.contiguous().view(-1, dim))).view(batch_size, source_len, dim)
+
+    def forward(self, input, context, mask=None, attn_only=False, projected_context=None):
         """
         input: batch x dim
         context: batch x sourceL x dim
+        projected_context: the result of project_context(context), if already computed
         """
         batch_size = context.size(0)
         source_len = context.size(1)
-        dim = context.size(2)
-        u = input.unsqueeze(1).expand_as(context).contiguous().view(-1, dim)  # batch*sourceL x dim
-        u = self.relu(self.linear_in(u))
-        v = self.relu(self.linear_in(context.contiguous().view(-1, dim)))
+        u = self.relu(self.linear_in(input)).unsqueeze(1)  # batch x 1 x dim
+        v = projected_context if projected_context is not None else self.project_context(context)
         attn = self.linear_v(u.mul(v)).view(batch_size, source_len)
 
         if mask is not None:
@@ -210,17 +228,26 @@ class LSTMAttention(nn.Module):
             raise Exception("Unsupported LSTM attention type: {}".format(attn_type))
         logger.debug("Using {} attention for LSTM.".format(attn_type))
 
-    def forward(self, input, hidden, ctx, ctx_mask=None):
+    def project_context(self, ctx):
+        """
+        Precompute the projections of the context used by the attention at every step.  When decoding step by step,
+        compute them once per encoded batch and pass them to forward as projected_ctx.
+        """
+        return self.attention_layer.project_context(ctx)
+
+    def forward(self, input, hidden, ctx, ctx_mask=None, projected_ctx=None):
         """Propogate input through the network."""
         if self.batch_first:
             input = input.transpose(0,1)
+        if projected_ctx is None:
+            projected_ctx = self.project_context(ctx)
 
         output = []
         steps = range(input.size(0))
         for i in steps:
             hidden = self.lstm_cell(input[i], hidden)
             hy, cy = hidden
-            h_tilde, alpha = self.attention_layer(hy, ctx, mask=ctx_mask)
+            h_tilde, alpha = self.attention_layer(hy, ctx, mask=ctx_mask, projected_context=projected_ctx)
             output.append(h_tilde)
         output = torch.cat(output, 0).view(input.size(0), *output[0].size())
 
@@ -84,6 +84,37 @@ def get_optimizer(name, parameters, lr, betas=(0.9, 0.999), eps=1e-8, momentum=0
     else:
         raise Exception("Unsupported optimizer: {}".format(name))
 
+def prepare_for_inference(model):
+    """ Freeze all parameters and switch a model used only for prediction to evaluation mode. """
+    for p in model.parameters():
+        p.requires_grad_(False)
+    model.eval()
+    return model
+
+# pairs of a frozen pretrained embedding and the bias-free projection applied to its output
+PRETRAINED_PROJECTIONS = [('pretrained_emb', 'trans_pretrained'), ('head_pretrained_emb', 'head_trans_pretrained')]
+
+def fold_pretrained_projection(model, force=False):
+    """
+    Replace each frozen pretrained embedding of a model used only for prediction by a table of the already projected
+    vectors, so that the lookup gives the same result without the per-token projection.  Unless force is set, only
+    projections that do not enlarge the table are folded.  Returns the names of the folded embeddings.
+    """
+    folded = []
+    for emb_name, trans_name in PRETRAINED_PROJECTIONS:
+        emb = getattr(model, emb_name, None)
+        trans = getattr(model, trans_name, None)
+        if not isinstance(emb, torch.nn.Embedding) or not isinstance(trans, torch.nn.Linear) or trans.bias is not None:
+            continue
+        if not force and trans.out_features > trans.in_features:
+            continue
+        with torch.no_grad():
+            table = torch.matmul(emb.weight, trans.weight.t())
+        setattr(model, emb_name, torch.nn.Embedding.from_pretrained(table, freeze=True))
+        setattr(model, trans_name, torch.nn.Identity())
+        folded.append(emb_name)
+    return folded
+
 def change_lr(optimizer, new_lr):
     for param_group in optimizer.param_groups:
         param_group['lr'] = new_lr
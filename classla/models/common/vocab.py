@@ -3,6 +3,9 @@ from collections import Counter, OrderedDict
 import os
 import pickle
 
+import numpy as np
+import torch
+
 PAD = '<PAD>'
 PAD_ID = 0
 UNK = '<UNK>'
@@ -100,9 +103,14 @@ class CompositeVocab(BaseVocab):
     are treated as positioned values, and `<EMPTY>` is used to pad parts at the end when the
     incoming value is not long enough.'''
 
+    # largest number of decoded units kept by id2unit
+    CACHE_SIZE = 50000
+
     def __init__(self, data=None, lang="", idx=0, sep="", keyed=False):
         self.sep = sep
         self.keyed = keyed
+        # decoded units by tuple of part ids; few distinct tuples occur in practice
+        self._id2unit_cache = {}
         super().__init__(data, lang, idx=idx)
         self.state_attrs += ['sep', 'keyed']
 
@@ -132,6 +140,36 @@ class CompositeVocab(BaseVocab):
             return [self._unit2id[i].get(parts[i], UNK_ID) if i < len(parts) else EMPTY_ID for i in range(len(self._unit2id))]
 
     def id2unit(self, id):
+        key = tuple(id)
+        unit = self._id2unit_cache.get(key)
+        if unit is None:
+            unit = self.parts2unit(key)
+            if len(self._id2unit_cache) >= CompositeVocab.CACHE_SIZE:
+                self._id2unit_cache.clear()
+            self._id2unit_cache[key] = unit
+        return unit
+
+    def unmap_many(self, ids):
+        """ Decode a [N, parts] array (or tensor) of part ids to a list of N units, decoding each distinct row once. """
+        if isinstance(ids, torch.Tensor):
+            ids = ids.cpu().numpy()
+        ids = np.asarray(ids).reshape(-1, len(self._id2unit))
+        if len(ids) == 0:
+            return []
+        # one sortable key per row: the part ids packed into an integer when they fit, else the raw bytes of the row
+        widths = [max(int(n) - 1, 1).bit_length() for n in self.lens()]
+        if sum(widths) <= 63:
+            shifts = np.cumsum([0] + widths[:-1], dtype=np.int64)
+            keys = np.bitwise_or.reduce(ids.astype(np.int64) << shifts, axis=1)
+        else:
+            dtype = np.uint8 if max(self.lens()) <= 256 else np.int32
+            keys = np.ascontiguousarray(ids.astype(dtype)).view(np.dtype((np.void, ids.shape[1] * np.dtype(dtype).itemsize))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        units = np.array([self.id2unit(row) for row in ids[first].tolist()], dtype=object)
+        return units[inverse.reshape(-1)].tolist()
+
+    def parts2unit(self, id):
+        """ Build the unit string from part ids, without the cache of id2unit. """
         items = []
         for v, k in zip(id, self._id2unit.keys()):
             if v == EMPTY_ID: continue
@@ -2,15 +2,22 @@ import random
 import logging
 import torch
 
-from classla.models.common.data import map_to_ids, get_long_tensor, get_float_tensor, sort_all
+from classla.models.common.data import map_to_ids, get_long_tensor, get_float_tensor, sort_all, sort_word_types
 from classla.models.common.vocab import PAD_ID, VOCAB_PREFIX, ROOT_ID, CompositeVocab
 from classla.models.pos.vocab import CharVocab, WordVocab, XPOSVocab, FeatureVocab, MultiVocab
 from classla.models.pos.xpos_vocab_factory import xpos_vocab_factory
+from classla.models.depparse.windows import split_windows, join_windows
 from classla.models.common.doc import *
 
 logger = logging.getLogger('classla')
 
-def data_to_batches(data, batch_size, eval_mode, sort_during_eval, max_sentence_size):
+def padded_arcs(num_sentences, max_length):
+    """
+    The number of arcs scored for a batch of sentences, padded to the longest one, with the root
+    """
+    return num_sentences * (max_length + 1) ** 2
+
+def data_to_batches(data, batch_size, eval_mode, sort_during_eval, max_sentence_size, max_batch_arcs=None):
     """
     Given a list of lists, where the first element of each sublist
     represents the sentence, group the sentences into batches.
@@ -19,6 +26,13 @@ def data_to_batches(data, batch_size, eval_mode, sort_during_eval, max_sentence_
     length with a bit of random shuffling.  During eval mode, the
     sentences are sorted by length if sort_during_eval is true.
 
+    A batch holds at most batch_size words.  As the arc and deprel
+    scores of a batch grow with the square of its longest sentence,
+    max_batch_arcs additionally limits the padded number of arcs of a
+    batch (see padded_arcs), so that a batch with long sentences holds
+    fewer of them.  A sentence which exceeds either limit by itself
+    gets a batch of its own.
+
     Refactored from the data structure in case other models could use
     it and for ease of testing.
 
@@ -42,32 +56,63 @@ def data_to_batches(data, batch_size, eval_mode, sort_during_eval, max_sentence_
 
     current = []
     currentlen = 0
+    currentmax = 0
     for x in data:
         if max_sentence_size is not None and len(x[0]) > max_sentence_size:
             if currentlen > 0:
                 res.append(current)
                 current = []
                 currentlen = 0
+                currentmax = 0
             res.append([x])
         else:
-            if len(x[0]) + currentlen > batch_size and currentlen > 0:
+            if currentlen > 0 and (len(x[0]) + currentlen > batch_size or
+                                   (max_batch_arcs is not None and
+                                    padded_arcs(len(current) + 1, max(currentmax, len(x[0]))) > max_batch_arcs)):
                 res.append(current)
                 current = []
                 currentlen = 0
+                currentmax = 0
             current.append(x)
             currentlen += len(x[0])
+            currentmax = max(currentmax, len(x[0]))
 
     if currentlen > 0:
         res.append(current)
 
     return res, data_orig_idx
 
+def padding_counts(batches):
+    """
+    Count the words and arcs of the batches, without and with the padding to the longest sentence of each batch
+    """
+    lengths = [[len(x[0]) for x in batch] for batch in batches]
+    batch_arcs = [padded_arcs(len(l), max(l)) for l in lengths]
+    return {'batches': len(batches),
+            'sentences': sum(len(l) for l in lengths),
+            'words': sum(sum(l) for l in lengths),
+            'padded_words': sum(len(l) * max(l) for l in lengths),
+            'arcs': sum((n + 1) ** 2 for l in lengths for n in l),
+            'padded_arcs': sum(batch_arcs),
+            'max_batch_arcs': max(batch_arcs, default=0)}
+
+def padding_stats(counts):
+    """
+    The counts of padding_counts with the share of real words and arcs in the padded tensors
+    """
+    stats = dict(counts)
+    stats['word_efficiency'] = counts['words'] / counts['padded_words'] if counts['padded_words'] else 1.0
+    stats['arc_efficiency'] = counts['arcs'] / counts['padded_arcs'] if counts['padded_arcs'] else 1.0
+    return stats
+
 
 class DataLoader:
 
-    def __init__(self, doc, batch_size, args, pretrain, vocab=None, evaluation=False, sort_during_eval=False, max_sentence_size=None):
+    def __init__(self, doc, batch_size, args, pretrain, vocab=None, evaluation=False, sort_during_eval=False, max_sentence_size=None,
+                 max_batch_arcs=None, window_size=None, window_overlap=None):
         self.batch_size = batch_size
         self.max_sentence_size=max_sentence_size
+        self.max_batch_arcs = max_batch_arcs
         self.args = args
         self.eval = evaluation
         self.shuffled = not self.eval
@@ -86,6 +131,12 @@ class DataLoader:
         if pretrain is not None and args['pretrain']:
             self.pretrain_vocab = pretrain.vocab
 
+        # parse the sentences longer than window_size in overlapping windows
+        self.sentence_windows = None
+        self.window_flags = None
+        if window_size is not None and self.eval:
+            data, self.sentence_windows = self.split_long_sentences(data, window_size, window_overlap)
+
         # filter and sample data
         if args.get('sample_train', 1.0) < 1.0 and not self.eval:
             keep = int(args['sample_train'] * len(data))
@@ -102,6 +153,16 @@ class DataLoader:
         self.data = self.chunk_batches(data)
         logger.debug("{} batches created.".format(len(self.data)))
 
+        if self.sentence_windows is not None:
+            # which sentences of every batch are windows of a longer sentence, sorted like the batches
+            windowed = [len(windows) > 1 for windows in self.sentence_windows for _ in windows]
+            if self.data_orig_idx is not None:
+                windowed = [windowed[i] for i in self.data_orig_idx]
+            self.window_flags = []
+            for batch in self.data:
+                self.window_flags.append(windowed[:len(batch)])
+                windowed = windowed[len(batch):]
+
     def init_vocab(self, data):
         assert self.eval == False # for eval vocab must exist
         charvocab = CharVocab(data, self.args['shorthand'])
@@ -161,9 +222,15 @@ class DataLoader:
 
         # sort words by lens for easy char-RNN operations
         batch_words = [w for sent in batch[1] for w in sent]
-        word_lens = [len(x) for x in batch_words]
-        batch_words, word_orig_idx = sort_all([batch_words], word_lens)
-        batch_words = batch_words[0]
+        if self.eval:
+            # at inference every word type is encoded by the char-RNN only once
+            batch_words, word_type_idx = sort_word_types(batch_words)
+            word_orig_idx = None
+        else:
+            word_lens = [len(x) for x in batch_words]
+            batch_words, word_orig_idx = sort_all([batch_words], word_lens)
+            batch_words = batch_words[0]
+            word_type_idx = None
         word_lens = [len(x) for x in batch_words]
 
         # convert to tensors
@@ -181,7 +248,7 @@ class DataLoader:
         lemma = get_long_tensor(batch[6], batch_size)
         head = get_long_tensor(batch[7], batch_size)
         deprel = get_long_tensor(batch[8], batch_size)
-        return words, words_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, lemma, head, deprel, orig_idx, word_orig_idx, sentlens, word_lens
+        return words, words_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, lemma, head, deprel, orig_idx, word_orig_idx, sentlens, word_lens, word_type_idx
 
     def load_doc(self, doc):
         data = doc.get([TEXT, UPOS, XPOS, FEATS, LEMMA, HEAD, DEPREL], as_sentences=True)
@@ -197,10 +264,37 @@ class DataLoader:
                         data[sent_idx][tok_idx][feat_idx] = '_'
         return data
 
+    def split_long_sentences(self, data, window_size, overlap):
+        pieces = []
+        sentence_windows = []
+        for sentence in data:
+            windows = split_windows(len(sentence), window_size, overlap)
+            sentence_windows.append(windows)
+            pieces += [sentence[start:end] for start, end in windows]
+        return pieces, sentence_windows
+
+    def join_window_preds(self, preds, scores):
+        """
+        Join the predictions for the windows of every split sentence into one tree, using the scores of the windows
+        (see Trainer.predict with score_sentences=window_flags[i] for batch i).  Both are in the order of the sentences.
+        """
+        joined = []
+        i = 0
+        for windows in self.sentence_windows:
+            if len(windows) == 1:
+                joined.append(preds[i])
+            else:
+                joined.append(join_windows(windows, preds[i:i + len(windows)], scores[i:i + len(windows)]))
+            i += len(windows)
+        return joined
+
     def __iter__(self):
         for i in range(self.__len__()):
             yield self.__getitem__(i)
 
+    def padding_stats(self):
+        return padding_stats(padding_counts(self.data))
+
     def reshuffle(self):
         data = [y for x in self.data for y in x]
         self.data = self.chunk_batches(data)
@@ -209,7 +303,7 @@ class DataLoader:
     def chunk_batches(self, data):
         batches, data_orig_idx = data_to_batches(data=data, batch_size=self.batch_size,
                                                  eval_mode=self.eval, sort_during_eval=self.sort_during_eval,
-                                                 max_sentence_size=self.max_sentence_size)
+                                                 max_sentence_size=self.max_sentence_size, max_batch_arcs=self.max_batch_arcs)
         # data_orig_idx might be None at train time, since we don't anticipate unsorting
         self.data_orig_idx = data_orig_idx
         return batches
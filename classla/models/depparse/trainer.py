@@ -2,14 +2,18 @@
 A trainer class to handle training and testing of models.
 """
 
-import sys
+import concurrent.futures
 import logging
+import multiprocessing
+import os
+import sys
+import numpy as np
 import torch
 from torch import nn
 
 from classla.models.common.trainer import Trainer as BaseTrainer
 from classla.models.common import utils, loss
-from classla.models.common.chuliu_edmonds import chuliu_edmonds, chuliu_edmonds_one_root
+from classla.models.common.chuliu_edmonds import decode_tree
 from classla.models.depparse.model import Parser
 from classla.models.pos.vocab import MultiVocab
 
@@ -25,12 +29,18 @@ def unpack_batch(batch, use_cuda):
     word_orig_idx = batch[12]
     sentlens = batch[13]
     wordlens = batch[14]
-    return inputs, orig_idx, word_orig_idx, sentlens, wordlens
+    word_type_idx = batch[15]
+    return inputs, orig_idx, word_orig_idx, sentlens, wordlens, word_type_idx
 
 class Trainer(BaseTrainer):
     """ A trainer for training models. """
-    def __init__(self, args=None, vocab=None, pretrain=None, model_file=None, use_cuda=False):
+    def __init__(self, args=None, vocab=None, pretrain=None, model_file=None, use_cuda=False, inference=False):
         self.use_cuda = use_cuda
+        self.inference = inference
+        self.decode_workers = 0
+        self.decode_pool = 'thread'
+        self._decode_executor = None
+        self._decode_executor_pid = None
         if model_file is not None:
             # load everything from file
             self.load(model_file, pretrain)
@@ -57,16 +67,23 @@ class Trainer(BaseTrainer):
 
         self.vocab._vocabs['deprel']._id2unit = new_id2unit
         self.vocab._vocabs['deprel']._unit2id = new_unit2id
+        # for unmapping the predicted deprels of a whole batch at once
+        self.deprel_units = np.array(new_id2unit, dtype=object)
 
         self.parameters = [p for p in self.model.parameters() if p.requires_grad]
         if self.use_cuda:
             self.model.cuda()
         else:
             self.model.cpu()
-        self.optimizer = utils.get_optimizer(self.args['optim'], self.parameters, self.args['lr'], betas=(0.9, self.args['beta2']), eps=1e-6)
+        if self.inference:
+            # prediction only, no optimizer and no gradients are needed
+            utils.prepare_for_inference(self.model)
+            self.optimizer = None
+        else:
+            self.optimizer = utils.get_optimizer(self.args['optim'], self.parameters, self.args['lr'], betas=(0.9, self.args['beta2']), eps=1e-6)
 
     def update(self, batch, eval=False):
-        inputs, orig_idx, word_orig_idx, sentlens, wordlens = unpack_batch(batch, self.use_cuda)
+        inputs, orig_idx, word_orig_idx, sentlens, wordlens, word_type_idx = unpack_batch(batch, self.use_cuda)
         word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, lemma, head, deprel = inputs
 
         if eval:
@@ -74,7 +91,7 @@ class Trainer(BaseTrainer):
         else:
             self.model.train()
             self.optimizer.zero_grad()
-        loss, _ = self.model(word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, lemma, head, deprel, word_orig_idx, sentlens, wordlens)
+        loss, _ = self.model(word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, lemma, head, deprel, word_orig_idx, sentlens, wordlens, word_type_idx)
         loss_val = loss.data.item()
         if eval:
             return loss_val
@@ -84,23 +101,103 @@ class Trainer(BaseTrainer):
         self.optimizer.step()
         return loss_val
 
-    def predict(self, batch, unsort=True):
-        inputs, orig_idx, word_orig_idx, sentlens, wordlens = unpack_batch(batch, self.use_cuda)
+    def set_decode_workers(self, workers, pool='thread'):
+        """
+        Decode the trees of the sentences of a batch with a pool of worker threads or processes (pool is 'thread' or
+        'process').  With less than two workers the trees are decoded in the calling thread and no pool is started.
+        """
+        if pool not in ('process', 'thread'):
+            raise ValueError("Unknown pool type for decoding trees: {}".format(pool))
+        self.shutdown_decode_workers()
+        self.decode_workers = workers
+        self.decode_pool = pool
+
+    def shutdown_decode_workers(self):
+        """ Shut down the pool for decoding trees; it is started again on the next batch that needs it. """
+        if self._decode_executor is not None and self._decode_executor_pid == os.getpid():
+            self._decode_executor.shutdown(wait=False)
+        self._decode_executor = None
+
+    def decode_executor(self):
+        """ The pool for decoding trees, started on first use and again in a forked process. """
+        if self._decode_executor is None or self._decode_executor_pid != os.getpid():
+            if self.decode_pool == 'thread':
+                self._decode_executor = concurrent.futures.ThreadPoolExecutor(self.decode_workers)
+            else:
+                # the parser runs torch threads, so forking this process could deadlock the workers; a forkserver
+                # starts them from a clean process instead
+                context = multiprocessing.get_context('forkserver') if 'forkserver' in multiprocessing.get_all_start_methods() else None
+                self._decode_executor = concurrent.futures.ProcessPoolExecutor(self.decode_workers, mp_context=context)
+            self._decode_executor_pid = os.getpid()
+        return self._decode_executor
+
+    def __del__(self):
+        if getattr(self, '_decode_executor', None) is not None:
+            self.shutdown_decode_workers()
+
+    def decode_heads(self, scores, sentlens):
+        """ Decode the heads of every sentence of a batch from the [batch, length, length] head scores. """
+        multi_root = self.args.get('multi_root', False)
+        sentence_scores = [adj[:l, :l] for adj, l in zip(scores, sentlens)]
+        if self.decode_workers < 2 or len(sentence_scores) < 2:
+            return [decode_tree(adj, multi_root) for adj in sentence_scores]
+
+        # the longest sentences first, so that the workers finish at about the same time
+        order = sorted(range(len(sentence_scores)), key=lambda i: sentlens[i], reverse=True)
+        chunksize = max(1, len(order) // (4 * self.decode_workers))
+        trees = self.decode_executor().map(decode_tree, [sentence_scores[i] for i in order], [multi_root] * len(order),
+                                           chunksize=chunksize)
+        head_seqs = [None] * len(order)
+        for i, tree in zip(order, trees):
+            head_seqs[i] = tree
+        return head_seqs
+
+    @torch.inference_mode()
+    def predict(self, batch, unsort=True, score_sentences=None):
+        """
+        Predict the [head, deprel] of every word of the sentences of a batch.
+
+        score_sentences, which is used to join the windows of long sentences, flags the sentences of the batch, in
+        its order, that also need their scores.  With it, the predictions come with a list of scores of the
+        sentences: for a flagged sentence of n words, the log probabilities of the arcs as an array of [n, n+1],
+        whose row i is for word i+1 and column j for head j, with the array of the best deprel of every arc, and None
+        for the other sentences.
+        """
+        inputs, orig_idx, word_orig_idx, sentlens, wordlens, word_type_idx = unpack_batch(batch, self.use_cuda)
         word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, lemma, head, deprel = inputs
 
-        self.model.eval()
+        if not self.inference:
+            self.model.eval()
         batch_size = word.size(0)
-        _, preds = self.model(word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, lemma, head, deprel, word_orig_idx, sentlens, wordlens)
-        if 'multi_root' in self.args and self.args['multi_root']:
-            head_seqs = [chuliu_edmonds(adj[:l, :l])[1:] for adj, l in zip(preds[0], sentlens)]
-        else:
-            head_seqs = [chuliu_edmonds_one_root(adj[:l, :l])[1:] for adj, l in zip(preds[0], sentlens)] # remove attachment for the root
-        deprel_seqs = [self.vocab['deprel'].unmap([preds[1][i][j+1][h] for j, h in enumerate(hs)]) for i, hs in enumerate(head_seqs)]
-
-        pred_tokens = [[[str(head_seqs[i][j]), deprel_seqs[i][j]] for j in range(sentlens[i]-1)] for i in range(batch_size)]
+        _, preds = self.model(word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, lemma, head, deprel, word_orig_idx, sentlens, wordlens, word_type_idx)
+        head_seqs = self.decode_heads(preds[0], sentlens)
+
+        # the deprel of every word is the best label of the arc from its predicted head
+        heads = np.concatenate(head_seqs)
+        sentence_idx = np.repeat(np.arange(batch_size), [l - 1 for l in sentlens])
+        word_idx = np.concatenate([np.arange(1, l) for l in sentlens])
+        deprels = self.deprel_units[preds[1][sentence_idx, word_idx, heads]].tolist()
+        word_preds = list(zip(heads.tolist(), deprels))
+
+        pred_tokens = []
+        start = 0
+        for l in sentlens:
+            pred_tokens.append([list(p) for p in word_preds[start:start+l-1]])
+            start += l - 1
         if unsort:
             pred_tokens = utils.unsort(pred_tokens, orig_idx)
-        return pred_tokens
+        if score_sentences is None:
+            return pred_tokens
+
+        scores = []
+        for i, l in enumerate(sentlens):
+            if score_sentences[orig_idx[i]]:
+                scores.append((preds[0][i, 1:l, :l].copy(), self.deprel_units[preds[1][i, 1:l, :l]]))
+            else:
+                scores.append(None)
+        if unsort:
+            scores = utils.unsort(scores, orig_idx)
+        return pred_tokens, scores
 
     def save(self, filename, skip_modules=True):
         model_state = self.model.state_dict()
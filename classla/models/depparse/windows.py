@@ -0,0 +1,130 @@
+"""
+Parsing of very long sentences in overlapping windows.
+
+The parser scores every pair of words of a sentence, so the memory for a sentence of thousands of words is out of
+bounds.  Instead, such a sentence is split into overlapping windows, which are parsed as sentences of their own, and
+the trees of the windows are joined into one tree of the sentence.
+"""
+
+import numpy as np
+
+from classla.models.common.chuliu_edmonds import find_cycles
+
+# deprel of an arc that no window scored, see join_windows
+FALLBACK_DEPREL = 'dep'
+
+def split_windows(length, window_size, overlap=None):
+    """
+    Split a sentence of the given length into windows of window_size words, each overlapping the previous one by at
+    least overlap words (a quarter of the window by default).  Returns a list of (start, end) pairs.
+    """
+    if overlap is None:
+        overlap = window_size // 4
+    if window_size < 2 or not 0 <= overlap < window_size:
+        raise ValueError("Windows of {} words cannot overlap by {} words".format(window_size, overlap))
+    if length <= window_size:
+        return [(0, length)]
+    starts = [0]
+    while starts[-1] + window_size < length:
+        starts.append(starts[-1] + window_size - overlap)
+    # the last window ends with the sentence, so that it is not shorter than the others
+    starts[-1] = length - window_size
+    return [(start, start + window_size) for start in starts]
+
+def join_windows(windows, predictions, scores):
+    """
+    Join the predictions of the windows of a sentence into one tree with a single root.
+
+    The predictions of a window are the [head, deprel] pairs of Trainer.predict, with the heads counted from the start
+    of the window, and its scores are those of Trainer.predict with score_sentences: the log probabilities of the arcs
+    between the words of the window and the best deprel of every arc.
+
+    Every word takes its head from the window in which it is furthest from the ends, i.e. the overlap of two windows
+    is split in the middle.  The word that is most likely attached to the root, among those that their windows attach
+    to it, becomes the root of the sentence, and the other roots of the windows take their best head among the words
+    of the windows that contain them.  As the heads come from different trees, they may still form cycles.  Each
+    cycle is broken by replacing the arc of the cycle that loses the least probability when its word takes its best
+    head outside of the cycle and its dependents, again among the words of the windows that contain it.  Every new
+    arc is labeled with the deprel scored for it.  Only if no word of a cycle has such a head, the first word of the
+    cycle is attached to the root with FALLBACK_DEPREL, as no window scores that arc.  Returns a list of
+    [head, deprel] pairs, like Trainer.predict.
+    """
+    length = windows[-1][1]
+    boundaries = [0] + [(start + prev_end) // 2 for (_, prev_end), (start, _) in zip(windows, windows[1:])] + [length]
+
+    heads, deprels, owners = [], [], []
+    for k, ((start, _), window_predictions, first, last) in enumerate(zip(windows, predictions, boundaries, boundaries[1:])):
+        for head, deprel in window_predictions[first - start:last - start]:
+            heads.append(head + start if head > 0 else 0)
+            deprels.append(deprel)
+            owners.append(k)
+
+    def word_windows(i):
+        """ The windows that contain word i (counted from 0), starting with the one it takes its head from """
+        return [owners[i]] + [k for k, (start, end) in enumerate(windows) if k != owners[i] and start <= i < end]
+
+    def arc(i, head):
+        """
+        The log probability and the deprel of attaching word i (counted from 0) to head, scored by the first window
+        of word i that contains the head
+        """
+        for k in word_windows(i):
+            start, end = windows[k]
+            if head == 0 or start < head <= end:
+                arc_scores, arc_deprels = scores[k]
+                column = head - start if head > 0 else 0
+                return arc_scores[i - start, column], arc_deprels[i - start, column]
+        raise ValueError("No window contains both word {} and its head {}".format(i + 1, head))
+
+    def best_head(i, excluded=()):
+        """ The most likely head of word i among the other words of its windows which are not excluded, or None """
+        candidates = set(head for k in word_windows(i) for head in range(windows[k][0] + 1, windows[k][1] + 1))
+        candidates = sorted(candidates - set(excluded) - {i + 1})
+        return max(candidates, key=lambda head: arc(i, head)[0], default=None)
+
+    roots = [i for i, head in enumerate(heads) if head == 0]
+    root = max(roots or range(length), key=lambda i: arc(i, 0)[0])
+    for i in roots:
+        if i != root:
+            heads[i] = best_head(i)
+            deprels[i] = arc(i, heads[i])[1]
+    if heads[root] != 0:
+        heads[root], deprels[root] = 0, arc(root, 0)[1]
+
+    cycles = find_cycles(np.array([0] + heads))
+    while cycles:
+        cycle = np.nonzero(cycles[0])[0].tolist()
+        # the words of the cycle and their dependents cannot become heads of the words of the cycle
+        subtree = dependents(heads, cycle)
+        replacements = []
+        for word in cycle:
+            head = best_head(word - 1, subtree)
+            if head is not None:
+                replacements.append((arc(word - 1, heads[word - 1])[0] - arc(word - 1, head)[0], word - 1, head))
+        if replacements:
+            _, i, head = min(replacements)
+            heads[i], deprels[i] = head, arc(i, head)[1]
+        else:
+            # every word of the windows of the cycle depends on the cycle, so the root, which is not in any of these
+            # windows, is the only head left, and no window scores this arc
+            heads[cycle[0] - 1], deprels[cycle[0] - 1] = root + 1, FALLBACK_DEPREL
+        cycles = find_cycles(np.array([0] + heads))
+    return [[head, deprel] for head, deprel in zip(heads, deprels)]
+
+def dependents(heads, cycle):
+    """
+    The words of a cycle and the words whose heads lead to it, given the heads of the words of a sentence counted
+    from 1 and the words of the cycle
+    """
+    leads = dict.fromkeys(cycle, True)
+    leads[0] = False
+    for word in range(1, len(heads) + 1):
+        path = []
+        while word not in leads:
+            # marks the path, so that a walk into another cycle ends when it comes around
+            leads[word] = False
+            path.append(word)
+            word = heads[word - 1]
+        for w in path:
+            leads[w] = leads[word]
+    return set(word for word, lead in leads.items() if lead)
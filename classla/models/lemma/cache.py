@@ -0,0 +1,73 @@
+"""
+A bounded cache of the lemmas predicted by the seq2seq lemmatizer, which can be kept in a file between runs.
+"""
+
+import json
+import logging
+import os
+from collections import OrderedDict
+
+logger = logging.getLogger('classla')
+
+class LemmaCache:
+    """
+    A LRU memo of seq2seq lemmas.  The keys are (form, xpos, model fingerprint, beam size), so a file can be shared by
+    different models and the lemmas of one model are never used for another.
+    """
+    def __init__(self, max_size, filename=None):
+        if max_size <= 0:
+            raise ValueError("The size of the lemma cache must be positive, got {}".format(max_size))
+        self.max_size = max_size
+        self.filename = filename
+        self._lemmas = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if filename is not None and os.path.exists(filename):
+            self.load(filename)
+
+    def __len__(self):
+        return len(self._lemmas)
+
+    def get(self, key):
+        """ Return the cached lemma for key, or None. """
+        lemma = self._lemmas.get(key)
+        if lemma is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._lemmas.move_to_end(key)
+        return lemma
+
+    def put(self, key, lemma):
+        self._lemmas[key] = lemma
+        self._lemmas.move_to_end(key)
+        while len(self._lemmas) > self.max_size:
+            self._lemmas.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'entries': len(self._lemmas), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def load(self, filename):
+        """ Add the lemmas saved in filename, as the least recently used entries. """
+        with open(filename, encoding='utf-8') as fin:
+            entries = json.load(fin)
+        lemmas = OrderedDict((tuple(entry[:-1]), entry[-1]) for entry in entries)
+        lemmas.update(self._lemmas)
+        self._lemmas = lemmas
+        while len(self._lemmas) > self.max_size:
+            self._lemmas.popitem(last=False)
+        logger.debug("Loaded {} cached lemmas from {}".format(len(entries), filename))
+
+    def save(self, filename=None):
+        """ Save the cached lemmas, from the least to the most recently used, to filename or the file of the cache. """
+        filename = filename if filename is not None else self.filename
+        if filename is None:
+            raise ValueError("No file to save the lemma cache to")
+        # write to a temporary file first, so that an interrupted save does not lose the previous cache
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as fout:
+            json.dump([list(key) + [lemma] for key, lemma in self._lemmas.items()], fout, ensure_ascii=False)
+        os.replace(tmp_filename, filename)
+        logger.debug("Saved {} cached lemmas to {}".format(len(self._lemmas), filename))
@@ -14,14 +14,18 @@ from classla.models.common.doc import *
 logger = logging.getLogger('classla')
 
 class DataLoader:
-    def __init__(self, doc, batch_size, args, vocab=None, evaluation=False, conll_only=False, skip=None):
+    def __init__(self, doc, batch_size, args, vocab=None, evaluation=False, conll_only=False, skip=None, data=None):
+        """
+        data: the [text, xpos, lemma] lists of the words to use instead of all words of doc, if they are already
+        extracted from it
+        """
         self.batch_size = batch_size
         self.args = args
         self.eval = evaluation
         self.shuffled = not self.eval
         self.doc = doc
 
-        data = self.load_doc(self.doc)
+        data = self.load_doc(self.doc) if data is None else self.resolve_none(data)
 
         if conll_only: # only load conll file
             return
@@ -2,6 +2,8 @@
 A trainer class to handle training and testing of models.
 """
 
+import atexit
+import hashlib
 import sys
 import numpy as np
 from collections import Counter
@@ -15,6 +17,7 @@ from classla.models.pos.trainer import Trainer as PosTrainer
 from classla.models.common.seq2seq_model import Seq2SeqModel
 from classla.models.common import utils, loss
 from classla.models.lemma import edit
+from classla.models.lemma.cache import LemmaCache
 from classla.models.lemma.vocab import MultiVocab
 
 logger = logging.getLogger('classla')
@@ -30,8 +33,12 @@ def unpack_batch(batch, use_cuda):
 
 class Trainer(object):
     """ A trainer for training models. """
-    def __init__(self, args=None, vocab=None, emb_matrix=None, model_file=None, use_cuda=False):
+    def __init__(self, args=None, vocab=None, emb_matrix=None, model_file=None, use_cuda=False, inference=False):
         self.use_cuda = use_cuda
+        self.inference = inference
+        self.model_file = model_file
+        self._fingerprint = None
+        self.lemma_cache = None
         if model_file is not None:
             # load everything from file
             self.load(model_file, use_cuda)
@@ -43,7 +50,16 @@ class Trainer(object):
             # dict-based components
             self.word_dict = dict()
             self.composite_dict = dict()
-        if not self.args['dict_only']:
+        if not self.args['dict_only'] and self.inference:
+            # prediction only, no loss, optimizer and gradients are needed
+            if use_cuda:
+                self.model.cuda()
+            else:
+                self.model.cpu()
+            utils.prepare_for_inference(self.model)
+            self.crit = None
+            self.optimizer = None
+        elif not self.args['dict_only']:
             if self.args.get('edit', False):
                 self.crit = loss.MixLoss(self.vocab['char'].size, self.args['alpha'])
                 logger.debug("Running seq2seq lemmatizer with edit classifier...")
@@ -58,8 +74,12 @@ class Trainer(object):
                 self.crit.cpu()
             self.optimizer = utils.get_optimizer(self.args['optim'], self.parameters, self.args['lr'])
 
+        if not self.args['dict_only']:
             if len(self.composite_dict) == 0 and args and 'pos_model_path' in args and args['pos_model_path'] is not None:
                 self.composite_dict = PosTrainer.load_inflectional_lexicon(args['pos_model_path'])
+                if not self.inference:
+                    # the lexicon is shared with the tagger, while training adds new entries to it
+                    self.composite_dict = dict(self.composite_dict)
         self.pos_lemma_pretag = args['pos_lemma_pretag']
 
     def update(self, batch, eval=False):
@@ -87,11 +107,13 @@ class Trainer(object):
         self.optimizer.step()
         return loss_val
 
+    @torch.inference_mode()
     def predict(self, batch, beam_size=1):
         inputs, orig_idx = unpack_batch(batch, self.use_cuda)
         src, src_mask, tgt, tgt_mask, pos, edits = inputs
 
-        self.model.eval()
+        if not self.inference:
+            self.model.eval()
         batch_size = src.size(0)
         preds, edit_logits = self.model.predict(src, src_mask, pos=pos, beam_size=beam_size)
         pred_seqs = [self.vocab['char'].unmap(ids) for ids in preds] # unmap to tokens
@@ -127,6 +149,46 @@ class Trainer(object):
                 final += [lem]
         return final
 
+    @property
+    def fingerprint(self):
+        """ The md5 digest of the model file, which identifies the model in the lemma cache. """
+        if self._fingerprint is None and self.model_file is not None:
+            md5 = hashlib.md5()
+            with open(self.model_file, 'rb') as fin:
+                for chunk in iter(lambda: fin.read(1 << 20), b''):
+                    md5.update(chunk)
+            self._fingerprint = md5.hexdigest()
+        return self._fingerprint
+
+    def enable_lemma_cache(self, max_size, filename=None):
+        """
+        Remember the lemmas predicted by the seq2seq model for up to max_size (form, xpos) pairs.  If filename is given,
+        the cache is read from it and saved to it when the process exits.  A cache enabled before is saved to its file
+        and replaced.
+        """
+        if self.fingerprint is None:
+            raise ValueError("The lemma cache can only be used with a model loaded from a file")
+        if self.lemma_cache is not None and self.lemma_cache.filename is not None:
+            # save the replaced cache now, so that it can be read by the new one and does not overwrite it at exit
+            atexit.unregister(self.lemma_cache.save)
+            self.lemma_cache.save()
+        self.lemma_cache = LemmaCache(max_size, filename)
+        if filename is not None:
+            atexit.register(self.lemma_cache.save)
+
+    def cached_lemma(self, pair, beam_size):
+        """ Return the lemma predicted before for a (form, xpos) pair, or None. """
+        if self.lemma_cache is None:
+            return None
+        return self.lemma_cache.get((pair[0], pair[1], self.fingerprint, beam_size))
+
+    def cache_lemmas(self, pairs, lemmas, beam_size):
+        """ Remember the lemmas predicted for (form, xpos) pairs. """
+        if self.lemma_cache is None:
+            return
+        for (w, pos), lemma in zip(pairs, lemmas):
+            self.lemma_cache.put((w, pos, self.fingerprint, beam_size), lemma)
+
     def update_lr(self, new_lr):
         utils.change_lr(self.optimizer, new_lr)
 
@@ -29,8 +29,9 @@ def unpack_batch(batch, use_cuda):
 
 class Trainer(object):
     """ A trainer for training models. """
-    def __init__(self, args=None, vocab=None, emb_matrix=None, model_file=None, use_cuda=False):
+    def __init__(self, args=None, vocab=None, emb_matrix=None, model_file=None, use_cuda=False, inference=False):
         self.use_cuda = use_cuda
+        self.inference = inference
         if model_file is not None:
             # load from file
             self.load(model_file, use_cuda)
@@ -39,7 +40,16 @@ class Trainer(object):
             self.model = None if args['dict_only'] else Seq2SeqModel(args, emb_matrix=emb_matrix)
             self.vocab = vocab
             self.expansion_dict = dict()
-        if not self.args['dict_only']:
+        if not self.args['dict_only'] and self.inference:
+            # prediction only, no loss, optimizer and gradients are needed
+            if use_cuda:
+                self.model.cuda()
+            else:
+                self.model.cpu()
+            utils.prepare_for_inference(self.model)
+            self.crit = None
+            self.optimizer = None
+        elif not self.args['dict_only']:
             self.crit = loss.SequenceLoss(self.vocab.size)
             self.parameters = [p for p in self.model.parameters() if p.requires_grad]
             if use_cuda:
@@ -70,11 +80,13 @@ class Trainer(object):
         self.optimizer.step()
         return loss_val
 
+    @torch.inference_mode()
     def predict(self, batch, unsort=True):
         inputs, orig_idx = unpack_batch(batch, self.use_cuda)
         src, src_mask, tgt, tgt_mask = inputs
 
-        self.model.eval()
+        if not self.inference:
+            self.model.eval()
         batch_size = src.size(0)
         preds, _ = self.model.predict(src, src_mask, self.args['beam_size'])
         pred_seqs = [self.vocab.unmap(ids) for ids in preds] # unmap to tokens
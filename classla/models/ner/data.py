@@ -2,7 +2,7 @@ import random
 import logging
 import torch
 
-from classla.models.common.data import map_to_ids, get_long_tensor, get_float_tensor, sort_all
+from classla.models.common.data import map_to_ids, get_long_tensor, get_float_tensor, sort_all, sort_word_types
 from classla.models.common.vocab import PAD_ID, VOCAB_PREFIX
 from classla.models.pos.vocab import CharVocab, WordVocab
 from classla.models.ner.vocab import TagVocab, MultiVocab
@@ -110,9 +110,15 @@ class DataLoader:
 
         # sort words by lens for easy char-RNN operations
         batch_words = [w for sent in batch[1] for w in sent]
-        wordlens = [len(x) for x in batch_words]
-        batch_words, word_orig_idx = sort_all([batch_words], wordlens)
-        batch_words = batch_words[0]
+        if self.eval:
+            # at inference every word type is encoded by the char-RNN only once
+            batch_words, word_type_idx = sort_word_types(batch_words)
+            word_orig_idx = None
+        else:
+            wordlens = [len(x) for x in batch_words]
+            batch_words, word_orig_idx = sort_all([batch_words], wordlens)
+            batch_words = batch_words[0]
+            word_type_idx = None
         wordlens = [len(x) for x in batch_words]
 
         # convert to tensors
@@ -126,7 +132,7 @@ class DataLoader:
         charoffsets = [charoffsets_forward, charoffsets_backward] # idx for forward and backward lm to get word representation
         tags = get_long_tensor(batch[2], batch_size)
 
-        return words, words_mask, wordchars, wordchars_mask, chars, tags, orig_idx, word_orig_idx, char_orig_idx, sentlens, wordlens, charlens, charoffsets
+        return words, words_mask, wordchars, wordchars_mask, chars, tags, orig_idx, word_orig_idx, char_orig_idx, sentlens, wordlens, charlens, charoffsets, word_type_idx
 
     def __iter__(self):
         for i in range(self.__len__()):
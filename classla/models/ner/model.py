@@ -76,7 +76,7 @@ class NERTagger(nn.Module):
             "Input embedding matrix must match size: {} x {}".format(vocab_size, dim)
         self.word_emb.weight.data.copy_(emb_matrix)
 
-    def forward(self, word, word_mask, wordchars, wordchars_mask, tags, word_orig_idx, sentlens, wordlens, chars, charoffsets, charlens, char_orig_idx):
+    def forward(self, word, word_mask, wordchars, wordchars_mask, tags, word_orig_idx, sentlens, wordlens, chars, charoffsets, charlens, char_orig_idx, word_type_idx=None):
         
         def pack(x):
             return pack_padded_sequence(x, sentlens, batch_first=True)
@@ -98,7 +98,7 @@ class NERTagger(nn.Module):
                 char_reps_backward = PackedSequence(char_reps_backward.data, char_reps_backward.batch_sizes)
                 inputs += [char_reps_forward, char_reps_backward]
             else:
-                char_reps = self.charmodel(wordchars, wordchars_mask, word_orig_idx, sentlens, wordlens)
+                char_reps = self.charmodel(wordchars, wordchars_mask, word_orig_idx, sentlens, wordlens, word_type_idx)
                 char_reps = PackedSequence(char_reps.data, char_reps.batch_sizes)
                 inputs += [char_reps]
 
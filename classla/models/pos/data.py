@@ -2,7 +2,7 @@ import random
 import logging
 import torch
 
-from classla.models.common.data import map_to_ids, get_long_tensor, get_float_tensor, sort_all
+from classla.models.common.data import map_to_ids, get_long_tensor, get_float_tensor, sort_all, sort_word_types
 from classla.models.common.vocab import PAD_ID, VOCAB_PREFIX
 from classla.models.pos.vocab import CharVocab, WordVocab, XPOSVocab, FeatureVocab, MultiVocab
 from classla.models.pos.xpos_vocab_factory import xpos_vocab_factory
@@ -92,9 +92,15 @@ class DataLoader:
 
         # sort words by lens for easy char-RNN operations
         batch_words = [w for sent in batch[1] for w in sent]
-        word_lens = [len(x) for x in batch_words]
-        batch_words, word_orig_idx = sort_all([batch_words], word_lens)
-        batch_words = batch_words[0]
+        if self.eval:
+            # at inference every word type is encoded by the char-RNN only once
+            batch_words, word_type_idx = sort_word_types(batch_words)
+            word_orig_idx = None
+        else:
+            word_lens = [len(x) for x in batch_words]
+            batch_words, word_orig_idx = sort_all([batch_words], word_lens)
+            batch_words = batch_words[0]
+            word_type_idx = None
         word_lens = [len(x) for x in batch_words]
 
         # convert to tensors
@@ -110,7 +116,7 @@ class DataLoader:
         pretrained = get_long_tensor(batch[5], batch_size)
         word_string = batch[6]
         sentlens = [len(x) for x in batch[0]]
-        return words, words_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, orig_idx, word_orig_idx, sentlens, word_lens, word_string
+        return words, words_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, orig_idx, word_orig_idx, sentlens, word_lens, word_string, word_type_idx
 
     def __iter__(self):
         for i in range(self.__len__()):
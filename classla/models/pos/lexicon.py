@@ -0,0 +1,416 @@
+"""
+Inflectional lexicon stored in the tagger model, shared by the POS tagger and the lemmatizer.
+
+The lexicon is kept in a compact array-backed form: every distinct string is stored once in a utf-8 string table with
+an open addressing hash index, the (form, xpos, upos, feats, lemma) entries are rows of string ids, and the entries of
+each lowercased form are listed in a contiguous range.  The arrays can be saved to a single file that is memory-mapped
+when loaded, so the lexicon is queried without building per-process dictionaries.
+"""
+import json
+import logging
+import os
+import threading
+import zlib
+from collections.abc import Mapping
+
+import numpy as np
+import torch
+
+logger = logging.getLogger('classla')
+
+FORM, XPOS, UPOS, FEATS, LEMMA = range(5)
+
+LEXICON_MAGIC = b'CLASSLA-LEXICON-1\n'
+LEXICON_SUFFIX = '.lexicon'
+# alignment of the arrays in a lexicon file
+ALIGNMENT = 64
+# marks keys which are not in a cache
+_MISSING = object()
+
+def _hash(encoded):
+    return zlib.crc32(encoded)
+
+class Lexicon:
+    """
+    The (form, xpos, upos, feats, lemma) entries of an inflectional lexicon together with lookup views over them.
+    Iterating over a Lexicon yields the entries as tuples, in their original order.
+    """
+
+    ARRAYS = ['string_data', 'string_offsets', 'string_index', 'entries', 'form_entries', 'form_starts']
+
+    def __init__(self, arrays, source=None):
+        for name in Lexicon.ARRAYS:
+            setattr(self, name, arrays[name])
+        # fingerprint of the model file the lexicon was converted from, see model_fingerprint
+        self.source = source
+        self._mask = len(self.string_index) - 1
+        self._string_bytes = memoryview(self.string_data)
+        self._lemma_lookup = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_entries(cls, entries):
+        """ Build a lexicon from a list of (form, xpos, upos, feats, lemma) tuples.  Missing values (None) are stored as '_'. """
+        strings = {}
+        rows = []
+        lower_forms = []
+        for entry in entries:
+            rows.append([strings.setdefault('_' if value is None else value, len(strings)) for value in entry[:5]])
+            lower_forms.append(strings.setdefault(entry[0].lower(), len(strings)))
+
+        encoded = [string.encode('utf-8') for string in strings]
+        string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(x) for x in encoded], out=string_offsets[1:])
+        string_data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        string_index = cls._build_index(np.array([_hash(x) for x in encoded], dtype=np.int64))
+
+        lower_forms = np.array(lower_forms, dtype=np.int32)
+        form_entries = np.argsort(lower_forms, kind='stable').astype(np.int32)
+        form_starts = np.zeros(len(strings) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(lower_forms, minlength=len(strings)), out=form_starts[1:])
+
+        return cls({'string_data': string_data,
+                    'string_offsets': string_offsets,
+                    'string_index': string_index,
+                    'entries': np.array(rows, dtype=np.int32).reshape(-1, 5),
+                    'form_entries': form_entries,
+                    'form_starts': form_starts})
+
+    @staticmethod
+    def _build_index(hashes):
+        """ Linear probing hash table of string ids, at most half full. """
+        size = 1
+        while size < 2 * len(hashes):
+            size *= 2
+        index = np.full(size, -1, dtype=np.int32)
+        pending = np.arange(len(hashes), dtype=np.int32)
+        slots = hashes & (size - 1)
+        while len(pending) > 0:
+            # of the strings probing a free slot, the first one takes it and the others probe the next slot
+            free = np.flatnonzero(index[slots] == -1)
+            taken_slots, first = np.unique(slots[free], return_index=True)
+            index[taken_slots] = pending[free[first]]
+            placed = np.zeros(len(pending), dtype=bool)
+            placed[free[first]] = True
+            pending = pending[~placed]
+            slots = (slots[~placed] + 1) & (size - 1)
+        return index
+
+    def save(self, filename, source=None):
+        """
+        Save the lexicon arrays to a file that can be memory-mapped by Lexicon.load, together with the fingerprint of
+        the model file the lexicon comes from, if given.
+        """
+        header = {'source': source}
+        offset = 0
+        for name in Lexicon.ARRAYS:
+            array = getattr(self, name)
+            header[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        header = json.dumps(header).encode('utf-8')
+        start = -(-(len(LEXICON_MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+        with open(filename, 'wb') as fout:
+            fout.write(LEXICON_MAGIC)
+            fout.write(len(header).to_bytes(8, 'little'))
+            fout.write(header)
+            for name in Lexicon.ARRAYS:
+                array = np.ascontiguousarray(getattr(self, name))
+                fout.write(b'\0' * (start - fout.tell()))
+                fout.write(array.tobytes())
+                start += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    @classmethod
+    def load(cls, filename):
+        """ Memory-map a lexicon saved with Lexicon.save. """
+        with open(filename, 'rb') as fin:
+            if fin.read(len(LEXICON_MAGIC)) != LEXICON_MAGIC:
+                raise ValueError("{} is not an inflectional lexicon file".format(filename))
+            header_length = int.from_bytes(fin.read(8), 'little')
+            header = json.loads(fin.read(header_length).decode('utf-8'))
+        start = -(-(len(LEXICON_MAGIC) + 8 + header_length) // ALIGNMENT) * ALIGNMENT
+        arrays = {}
+        for name in Lexicon.ARRAYS:
+            spec = header[name]
+            shape = tuple(spec['shape'])
+            if np.prod(shape) == 0:
+                arrays[name] = np.zeros(shape, dtype=spec['dtype'])
+            else:
+                # plain array views of the mapping, indexing an np.memmap is considerably slower
+                arrays[name] = np.asarray(np.memmap(filename, dtype=spec['dtype'], mode='r', offset=start + spec['offset'], shape=shape))
+        logger.debug("Loaded inflectional lexicon from {}".format(filename))
+        return cls(arrays, header.get('source'))
+
+    def string(self, string_id):
+        return str(self._string_bytes[self.string_offsets[string_id]:self.string_offsets[string_id + 1]], 'utf-8')
+
+    def string_id(self, string):
+        """ Id of a string in the string table, -1 if the lexicon does not contain it. """
+        if not isinstance(string, str):
+            return -1
+        encoded = string.encode('utf-8')
+        slot = _hash(encoded) & self._mask
+        while True:
+            string_id = self.string_index[slot]
+            if string_id == -1:
+                return -1
+            if self._string_bytes[self.string_offsets[string_id]:self.string_offsets[string_id + 1]] == encoded:
+                return int(string_id)
+            slot = (slot + 1) & self._mask
+
+    def candidates(self, form):
+        """ Rows of string ids of the entries whose lowercased form is form, in their original order. """
+        form_id = self.string_id(form)
+        if form_id == -1:
+            return self.entries[:0]
+        start, end = self.form_starts[form_id:form_id + 2].tolist()
+        return self.entries[self.form_entries[start:end]]
+
+    def __iter__(self):
+        for row in self.entries:
+            yield tuple(self.string(string_id) for string_id in row)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lemma_lookup(self):
+        """ Mapping from (form, xpos) to the lemma of the first matching entry, as used by the lemmatizer. """
+        with self._lock:
+            if self._lemma_lookup is None:
+                self._lemma_lookup = LemmaView(self)
+        return self._lemma_lookup
+
+    def hypothesis_view(self, key_fields, value_field, accept=None, convert=None):
+        """
+        Mapping from a lowercased form, or a tuple of a lowercased form and the values of further key_fields, to the
+        list of values of value_field of all matching entries, keeping duplicates and the order of the entries.
+        Only values for which accept returns True are listed; convert is applied to the listed values.
+        """
+        return HypothesisView(self, key_fields, value_field, accept, convert)
+
+
+class HypothesisView(Mapping):
+    """ Read-only mapping over the candidate entries of a lexicon, see Lexicon.hypothesis_view. """
+
+    CACHE_SIZE = 100000
+
+    def __init__(self, lexicon, key_fields, value_field, accept=None, convert=None):
+        assert key_fields[0] == FORM, 'The key of a hypothesis view starts with the form'
+        self.lexicon = lexicon
+        self.key_fields = tuple(key_fields)
+        self.value_field = value_field
+        self.accept = accept
+        self.convert = convert
+        # decoded and filtered values, by string id
+        self._values = {}
+        self._cache = {}
+
+    def _value(self, string_id):
+        if string_id not in self._values:
+            value = self.lexicon.string(string_id)
+            if self.accept is not None and not self.accept(value):
+                value = None
+            elif self.convert is not None:
+                value = self.convert(value)
+            self._values[string_id] = value
+        return self._values[string_id]
+
+    def _lookup(self, key):
+        key = (key,) if len(self.key_fields) == 1 else key
+        rows = self.lexicon.candidates(key[0])
+        if len(rows) == 0:
+            return None
+        conditions = [(field, self.lexicon.string_id(value)) for field, value in zip(self.key_fields[1:], key[1:])]
+        values = [self._value(row[self.value_field]) for row in rows.tolist()
+                  if all(row[field] == value_id for field, value_id in conditions)]
+        values = [value for value in values if value is not None]
+        return values if values else None
+
+    def get(self, key, default=None):
+        # frequent words are looked up over and over, so recent results are kept; the views are shared between
+        # threads, so the cache is read once, as another thread may clear it in between
+        values = self._cache.get(key, _MISSING)
+        if values is _MISSING:
+            values = self._lookup(key)
+            if len(self._cache) >= self.CACHE_SIZE:
+                self._cache.clear()
+            self._cache[key] = values
+        return default if values is None else values
+
+    def __getitem__(self, key):
+        values = self.get(key)
+        if values is None:
+            raise KeyError(key)
+        return values
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        seen = set()
+        for form_id in np.flatnonzero(np.diff(self.lexicon.form_starts)).tolist():
+            form = self.lexicon.string(form_id)
+            for row in self.lexicon.candidates(form).tolist():
+                key = (form,) + tuple(self.lexicon.string(row[field]) for field in self.key_fields[1:])
+                key = key[0] if len(key) == 1 else key
+                if key not in seen and key in self:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class LemmaView(Mapping):
+    """ Read-only mapping from (form, xpos) to the lemma of the first matching entry of a lexicon. """
+
+    CACHE_SIZE = 100000
+
+    def __init__(self, lexicon):
+        self.lexicon = lexicon
+        self._keys = None
+        self._cache = {}
+
+    def get(self, key, default=None):
+        # the lemmatizer looks up the same words over and over, so recent results are kept (read once, see
+        # HypothesisView.get)
+        lemma = self._cache.get(key, _MISSING)
+        if lemma is _MISSING:
+            lemma = self._lookup(key)
+            if len(self._cache) >= self.CACHE_SIZE:
+                self._cache.clear()
+            self._cache[key] = lemma
+        return default if lemma is None else lemma
+
+    def _lookup(self, key):
+        form, xpos = key
+        form_id = self.lexicon.string_id(form)
+        xpos_id = self.lexicon.string_id(xpos)
+        if form_id == -1 or xpos_id == -1:
+            return None
+        rows = self.lexicon.candidates(form.lower())
+        matches = np.flatnonzero((rows[:, FORM] == form_id) & (rows[:, XPOS] == xpos_id))
+        if len(matches) == 0:
+            return None
+        return self.lexicon.string(rows[matches[0], LEMMA])
+
+    def __getitem__(self, key):
+        lemma = self.get(key)
+        if lemma is None:
+            raise KeyError(key)
+        return lemma
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def _first_entries(self):
+        if self._keys is None:
+            entries = self.lexicon.entries.astype(np.int64)
+            _, first = np.unique(entries[:, FORM] * len(self.lexicon.string_offsets) + entries[:, XPOS], return_index=True)
+            self._keys = np.sort(first)
+        return self._keys
+
+    def __iter__(self):
+        for row in self.lexicon.entries[self._first_entries()].tolist():
+            yield self.lexicon.string(row[FORM]), self.lexicon.string(row[XPOS])
+
+    def __len__(self):
+        return len(self._first_entries())
+
+
+def lexicon_filename(model_file):
+    """ Name of the memory-mappable lexicon file of a tagger model, e.g. standard.lexicon for standard.pt """
+    base = model_file[:-3] if model_file.endswith('.pt') else model_file
+    return base + LEXICON_SUFFIX
+
+def model_fingerprint(model_file):
+    """ Size and modification time of a model file, stored in its lexicon file to tell if the model was replaced """
+    stat = os.stat(model_file)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def convert_lexicon(model_file):
+    """ Save the lexicon of a tagger model file to a memory-mappable lexicon file next to it. Returns its name. """
+    checkpoint = torch.load(model_file, lambda storage, loc: storage, weights_only=False)
+    assert 'dicts' in checkpoint, Exception('Can not load inflectional dictionary. Make sure that your tagger model has it.')
+    filename = lexicon_filename(model_file)
+    Lexicon.from_entries(checkpoint['dicts']).save(filename, model_fingerprint(model_file))
+    return filename
+
+def _load_lexicon_file(model_file):
+    """
+    Load the lexicon file next to a tagger model file.  Returns None if there is none, or if it was not converted from
+    the model file as it is now, in which case the lexicon has to be built from the model.
+    """
+    filename = lexicon_filename(model_file)
+    if not os.path.exists(filename):
+        return None
+    lexicon = Lexicon.load(filename)
+    if lexicon.source != model_fingerprint(model_file):
+        logger.warning("The lexicon file {} does not match the model {}, which was replaced after the lexicon was converted. "
+                       "Using the lexicon of the model instead; convert it again with classla.utils.convert_lexicon.".format(filename, model_file))
+        return None
+    return lexicon
+
+
+# process-wide registry of lexicons, keyed by the resolved path and modification time of the tagger model file
+_shared_lexicons = {}
+_shared_lexicons_lock = threading.Lock()
+
+def _lexicon_key(filename):
+    path = os.path.realpath(filename)
+    mtimes = [os.path.getmtime(f) for f in (path, lexicon_filename(path)) if os.path.exists(f)]
+    return path, max(mtimes) if mtimes else None
+
+def _register(key, lexicon):
+    with _shared_lexicons_lock:
+        if key not in _shared_lexicons:
+            for stale_key in [k for k in _shared_lexicons if k[0] == key[0]]:
+                del _shared_lexicons[stale_key]
+            _shared_lexicons[key] = lexicon
+        return _shared_lexicons[key]
+
+def _registered(key):
+    with _shared_lexicons_lock:
+        return _shared_lexicons.get(key)
+
+def register_lexicon(filename, entries):
+    """
+    Register the lexicon of the tagger model file filename, given the entries read from it, and return the shared
+    Lexicon.  An already registered lexicon or the memory-mappable lexicon file next to the model, if it was converted
+    from the model as it is now, take precedence over entries.  Returns None if there is no lexicon at all.
+    """
+    key = _lexicon_key(filename)
+    lexicon = _registered(key)
+    if lexicon is not None:
+        return lexicon
+    lexicon = _load_lexicon_file(filename)
+    if lexicon is not None:
+        return _register(key, lexicon)
+    if entries is None:
+        return None
+    return _register(key, Lexicon.from_entries(entries))
+
+def load_lexicon(filename):
+    """
+    Return the shared Lexicon of the tagger model file filename.  The model file is only read if its lexicon was not
+    registered yet, e.g. by the POS processor of the same pipeline, and there is no up-to-date lexicon file next to it.
+    """
+    key = _lexicon_key(filename)
+    lexicon = _registered(key)
+    if lexicon is not None:
+        return lexicon
+    lexicon = _load_lexicon_file(filename)
+    if lexicon is not None:
+        return _register(key, lexicon)
+
+    try:
+        checkpoint = torch.load(filename, lambda storage, loc: storage, weights_only=False)
+    except BaseException:
+        logger.error("Cannot load model from {}".format(filename))
+        raise
+    assert 'dicts' in checkpoint, Exception('Can not load inflectional dictionary. Make sure that your tagger model has it.')
+    return _register(key, Lexicon.from_entries(checkpoint['dicts']))
+
+def clear_lexicons():
+    """ Forget all shared lexicons, so that they are loaded again on the next request. """
+    with _shared_lexicons_lock:
+        _shared_lexicons.clear()
@@ -1,6 +1,10 @@
 import sys
 import unicodedata
 
+import torch
+
+from classla.models.pos.lexicon import Lexicon, FORM, XPOS, UPOS, FEATS
+
 
 class InflectionalLexiconProcessor(object):
     def __init__(self, lexicon, vocab, pretrain, pos_lemma_pretag=False):
@@ -31,53 +35,45 @@ class InflectionalLexiconProcessor(object):
         self.closed_classes_xpos_inverse = [vocab['xpos'][el] for el in vocab['xpos'] if
                                        vocab['xpos'][el] not in self.closed_classes_xpos]
 
-    def process_xpos(self, padded_prediction, word_strings):
-        predictions = []
-
-        max_value = padded_prediction.max(2)[1]
+    @staticmethod
+    def allowed_tags(padded_prediction, closed_classes):
+        """ Mask of the tags each word may get: all tags except the closed classes. """
+        allowed = torch.ones(padded_prediction.size(-1), dtype=torch.bool, device=padded_prediction.device)
+        if closed_classes:
+            allowed[list(closed_classes)] = False
+        return allowed.expand(padded_prediction.shape).clone()
+
+    @staticmethod
+    def restrict_tags(allowed, candidates):
+        """ Only allow the candidate tags to the given words, candidates maps (sent_id, word_id) to a list of tag ids. """
+        if not candidates:
+            return
+        words = torch.tensor(list(candidates), dtype=torch.long, device=allowed.device)
+        allowed[words[:, 0], words[:, 1]] = False
+        tags = torch.tensor([(sent_id, word_id, tag) for (sent_id, word_id), word_tags in candidates.items() for tag in word_tags],
+                            dtype=torch.long, device=allowed.device)
+        allowed[tags[:, 0], tags[:, 1], tags[:, 2]] = True
+
+    @staticmethod
+    def masked_argmax(padded_prediction, allowed):
+        """ Id of the best allowed tag of each word, as nested lists. """
+        return padded_prediction.masked_fill(~allowed, float('-inf')).argmax(2).tolist()
 
-        for sent_id, (sent_indices, sent_strings) in enumerate(zip(max_value, word_strings)):
-            sent_predictions = []
-            for word_id, (word_prediction, word_string) in enumerate(zip(sent_indices, sent_strings)):
-                if word_prediction.item() not in self.closed_classes_xpos:
-                    prediction = self.xpos_vocab[word_prediction.item()]
-                else:
-                    prediction = self.xpos_vocab[self.closed_classes_xpos_inverse[
-                        padded_prediction[sent_id, word_id, self.closed_classes_xpos_inverse].argmax().item()]]
-                sent_predictions.append(prediction)
-            predictions.append(sent_predictions)
-        return predictions
+    def process_xpos(self, padded_prediction, word_strings):
+        allowed = self.allowed_tags(padded_prediction, self.closed_classes_xpos)
+        best = self.masked_argmax(padded_prediction, allowed)
+        return [self.xpos_vocab.unmap(sent_best[:len(sent_strings)]) for sent_best, sent_strings in zip(best, word_strings)]
 
     def process_upos(self, padded_prediction, word_strings, xpos_preds):
-        predictions = []
-
-        max_value = padded_prediction.max(2)[1]
-
-        for sent_id, (sent_indices, sent_strings) in enumerate(zip(max_value, word_strings)):
-            sent_predictions = []
-            for word_id, (word_prediction, word_string) in enumerate(zip(sent_indices, sent_strings)):
-                if word_prediction.item() not in self.closed_classes_upos:
-                    prediction = self.upos_vocab[word_prediction.item()]
-                else:
-                    prediction = self.upos_vocab[self.closed_classes_upos_inverse[
-                        padded_prediction[sent_id, word_id, self.closed_classes_upos_inverse].argmax().item()]]
-                sent_predictions.append(prediction)
-            predictions.append(sent_predictions)
-        return predictions
+        allowed = self.allowed_tags(padded_prediction, self.closed_classes_upos)
+        best = self.masked_argmax(padded_prediction, allowed)
+        return [self.upos_vocab.unmap(sent_best[:len(sent_strings)]) for sent_best, sent_strings in zip(best, word_strings)]
 
     def process_feats(self, padded_prediction, word_strings, xpos_preds, upos_preds):
-        predictions = []
-
-        for sent_id, (sent_strings, sent_xpos, sent_upos) in enumerate(zip(word_strings, xpos_preds, upos_preds)):
-            sent_predictions = []
-            for word_id in range(len(sent_strings)):
-                word_feat = []
-                for feat_id in range(len(padded_prediction)):
-                    word_feat.append(padded_prediction[feat_id][sent_id, word_id].item())
-                prediction = self.feats_vocab[word_feat]
-                sent_predictions.append(prediction)
-            predictions.append(sent_predictions)
-        return predictions
+        feats = torch.cat(padded_prediction, 2)
+        units = self.feats_vocab.unmap_many(feats.reshape(-1, feats.size(-1)))
+        return [units[sent_id * feats.size(1):sent_id * feats.size(1) + len(sent_strings)]
+                for sent_id, sent_strings in enumerate(word_strings)]
 
     def create_closed_classes_xpos(self, vocab, closed_classes_rules):
         """ Fills a set of closed classes, that contains xpos ids that are not permitted. """
@@ -112,79 +108,58 @@ class SloveneInflectionalLexiconProcessor(InflectionalLexiconProcessor):
         self.closed_classes_upos_inverse = [vocab['upos'][el] for el in vocab['upos'] if vocab['upos'][el] not in self.closed_classes_upos]
 
     def process_xpos(self, padded_prediction, word_strings):
-        predictions = []
-
-        max_value = padded_prediction.max(2)[1]
-
-        for sent_id, (sent_indices, sent_strings) in enumerate(zip(max_value, word_strings)):
-            sent_predictions = []
-            for word_id, (word_prediction, word_string) in enumerate(zip(sent_indices, sent_strings)):
-                if word_string in self.hypothesis_dictionary_xpos:
-                    # if only one possible prediction in hypothesis dictionary, take it!
-                    if len(self.hypothesis_dictionary_xpos[word_string]) == 1:
-                        prediction = self.hypothesis_dictionary_xpos[word_string][0]
-                    elif self.xpos_vocab[word_prediction.item()] in self.hypothesis_dictionary_xpos[word_string]:
-                        prediction = self.xpos_vocab[word_prediction.item()]
-                    else:
-                        optional_indices = [self.xpos_vocab[el] for el in self.hypothesis_dictionary_xpos[word_string]]
-                        prediction = self.xpos_vocab[optional_indices[padded_prediction[sent_id, word_id, optional_indices].argmax().item()]]
-                elif word_string in self.hypothesis_dictionary_xpos_fallback:
-                    prediction = self.hypothesis_dictionary_xpos_fallback[word_string][0]
-                else:
-                    if word_prediction.item() not in self.closed_classes_xpos:
-                        prediction = self.xpos_vocab[word_prediction.item()]
-                    else:
-                        prediction = self.xpos_vocab[self.closed_classes_xpos_inverse[padded_prediction[sent_id, word_id, self.closed_classes_xpos_inverse].argmax().item()]]
-                sent_predictions.append(prediction)
-            predictions.append(sent_predictions)
+        # words in the lexicon get one of their tags from the lexicon, if any of them is known to the tagger, or else
+        # the first of the unknown tags; the other words may get any tag but the closed classes
+        allowed = self.allowed_tags(padded_prediction, self.closed_classes_xpos)
+        candidates = {}
+        fallbacks = {}
+        for sent_id, sent_strings in enumerate(word_strings):
+            for word_id, word_string in enumerate(sent_strings):
+                hypotheses = self.hypothesis_dictionary_xpos.get(word_string)
+                if hypotheses is not None:
+                    candidates[sent_id, word_id] = [self.xpos_vocab[el] for el in hypotheses]
+                    continue
+                fallback = self.hypothesis_dictionary_xpos_fallback.get(word_string)
+                if fallback is not None:
+                    fallbacks[sent_id, word_id] = fallback[0]
+        self.restrict_tags(allowed, candidates)
+        best = self.masked_argmax(padded_prediction, allowed)
+
+        predictions = [self.xpos_vocab.unmap(sent_best[:len(sent_strings)]) for sent_best, sent_strings in zip(best, word_strings)]
+        for (sent_id, word_id), prediction in fallbacks.items():
+            predictions[sent_id][word_id] = prediction
         return predictions
 
     def process_upos(self, padded_prediction, word_strings, upos_preds):
-        predictions = []
-
-        max_value = padded_prediction.max(2)[1]
-
-        for sent_id, (sent_indices, sent_strings, sent_upos) in enumerate(zip(max_value, word_strings, upos_preds)):
-            sent_predictions = []
-            for word_id, (word_prediction, word_string, word_upos) in enumerate(zip(sent_indices, sent_strings, sent_upos)):
+        allowed = self.allowed_tags(padded_prediction, self.closed_classes_upos)
+        candidates = {}
+        fallbacks = {}
+        for sent_id, (sent_strings, sent_upos) in enumerate(zip(word_strings, upos_preds)):
+            for word_id, (word_string, word_upos) in enumerate(zip(sent_strings, sent_upos)):
                 key_tuple = (word_string, word_upos)
-                if key_tuple in self.hypothesis_dictionary_upos:
-                    # if only one possible prediction in hypothesis dictionary, take it!
-                    if len(self.hypothesis_dictionary_upos[key_tuple]) == 1:
-                        prediction = self.hypothesis_dictionary_upos[key_tuple][0]
-                    elif self.upos_vocab[word_prediction.item()] in self.hypothesis_dictionary_upos[key_tuple]:
-                        prediction = self.upos_vocab[word_prediction.item()]
-                    else:
-                        optional_indices = [self.upos_vocab[el] for el in self.hypothesis_dictionary_upos[key_tuple]]
-                        prediction = self.upos_vocab[optional_indices[padded_prediction[sent_id, word_id, optional_indices].argmax().item()]]
-                elif key_tuple in self.hypothesis_dictionary_upos_fallback:
-                    prediction = self.hypothesis_dictionary_upos_fallback[key_tuple][0]
-                else:
-                    # prediction = self.upos_vocab[padded_prediction[sent_id, word_id].argmax().item()]
-                    if word_prediction.item() not in self.closed_classes_upos:
-                        prediction = self.upos_vocab[word_prediction.item()]
-                    else:
-                        prediction = self.upos_vocab[self.closed_classes_upos_inverse[
-                            padded_prediction[sent_id, word_id, self.closed_classes_upos_inverse].argmax().item()]]
-                sent_predictions.append(prediction)
-            predictions.append(sent_predictions)
+                hypotheses = self.hypothesis_dictionary_upos.get(key_tuple)
+                if hypotheses is not None:
+                    candidates[sent_id, word_id] = [self.upos_vocab[el] for el in hypotheses]
+                    continue
+                fallback = self.hypothesis_dictionary_upos_fallback.get(key_tuple)
+                if fallback is not None:
+                    fallbacks[sent_id, word_id] = fallback[0]
+        self.restrict_tags(allowed, candidates)
+        best = self.masked_argmax(padded_prediction, allowed)
+
+        predictions = [self.upos_vocab.unmap(sent_best[:len(sent_strings)]) for sent_best, sent_strings in zip(best, word_strings)]
+        for (sent_id, word_id), prediction in fallbacks.items():
+            predictions[sent_id][word_id] = prediction
         return predictions
 
     def process_feats(self, padded_prediction, word_strings, xpos_preds, upos_preds):
+        feats = torch.cat(padded_prediction, 2).tolist()
         predictions = []
-
-        for sent_id, (sent_strings, sent_xpos, sent_upos) in enumerate(zip(word_strings, xpos_preds, upos_preds)):
+        for sent_feats, sent_strings, sent_xpos, sent_upos in zip(feats, word_strings, xpos_preds, upos_preds):
             sent_predictions = []
-            for word_id, (word_string, word_xpos, word_upos) in enumerate(zip(sent_strings, sent_xpos, sent_upos)):
-                key_tuple = (word_string, word_xpos, word_upos)
-                if key_tuple in self.hypothesis_dictionary_feats:
-                    prediction = self.hypothesis_dictionary_feats[key_tuple][0]
-                else:
-                    word_feat = []
-                    for feat_id in range(len(padded_prediction)):
-                        word_feat.append(padded_prediction[feat_id][sent_id, word_id].item())
-                    prediction = self.feats_vocab[word_feat]
-                sent_predictions.append(prediction)
+            for word_feat, word_string, word_xpos, word_upos in zip(sent_feats, sent_strings, sent_xpos, sent_upos):
+                hypotheses = self.hypothesis_dictionary_feats.get((word_string, word_xpos, word_upos))
+                sent_predictions.append(hypotheses[0] if hypotheses is not None else self.feats_vocab[word_feat])
             predictions.append(sent_predictions)
         return predictions
 
@@ -195,19 +170,17 @@ class SloveneInflectionalLexiconProcessor(InflectionalLexiconProcessor):
         """ Creates hypothesis dictionary from lexicon. """
         if lexicon is None:
             raise Exception("Inflectional lexicon is only supported for Slovenian standard models. If you are using other models, set `pos_use_lexicon` to `False` (or remove it). Otherwise, you have to re-download Slovenian models. You can do this by using the following command: classla.download('sl')")
-        for key in lexicon:
-            if key[1] in self.xpos_vocab:
-                self.hypothesis_dictionary_xpos.setdefault(key[0].lower(), []).append(key[1])
-            else:
-                self.hypothesis_dictionary_xpos_fallback.setdefault(key[0].lower(), []).append(key[1])
-
-            if key[2] in self.upos_vocab:
-                self.hypothesis_dictionary_upos.setdefault((key[0].lower(), key[1]), []).append(key[2])
-            else:
-                self.hypothesis_dictionary_upos_fallback.setdefault((key[0].lower(), key[1]), []).append(key[2])
-
-            feats = self.convert_feats(key[3]) if key[3] else '_'
-            self.hypothesis_dictionary_feats.setdefault((key[0].lower(), key[1], key[2]), []).append(feats)
+        if not isinstance(lexicon, Lexicon):
+            lexicon = Lexicon.from_entries(lexicon)
+        # read-only views over the shared lexicon, built lazily per looked up form
+        in_xpos_vocab = lambda xpos: xpos in self.xpos_vocab
+        in_upos_vocab = lambda upos: upos in self.upos_vocab
+        self.hypothesis_dictionary_xpos = lexicon.hypothesis_view((FORM,), XPOS, accept=in_xpos_vocab)
+        self.hypothesis_dictionary_xpos_fallback = lexicon.hypothesis_view((FORM,), XPOS, accept=lambda xpos: not in_xpos_vocab(xpos))
+        self.hypothesis_dictionary_upos = lexicon.hypothesis_view((FORM, XPOS), UPOS, accept=in_upos_vocab)
+        self.hypothesis_dictionary_upos_fallback = lexicon.hypothesis_view((FORM, XPOS), UPOS, accept=lambda upos: not in_upos_vocab(upos))
+        self.hypothesis_dictionary_feats = lexicon.hypothesis_view((FORM, XPOS, UPOS), FEATS,
+                                                                   convert=lambda feats: self.convert_feats(feats) if feats else '_')
 
 
 processors = {"ssj": SloveneInflectionalLexiconProcessor, "sl_ssj": SloveneInflectionalLexiconProcessor}
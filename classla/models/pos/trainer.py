@@ -9,8 +9,10 @@ from torch import nn
 
 from classla.models.common.trainer import Trainer as BaseTrainer
 from classla.models.common import utils, loss
+from classla.models.common.vocab import CompositeVocab
 from classla.models.pos.model import Tagger
 from classla.models.pos.postprocessor import InflectionalLexicon, DefaultPostprocessor
+from classla.models.pos.lexicon import load_lexicon, register_lexicon
 from classla.models.pos.vocab import MultiVocab
 
 logger = logging.getLogger('classla')
@@ -26,13 +28,20 @@ def unpack_batch(batch, use_cuda):
     sentlens = batch[10]
     wordlens = batch[11]
     word_string = batch[12]
-    return inputs, orig_idx, word_orig_idx, sentlens, wordlens, word_string
+    word_type_idx = batch[13]
+    return inputs, orig_idx, word_orig_idx, sentlens, wordlens, word_string, word_type_idx
+
+def unmap_padded(vocab, preds):
+    """ Decode a [batch, len, parts] tensor of composite predictions to lists of units, one list per sentence. """
+    units = vocab.unmap_many(preds.reshape(-1, preds.size(-1)))
+    return [units[i:i + preds.size(1)] for i in range(0, len(units), preds.size(1))]
 
 
 class Trainer(BaseTrainer):
     """ A trainer for training models. """
-    def __init__(self, args=None, vocab=None, pretrain=None, model_file=None, use_cuda=False):
+    def __init__(self, args=None, vocab=None, pretrain=None, model_file=None, use_cuda=False, inference=False):
         self.use_cuda = use_cuda
+        self.inference = inference
         if model_file is not None:
             # load everything from file
             self.load(model_file, pretrain)
@@ -61,10 +70,15 @@ class Trainer(BaseTrainer):
             self.model.cuda()
         else:
             self.model.cpu()
-        self.optimizer = utils.get_optimizer(self.args['optim'], self.parameters, self.args['lr'], betas=(0.9, self.args['beta2']), eps=1e-6)
+        if self.inference:
+            # prediction only, no optimizer and no gradients are needed
+            utils.prepare_for_inference(self.model)
+            self.optimizer = None
+        else:
+            self.optimizer = utils.get_optimizer(self.args['optim'], self.parameters, self.args['lr'], betas=(0.9, self.args['beta2']), eps=1e-6)
 
     def update(self, batch, eval=False):
-        inputs, orig_idx, word_orig_idx, sentlens, wordlens, word_string = unpack_batch(batch, self.use_cuda)
+        inputs, orig_idx, word_orig_idx, sentlens, wordlens, word_string, word_type_idx = unpack_batch(batch, self.use_cuda)
         word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained = inputs
 
         if eval:
@@ -72,7 +86,7 @@ class Trainer(BaseTrainer):
         else:
             self.model.train()
             self.optimizer.zero_grad()
-        loss, _ = self.model(word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, word_orig_idx, sentlens, wordlens, word_string)
+        loss, _ = self.model(word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, word_orig_idx, sentlens, wordlens, word_string, word_type_idx=word_type_idx)
         loss_val = loss.data.item()
         if eval:
             return loss_val
@@ -82,21 +96,26 @@ class Trainer(BaseTrainer):
         self.optimizer.step()
         return loss_val
 
+    @torch.inference_mode()
     def predict(self, batch, unsort=True):
-        inputs, orig_idx, word_orig_idx, sentlens, wordlens, word_string = unpack_batch(batch, self.use_cuda)
+        inputs, orig_idx, word_orig_idx, sentlens, wordlens, word_string, word_type_idx = unpack_batch(batch, self.use_cuda)
         word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained = inputs
 
-        self.model.eval()
+        if not self.inference:
+            self.model.eval()
         batch_size = word.size(0)
-        _, preds = self.model(word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, word_orig_idx, sentlens, wordlens, word_string, postprocessor=self.postprocessor)
+        _, preds = self.model(word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, word_orig_idx, sentlens, wordlens, word_string, postprocessor=self.postprocessor, word_type_idx=word_type_idx)
 
         # upos_seqs = [self.vocab['upos'].unmap(sent) for sent in preds[0].tolist()]
         # feats_seqs = [self.vocab['feats'].unmap(sent) for sent in preds[2].tolist()]
 
         if self.postprocessor is None:
             upos_seqs = [self.vocab['upos'].unmap(sent) for sent in preds[0].tolist()]
-            xpos_seqs = [self.vocab['xpos'].unmap(sent) for sent in preds[1].tolist()]
-            feats_seqs = [self.vocab['feats'].unmap(sent) for sent in preds[2].tolist()]
+            if isinstance(self.vocab['xpos'], CompositeVocab):
+                xpos_seqs = unmap_padded(self.vocab['xpos'], preds[1])
+            else:
+                xpos_seqs = [self.vocab['xpos'].unmap(sent) for sent in preds[1].tolist()]
+            feats_seqs = unmap_padded(self.vocab['feats'], preds[2])
         else:
             upos_seqs = preds[0]
             xpos_seqs = preds[1]
@@ -148,20 +167,9 @@ class Trainer(BaseTrainer):
             emb_matrix = pretrain.emb
         self.model = Tagger(self.args, self.vocab, emb_matrix=emb_matrix, share_hid=self.args['share_hid'])
         self.model.load_state_dict(checkpoint['model'], strict=False)
-        self.dict = checkpoint['dicts'] if 'dicts' in checkpoint else None
+        self.dict = register_lexicon(filename, checkpoint['dicts']) if 'dicts' in checkpoint else None
 
     @staticmethod
     def load_inflectional_lexicon(filename):
-        try:
-            checkpoint = torch.load(filename, lambda storage, loc: storage, weights_only=False)
-        except BaseException:
-            logger.error("Cannot load model from {}".format(filename))
-            raise
-
-        inf_lexicon = {}
-        assert 'dicts' in checkpoint, Exception('Can not load inflectional dictionary. Make sure that your tagger model has it.')
-        for entry in checkpoint['dicts']:
-            if (entry[0], entry[1]) not in inf_lexicon:
-                inf_lexicon[(entry[0], entry[1])] = entry[4]
-
-        return inf_lexicon
+        """ Dictionary from (form, xpos) to lemma of the inflectional lexicon in a tagger model file, shared within the process. """
+        return load_lexicon(filename).lemma_lookup()
@@ -24,8 +24,9 @@ def unpack_batch(batch, use_cuda):
 
 class Trainer(BaseTrainer):
     """ A trainer for training models. """
-    def __init__(self, args=None, vocab=None, pretrain=None, model_file=None, use_cuda=False):
+    def __init__(self, args=None, vocab=None, pretrain=None, model_file=None, use_cuda=False, inference=False):
         self.use_cuda = use_cuda
+        self.inference = inference
         if model_file is not None:
             # load everything from file
             self.load(model_file, pretrain=pretrain, args=args)
@@ -40,7 +41,12 @@ class Trainer(BaseTrainer):
             self.model.cuda()
         else:
             self.model.cpu()
-        self.optimizer = utils.get_optimizer(self.args['optim'], self.parameters, self.args['lr'], betas=(0.9, self.args['beta2']), eps=1e-6)
+        if self.inference:
+            # prediction only, no optimizer and no gradients are needed
+            utils.prepare_for_inference(self.model)
+            self.optimizer = None
+        else:
+            self.optimizer = utils.get_optimizer(self.args['optim'], self.parameters, self.args['lr'], betas=(0.9, self.args['beta2']), eps=1e-6)
 
     def update(self, batch, eval=False):
         inputs, orig_idx, sentlens = unpack_batch(batch, self.use_cuda)
@@ -61,11 +67,13 @@ class Trainer(BaseTrainer):
         self.optimizer.step()
         return loss_val
 
+    @torch.inference_mode()
     def predict(self, batch, unsort=True):
         inputs, orig_idx, sentlens = unpack_batch(batch, self.use_cuda)
         words, words_mask, deprel, head_words, xpos, lemma, head_lemma, head_xpos, pretrained, head_pretrained, srl = inputs
 
-        self.model.eval()
+        if not self.inference:
+            self.model.eval()
         batch_size = words.size(0)
         _, preds = self.model(words, words_mask, deprel, head_words, xpos, lemma, head_lemma, head_xpos, pretrained, head_pretrained, srl, orig_idx, sentlens)
 
@@ -0,0 +1,116 @@
+"""
+asyncio front-end of a pipeline that merges concurrent requests into batches
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+
+from classla.models.common.doc import Document
+
+logger = logging.getLogger('classla')
+
+
+class AsyncPipeline:
+    """
+    Wraps a Pipeline for use from asyncio code, e.g. a web server handling many small concurrent requests.
+
+    Documents submitted with `aprocess` are collected until either `max_latency` seconds have passed since the first
+    waiting document or the waiting documents reach `max_tokens` tokens.  The collected documents are then processed
+    together with `Pipeline.bulk_process` in a background thread, so the model batches are filled across requests
+    and the event loop is never blocked.
+    """
+
+    def __init__(self, pipeline, max_latency=0.01, max_tokens=5000):
+        """
+        Args:
+            pipeline: a loaded Pipeline
+            max_latency: longest time in seconds a document waits for other documents to join its batch
+            max_tokens: estimated number of tokens at which a batch is processed without further waiting
+        """
+        self._pipeline = pipeline
+        self._max_latency = max_latency
+        self._max_tokens = max_tokens
+        self._pending = []
+        self._pending_tokens = 0
+        self._timer = None
+        # the batches being processed, awaited by close
+        self._tasks = set()
+        # the processors are not thread safe, so batches are processed one at a time
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    @property
+    def pipeline(self):
+        return self._pipeline
+
+    @staticmethod
+    def estimate_tokens(doc):
+        """ Cheap estimate of the number of tokens in a document, used to limit the size of a batch """
+        if isinstance(doc, str):
+            return len(doc.split())
+        elif isinstance(doc, Document):
+            return doc.num_tokens
+        return sum(len(sent.split()) if isinstance(sent, str) else len(sent) for sent in doc)
+
+    async def aprocess(self, doc):
+        """ Process a single document (str, list or Document) and return the processed Document """
+        assert any([isinstance(doc, str), isinstance(doc, list),
+                    isinstance(doc, Document)]), 'input should be either str, list or Document'
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((doc, future))
+        self._pending_tokens += self.estimate_tokens(doc)
+        if self._pending_tokens >= self._max_tokens:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_latency, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        if batch:
+            task = asyncio.ensure_future(self._process_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _process_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        docs = [doc for doc, _ in batch]
+        try:
+            results = await loop.run_in_executor(self._executor, self._pipeline.bulk_process, docs)
+        except Exception as e:
+            if len(batch) == 1:
+                results = [e]
+            else:
+                # find the failing documents by processing the batch one document at a time
+                logger.debug(f'Processing a batch of {len(batch)} documents failed, retrying one by one.')
+                results = []
+                for doc in docs:
+                    try:
+                        results += await loop.run_in_executor(self._executor, self._pipeline.bulk_process, [doc])
+                    except Exception as doc_exception:
+                        results.append(doc_exception)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                # the caller is no longer waiting for this document
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def close(self):
+        """ Process the waiting documents, wait for all batches to finish and release the background thread """
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
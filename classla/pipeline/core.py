@@ -2,8 +2,10 @@
 Pipeline that runs tokenize,mwt,pos,lemma,depparse
 """
 
+import gc
 import io
 import itertools
+import multiprocessing
 import sys
 import torch
 import logging
@@ -13,6 +15,7 @@ import os
 from distutils.util import strtobool
 from classla.pipeline._constants import *
 from classla.models.common.doc import Document
+from classla.models.common.pretrain import shared_pretrain_report
 from classla.pipeline.processor import Processor, ProcessorRequirementsException
 from classla.pipeline.registry import NAME_TO_PROCESSOR_CLASS, PIPELINE_NAMES
 from classla.pipeline.tokenize_processor import TokenizeProcessor
@@ -29,6 +32,17 @@ from classla.utils.helper_func import make_table
 
 logger = logging.getLogger('classla')
 
+# pipeline inherited by the forked workers of Pipeline.process_many
+_worker_pipeline = None
+
+
+def _init_worker(num_threads):
+    torch.set_num_threads(num_threads)
+
+
+def _bulk_process_in_worker(docs):
+    return _worker_pipeline.bulk_process(docs)
+
 
 class PipelineRequirementsException(Exception):
     """
@@ -125,6 +139,10 @@ class Pipeline:
             logger.info('\n')
             raise PipelineRequirementsException(pipeline_reqs_exceptions)
 
+        for item in shared_pretrain_report():
+            if item['saved'] > 0:
+                logger.debug(f"Pretrain {item['file']} is shared by {item['requests']} processors, "
+                             f"saving {item['saved'] / 1024 ** 2:.1f} MB.")
         logger.info("Done loading processors!")
 
     def update_kwargs(self, kwargs, processor_list):
@@ -162,6 +180,82 @@ class Pipeline:
                 doc = self.processors[processor_name].process(doc)
         return doc
 
+    def bulk_process(self, docs):
+        """ Run the pipeline over a list of documents, letting each processor batch across document boundaries. """
+        for processor_name in PIPELINE_NAMES:
+            if self.processors.get(processor_name):
+                docs = self.processors[processor_name].bulk_process(docs)
+        return docs
+
+    def stream(self, docs, batch_size=50):
+        """
+        Lazily process an iterable of documents, yielding the processed documents in input order.
+        Consecutive documents are grouped by `batch_size` and processed together with `bulk_process`.
+        """
+        docs = iter(docs)
+        while True:
+            chunk = list(itertools.islice(docs, batch_size))
+            if not chunk:
+                break
+            for doc in chunk:
+                assert any([isinstance(doc, str), isinstance(doc, list),
+                            isinstance(doc, Document)]), 'input should be either str, list or Document'
+            yield from self.bulk_process(chunk)
+
+    def process_many(self, docs, n_workers=None, batch_size=50, worker_threads=1):
+        """
+        Process a list of documents with a pool of `n_workers` worker processes and return the processed documents
+        in input order.  The workers are forked from this process and inherit the loaded models, so the model
+        weights are shared copy-on-write instead of being loaded again by every worker.
+
+        Forking requires the fork start method and is not possible with models on the gpu, as CUDA cannot be used
+        in forked processes; in both cases the documents are processed in this process.  The torch (OpenMP) thread
+        pool of this process may already be running when the workers are forked, and a forked worker that starts
+        more torch threads of its own can deadlock, so every worker runs `worker_threads` torch threads, one by
+        default.  More threads per worker are at the risk of the caller.
+        """
+        docs = list(docs)
+        n_workers = n_workers if n_workers is not None else os.cpu_count()
+        chunks = [docs[i:i+batch_size] for i in range(0, len(docs), batch_size)]
+        if n_workers > 1 and self.use_gpu:
+            logger.warning('Processing with multiple workers is not supported on gpu, using a single process.')
+            n_workers = 1
+        if n_workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            logger.warning('Processing with multiple workers requires the fork start method, using a single process.')
+            n_workers = 1
+        if n_workers <= 1 or len(chunks) <= 1:
+            return list(self.stream(docs, batch_size=batch_size))
+
+        for doc in docs:
+            assert any([isinstance(doc, str), isinstance(doc, list),
+                        isinstance(doc, Document)]), 'input should be either str, list or Document'
+        global _worker_pipeline
+        _worker_pipeline = self
+        # keep the garbage collector from touching (and thereby copying) the inherited objects in the workers
+        gc.collect()
+        gc.freeze()
+        try:
+            with multiprocessing.get_context('fork').Pool(n_workers, initializer=_init_worker, initargs=(worker_threads,)) as pool:
+                processed = [doc for chunk in pool.imap(_bulk_process_in_worker, chunks) for doc in chunk]
+        finally:
+            gc.unfreeze()
+            _worker_pipeline = None
+        return processed
+
+    def close(self):
+        """
+        Release the resources the processors started for processing, such as pools of workers.  The pipeline can
+        still be used afterwards, the resources are started again when needed.
+        """
+        for processor in self.loaded_processors:
+            processor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def __call__(self, doc):
         assert any([isinstance(doc, str), isinstance(doc, list),
                     isinstance(doc, Document)]), 'input should be either str, list or Document'
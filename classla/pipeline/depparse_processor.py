@@ -2,10 +2,9 @@
 Processor for performing dependency parsing
 """
 
-from classla.models.common import doc
-from classla.models.common.pretrain import Pretrain
-from classla.models.common.utils import unsort
-from classla.models.depparse.data import DataLoader
+from classla.models.common.pretrain import load_shared_pretrain
+from classla.models.common.utils import fold_pretrained_projection, unsort
+from classla.models.depparse.data import DataLoader, padding_counts, padding_stats
 from classla.models.depparse.trainer import Trainer
 from classla.pipeline._constants import *
 from classla.pipeline.processor import UDProcessor, register_processor
@@ -21,6 +20,7 @@ class DepparseProcessor(UDProcessor):
 
     def __init__(self, config, pipeline, use_gpu):
         self._pretagged = None
+        self._padding_counts = None
         super().__init__(config, pipeline, use_gpu)
 
     def _set_up_requires(self):
@@ -31,19 +31,65 @@ class DepparseProcessor(UDProcessor):
             self._requires = self.__class__.REQUIRES_DEFAULT
 
     def _set_up_model(self, config, use_gpu):
-        self._pretrain = Pretrain(config['pretrain_path']) if 'pretrain_path' in config else None
-        self._trainer = Trainer(pretrain=self.pretrain, model_file=config['model_path'], use_cuda=use_gpu)
+        self._pretrain = load_shared_pretrain(config['pretrain_path']) if 'pretrain_path' in config else None
+        self._trainer = Trainer(pretrain=self.pretrain, model_file=config['model_path'], use_cuda=use_gpu, inference=True)
+
+        # fold the projection of the pretrained embeddings into the embedding table
+        fold_pretrained = config.get('fold_pretrained', 'auto')
+        if fold_pretrained:
+            fold_pretrained_projection(self._trainer.model, force=fold_pretrained != 'auto')
+
+        self._set_up_char_cache(config)
+
+        # decode the trees of a batch in parallel
+        decode_workers = config.get('decode_workers', 0)
+        if decode_workers >= 2:
+            self._trainer.set_decode_workers(decode_workers, config.get('decode_pool', 'thread'))
 
     def process(self, document):
+        window_size = self.config.get('window_size', None)
         batch = DataLoader(document, self.config['batch_size'], self.config, self.pretrain, vocab=self.vocab, evaluation=True,
-                           sort_during_eval=self.config.get('sort_during_eval', True), max_sentence_size=self.config.get('max_sentence_size', None))
+                           sort_during_eval=self.config.get('sort_during_eval', True), max_sentence_size=self.config.get('max_sentence_size', None),
+                           max_batch_arcs=self.config.get('max_batch_arcs', None), window_size=window_size,
+                           window_overlap=self.config.get('window_overlap', None))
+        self._add_padding_counts(padding_counts(batch.data))
         preds = []
+        scores = []
         for i, b in enumerate(batch):
-            preds += self.trainer.predict(b)
+            if batch.window_flags is None:
+                preds += self.trainer.predict(b)
+            else:
+                batch_preds, batch_scores = self.trainer.predict(b, score_sentences=batch.window_flags[i])
+                preds += batch_preds
+                scores += batch_scores
         if batch.data_orig_idx is not None:
             preds = unsort(preds, batch.data_orig_idx)
-        batch.doc.set([doc.HEAD, doc.DEPREL], [y for x in preds for y in x])
-        # build dependencies based on predictions
-        for sentence in batch.doc.sentences:
-            sentence.build_dependencies()
+            scores = unsort(scores, batch.data_orig_idx) if scores else scores
+        if batch.window_flags is not None:
+            preds = batch.join_window_preds(preds, scores)
+        # set the predictions and build the dependencies of every sentence in one pass
+        for sentence, dependencies in zip(batch.doc.sentences, preds):
+            sentence.set_dependencies(dependencies)
         return batch.doc
+
+    def close(self):
+        if self._trainer is not None:
+            self._trainer.shutdown_decode_workers()
+
+    def mark_inactive(self):
+        self.close()
+        super().mark_inactive()
+
+    def _add_padding_counts(self, counts):
+        if self._padding_counts is None:
+            self._padding_counts = counts
+            return
+        for key, value in counts.items():
+            if key == 'max_batch_arcs':
+                self._padding_counts[key] = max(self._padding_counts[key], value)
+            else:
+                self._padding_counts[key] += value
+
+    def padding_stats(self):
+        """ The padding of the batches of all documents parsed so far, None before the first one. """
+        return padding_stats(self._padding_counts) if self._padding_counts is not None else None
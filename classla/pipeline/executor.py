@@ -0,0 +1,152 @@
+"""
+Executor that runs the processors of a pipeline concurrently, one thread per processor
+"""
+
+import itertools
+import logging
+import queue
+import threading
+
+from classla.models.common.doc import Document
+from classla.pipeline.registry import PIPELINE_NAMES
+
+logger = logging.getLogger('classla')
+
+# marks the end of the input in the stage queues
+_END = object()
+
+
+class _StageError:
+    """ Exception raised by a stage, passed downstream in place of the documents that caused it """
+
+    def __init__(self, stage, exception):
+        self.stage = stage
+        self.exception = exception
+
+
+class PipelinedExecutor:
+    """
+    Runs every loaded processor of a pipeline in its own worker thread.  The stages are connected by bounded queues,
+    so while one chunk of documents is being tagged the next one can already be tokenized.  A full queue blocks the
+    stage that feeds it, which limits the number of documents held in memory (backpressure).
+    """
+
+    def __init__(self, pipeline, max_queue_size=4, batch_size=1):
+        """
+        Args:
+            pipeline: a loaded Pipeline
+            max_queue_size: number of chunks that may wait in front of each stage
+            batch_size: number of documents passed through the stages together (see Processor.bulk_process)
+        """
+        assert max_queue_size > 0, 'max_queue_size must be positive'
+        assert batch_size > 0, 'batch_size must be positive'
+        self._pipeline = pipeline
+        self._max_queue_size = max_queue_size
+        self._batch_size = batch_size
+        self._stage_names = [processor_name for processor_name in PIPELINE_NAMES if pipeline.processors.get(processor_name)]
+        self._queues = None
+        self._max_depths = {}
+        self._lock = threading.Lock()
+
+    @property
+    def stage_names(self):
+        """ Names of the processors run by this executor, in execution order """
+        return list(self._stage_names)
+
+    def queue_depths(self):
+        """ Number of chunks currently waiting in front of each stage, plus the finished chunks not yet consumed """
+        if self._queues is None:
+            return {}
+        return {name: q.qsize() for name, q in zip(self._queue_names(), self._queues)}
+
+    def max_queue_depths(self):
+        """ Largest number of chunks observed waiting in front of each stage during the last run """
+        with self._lock:
+            return dict(self._max_depths)
+
+    def _queue_names(self):
+        return self._stage_names + ['output']
+
+    def _put(self, idx, item, stop):
+        q = self._queues[idx]
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            depth = q.qsize()
+            name = self._queue_names()[idx]
+            with self._lock:
+                if depth > self._max_depths.get(name, 0):
+                    self._max_depths[name] = depth
+            return True
+        return False
+
+    def _get(self, idx, stop):
+        q = self._queues[idx]
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _feed(self, docs, stop):
+        docs = iter(docs)
+        try:
+            while True:
+                chunk = list(itertools.islice(docs, self._batch_size))
+                if not chunk:
+                    break
+                for doc in chunk:
+                    assert any([isinstance(doc, str), isinstance(doc, list),
+                                isinstance(doc, Document)]), 'input should be either str, list or Document'
+                if not self._put(0, chunk, stop):
+                    return
+        except Exception as e:
+            self._put(0, _StageError('input', e), stop)
+        self._put(0, _END, stop)
+
+    def _run_stage(self, idx, stop):
+        processor = self._pipeline.processors[self._stage_names[idx]]
+        while True:
+            chunk = self._get(idx, stop)
+            if chunk is _END:
+                break
+            if not isinstance(chunk, _StageError):
+                try:
+                    chunk = processor.bulk_process(chunk)
+                except Exception as e:
+                    chunk = _StageError(self._stage_names[idx], e)
+            if not self._put(idx + 1, chunk, stop):
+                return
+        self._put(idx + 1, _END, stop)
+
+    def process(self, docs):
+        """
+        Lazily process an iterable of documents, yielding the processed documents in input order.
+        An exception raised by any stage is re-raised here.
+        """
+        self._queues = [queue.Queue(maxsize=self._max_queue_size) for _ in range(len(self._stage_names) + 1)]
+        with self._lock:
+            self._max_depths = {name: 0 for name in self._queue_names()}
+        stop = threading.Event()
+        threads = [threading.Thread(target=self._feed, args=(docs, stop), daemon=True)]
+        threads += [threading.Thread(target=self._run_stage, args=(idx, stop), daemon=True)
+                    for idx in range(len(self._stage_names))]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                chunk = self._get(len(self._stage_names), stop)
+                if chunk is _END:
+                    break
+                if isinstance(chunk, _StageError):
+                    logger.error(f'Pipelined processing failed in stage: {chunk.stage}')
+                    raise chunk.exception
+                yield from chunk
+        finally:
+            # also releases the worker threads if the caller stops consuming early
+            stop.set()
+            for thread in threads:
+                thread.join()
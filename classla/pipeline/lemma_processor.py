@@ -36,7 +36,10 @@ class LemmaProcessor(UDProcessor):
         else:
             self._use_identity = False
             # add pos_model_path for inf. lexicon load and pos_lemma_pretag to see wether lemmas are transfered or not
-            self._trainer = Trainer(args={'pos_model_path': self.pipeline.config['pos_model_path'], 'pos_lemma_pretag': self.pipeline.processors['pos'].config['lemma_pretag']}, model_file=config['model_path'], use_cuda=use_gpu)
+            self._trainer = Trainer(args={'pos_model_path': self.pipeline.config['pos_model_path'], 'pos_lemma_pretag': self.pipeline.processors['pos'].config['lemma_pretag']}, model_file=config['model_path'], use_cuda=use_gpu, inference=True)
+            # remember the seq2seq lemmas across documents, e.g. with lemma_cache_size and lemma_cache_path
+            if config.get('cache_size') and not self._trainer.args['dict_only']:
+                self._trainer.enable_lemma_cache(config['cache_size'], config.get('cache_path'))
 
     def _set_up_requires(self):
         if self.config.get('pos') and not self.use_identity:
@@ -44,48 +47,77 @@ class LemmaProcessor(UDProcessor):
         else:
             self._requires = LemmaProcessor.REQUIRES_DEFAULT
 
-    def process(self, document):
-        if not self.use_identity:
-            batch = DataLoader(document, self.config['batch_size'], self.config, vocab=self.vocab, evaluation=True)
-        else:
-            batch = DataLoader(document, self.config['batch_size'], self.config, evaluation=True, conll_only=True)
-        if self.use_identity:
-            preds = [word.text for sent in batch.doc.sentences for word in sent.words]
-        elif self.config.get('dict_only', False):
-            preds = self.trainer.predict_dict(batch.doc.get([doc.TEXT, doc.XPOS]))
+    def lemma_cache_stats(self):
+        """ Return the statistics of the cache of seq2seq lemmas, or None if it is not used. """
+        if self.trainer is None or self.trainer.lemma_cache is None:
+            return None
+        return self.trainer.lemma_cache.stats()
+
+    @staticmethod
+    def unique_pairs(pairs, skip, lookup=None):
+        """
+        Find the words left for the seq2seq model: the first occurrence of each (form, xpos) pair that is not skipped
+        and for which lookup, if given, returns None.  Returns the skip mask of the seq2seq model and a dict from the
+        pairs to the lemmas found by lookup, with None for the pairs left for the model.
+        """
+        seq2seq_skip = [True] * len(pairs)
+        pair_lemmas = {}
+        for i, (pair, s) in enumerate(zip(pairs, skip)):
+            if s or pair in pair_lemmas:
+                continue
+            pair_lemmas[pair] = lookup(pair) if lookup is not None else None
+            if pair_lemmas[pair] is None:
+                seq2seq_skip[i] = False
+        return seq2seq_skip, pair_lemmas
+
+    def predict_seq2seq(self, document, words, pairs):
+        """ Lemmatize the words, given as [text, xpos, lemma] lists and (text, xpos) pairs, with the seq2seq model. """
+        ensemble_dict = self.config.get('ensemble_dict', False)
+        if ensemble_dict:
+            # skip the seq2seq model when we can
+            triples = [(w[0].lower(), w[1], w[2]) for w in words]
+            skip = self.trainer.skip_seq2seq(triples)
         else:
-            if self.config.get('ensemble_dict', False):
-                # skip the seq2seq model when we can
-                skip = self.trainer.skip_seq2seq([(e[0].lower(),e[1],e[2]) for e in batch.doc.get([doc.TEXT, doc.XPOS, doc.LEMMA])])
-                seq2seq_batch = DataLoader(document, self.config['batch_size'], self.config, vocab=self.vocab,
-                                           evaluation=True, skip=skip)
-            else:
-                seq2seq_batch = batch
+            skip = [False] * len(words)
 
-            preds = []
-            edits = []
-            for i, b in enumerate(seq2seq_batch):
-                ps, es = self.trainer.predict(b, self.config['beam_size'])
-                preds += ps
-                if es is not None:
-                    edits += es
+        # run the seq2seq model once per distinct (form, xpos) pair that was not lemmatized before
+        beam_size = self.config['beam_size']
+        seq2seq_skip, pair_lemmas = self.unique_pairs(pairs, skip, lambda pair: self.trainer.cached_lemma(pair, beam_size))
+        seq2seq_words = [list(w) for w, s in zip(words, seq2seq_skip) if not s]
+        seq2seq_batch = DataLoader(document, self.config['batch_size'], self.config, vocab=self.vocab, evaluation=True,
+                                   data=seq2seq_words)
 
-            if self.config.get('ensemble_dict', False):
-                preds = self.trainer.postprocess([x for x, y in zip(batch.doc.get([doc.TEXT]), skip) if not y], preds, edits=edits)
-                # expand seq2seq predictions to the same size as all words
-                i = 0
-                preds1 = []
-                for s in skip:
-                    if s:
-                        preds1.append('')
-                    else:
-                        preds1.append(preds[i])
-                        i += 1
-                preds = self.trainer.ensemble([(e[0].lower(),e[1],e[2]) for e in batch.doc.get([doc.TEXT, doc.XPOS, doc.LEMMA])], preds1)
+        preds = []
+        edits = []
+        for b in seq2seq_batch:
+            ps, es = self.trainer.predict(b, beam_size)
+            preds += ps
+            if es is not None:
+                edits += es
+        new_pairs = [pair for pair, s in zip(pairs, seq2seq_skip) if not s]
+        preds = self.trainer.postprocess([pair[0] for pair in new_pairs], preds, edits=edits)
+        pair_lemmas.update(zip(new_pairs, preds))
+        self.trainer.cache_lemmas(new_pairs, preds, beam_size)
+
+        if ensemble_dict:
+            # the words resolved by the dictionary get an empty seq2seq prediction
+            preds = [pair_lemmas[pair] if not s else '' for pair, s in zip(pairs, skip)]
+            return self.trainer.ensemble(triples, preds)
+        return [pair_lemmas[pair] for pair in pairs]
+
+    def process(self, document):
+        if self.use_identity:
+            preds = [word.text for sent in document.sentences for word in sent.words]
+        else:
+            # the fields of all words are extracted once, the rest of the lemma stage works on these columns
+            words = document.get([doc.TEXT, doc.XPOS, doc.LEMMA])
+            pairs = [(w[0], w[1]) for w in words]
+            if self.config.get('dict_only', False):
+                preds = self.trainer.predict_dict(pairs)
             else:
-                preds = self.trainer.postprocess(batch.doc.get([doc.TEXT]), preds, edits=edits)
+                preds = self.predict_seq2seq(document, words, pairs)
 
         # map empty string lemmas to '_'
         preds = [max([(len(x), x), (0, '_')])[1] for x in preds]
-        batch.doc.set([doc.LEMMA], preds)
-        return batch.doc
+        document.set([doc.LEMMA], preds)
+        return document
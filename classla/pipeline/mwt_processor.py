@@ -18,7 +18,7 @@ class MWTProcessor(UDProcessor):
     REQUIRES_DEFAULT = set([TOKENIZE])
 
     def _set_up_model(self, config, use_gpu):
-        self._trainer = Trainer(model_file=config['model_path'], use_cuda=use_gpu)
+        self._trainer = Trainer(model_file=config['model_path'], use_cuda=use_gpu, inference=True)
 
     def process(self, document):
         batch = DataLoader(document, self.config['batch_size'], self.config, vocab=self.vocab, evaluation=True)
@@ -40,3 +40,7 @@ class MWTProcessor(UDProcessor):
 
         batch.doc.set_mwt_expansions(preds)
         return batch.doc
+
+    def bulk_process(self, docs):
+        """ MWT expansion rebuilds the sentences of a document, so documents are expanded one at a time. """
+        return [self.process(doc) for doc in docs]
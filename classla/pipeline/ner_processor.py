@@ -23,7 +23,8 @@ class NERProcessor(UDProcessor):
     def _set_up_model(self, config, use_gpu):
         # set up trainer
         args = {'charlm_forward_file': config['forward_charlm_path'], 'charlm_backward_file': config['backward_charlm_path']}
-        self._trainer = Trainer(args=args, model_file=config['model_path'], use_cuda=use_gpu)
+        self._trainer = Trainer(args=args, model_file=config['model_path'], use_cuda=use_gpu, inference=True)
+        self._set_up_char_cache(config)
 
     def process(self, document):
         # set up a eval-only data loader and skip tag preprocessing
@@ -37,3 +38,10 @@ class NERProcessor(UDProcessor):
         total = len(batch.doc.build_ents())
         logger.debug(f'{total} entities found in document.')
         return batch.doc
+
+    def bulk_process(self, docs):
+        """ Tag all documents at once, then collect the entities of each document separately. """
+        docs = super().bulk_process(docs)
+        for document in docs:
+            document.build_ents()
+        return docs
@@ -4,8 +4,8 @@ Processor for performing part-of-speech tagging
 import os
 
 from classla.models.common import doc
-from classla.models.common.pretrain import Pretrain
-from classla.models.common.utils import unsort
+from classla.models.common.pretrain import load_shared_pretrain
+from classla.models.common.utils import fold_pretrained_projection, unsort
 from classla.models.pos.data import DataLoader
 from classla.models.pos.trainer import Trainer
 from classla.pipeline._constants import *
@@ -21,7 +21,7 @@ class POSProcessor(UDProcessor):
 
     def _set_up_model(self, config, use_gpu):
         # get pretrained word vectors
-        self._pretrain = Pretrain(config['pretrain_path']) if 'pretrain_path' in config else None
+        self._pretrain = load_shared_pretrain(config['pretrain_path']) if 'pretrain_path' in config else None
 
         if 'lemma_pretag' in self.config:
             pos_lemma_pretag = self.config['lemma_pretag']
@@ -36,7 +36,14 @@ class POSProcessor(UDProcessor):
             arg['use_lexicon'] = True
 
         # set up trainer
-        self._trainer = Trainer(args=arg, pretrain=self.pretrain, model_file=config['model_path'], use_cuda=use_gpu)
+        self._trainer = Trainer(args=arg, pretrain=self.pretrain, model_file=config['model_path'], use_cuda=use_gpu, inference=True)
+
+        # fold the projection of the pretrained embeddings into the embedding table
+        fold_pretrained = config.get('fold_pretrained', 'auto')
+        if fold_pretrained:
+            fold_pretrained_projection(self._trainer.model, force=fold_pretrained != 'auto')
+
+        self._set_up_char_cache(config)
 
     def predetermined_punctuations(self, seq):
         """ Determine if punctuation is already assigned by tokenizer. """
@@ -4,6 +4,7 @@ Base classes for processors
 
 from abc import ABC, abstractmethod
 
+from classla.models.common.doc import Document
 from classla.pipeline.registry import NAME_TO_PROCESSOR_CLASS, PIPELINE_NAMES, PROCESSOR_VARIANTS
 
 class ProcessorRequirementsException(Exception):
@@ -73,6 +74,14 @@ class Processor(ABC):
         """ Process a Document.  This is the main method of a processor. """
         pass
 
+    def bulk_process(self, docs):
+        """ Process a list of Documents.  Default is to process them one at a time. """
+        return [self.process(doc) for doc in docs]
+
+    def close(self):
+        """ Release the resources started for processing, such as pools of workers.  Default is to do nothing. """
+        pass
+
     def _set_up_provides(self):
         """ Set up what processor requirements this processor fulfills.  Default is to use a class defined list. """
         self._provides = self.__class__.PROVIDES_DEFAULT
@@ -152,6 +161,21 @@ class UDProcessor(Processor):
     def _set_up_model(self, config, gpu):
         pass
 
+    def bulk_process(self, docs):
+        """ Process a list of Documents as one, so that model batches may span document boundaries.
+
+        The sentences of the input documents are annotated in place, so the documents themselves are returned.
+        """
+        if hasattr(self, '_variant') or not all(isinstance(doc, Document) for doc in docs):
+            # raw text is processed one document at a time
+            return super().bulk_process(docs)
+        combined_doc = Document([])
+        combined_doc.sentences = [sentence for doc in docs for sentence in doc.sentences]
+        combined_doc.num_tokens = sum(doc.num_tokens for doc in docs)
+        combined_doc.num_words = sum(doc.num_words for doc in docs)
+        self.process(combined_doc)
+        return docs
+
     def _set_up_final_config(self, config):
         """ Finalize the configurations for this processor, based off of values from a UD model. """
         # set configurations from loaded model
@@ -164,6 +188,17 @@ class UDProcessor(Processor):
         loaded_args.update(config)
         self._config = loaded_args
 
+    def _set_up_char_cache(self, config):
+        """ Cache the character representations of words across batches if a size is given, e.g. pos_char_cache_size """
+        charmodel = getattr(self._trainer.model, 'charmodel', None)
+        if charmodel is not None and (config.get('char_cache_size') or config.get('char_cache_mb')):
+            charmodel.enable_cache(config.get('char_cache_size'), config.get('char_cache_mb'))
+
+    def char_cache_stats(self):
+        """ Return the statistics of the cache of character representations, or None if it is not used. """
+        charmodel = getattr(self._trainer.model, 'charmodel', None) if self._trainer is not None else None
+        return charmodel.cache_stats() if charmodel is not None else None
+
     def mark_inactive(self):
         """ Drop memory intensive resources if keeping this processor around for reasons other than running it. """
         self._trainer = None
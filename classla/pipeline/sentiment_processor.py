@@ -9,10 +9,13 @@ TODO: a possible way to generalize this would be to make it a
 ClassifierProcessor and have "sentiment" be an option.
 """
 
+import torch
+
 import classla.models.classifiers.cnn_classifier as cnn_classifier
 
 from classla.models.common import doc
-from classla.models.common.pretrain import Pretrain
+from classla.models.common import utils
+from classla.models.common.pretrain import load_shared_pretrain
 from classla.pipeline._constants import *
 from classla.pipeline.processor import UDProcessor, register_processor
 
@@ -25,7 +28,7 @@ class SentimentProcessor(UDProcessor):
 
     def _set_up_model(self, config, use_gpu):
         # get pretrained word vectors
-        self._pretrain = Pretrain(config['pretrain_path'])
+        self._pretrain = load_shared_pretrain(config['pretrain_path'])
         # set up model
         self._model = cnn_classifier.load(filename=config['model_path'], pretrain=self._pretrain)
         self._batch_size = config.get('batch_size', None)
@@ -33,11 +36,13 @@ class SentimentProcessor(UDProcessor):
         # TODO: move this call to load()
         if use_gpu:
             self._model.cuda()
+        utils.prepare_for_inference(self._model)
 
     def process(self, document):
         sentences = document.sentences
         text = [" ".join(token.text for token in sentence.tokens) for sentence in sentences]
-        labels = cnn_classifier.label_text(self._model, text, batch_size=self._batch_size)
+        with torch.inference_mode():
+            labels = cnn_classifier.label_text(self._model, text, batch_size=self._batch_size)
         # TODO: allow a classifier processor for any attribute, not just sentiment
         document.set(SENTIMENT, labels, to_sentence=True)
         return document
@@ -4,13 +4,13 @@ Processor for performing named entity tagging.
 import logging
 
 from classla.models.common import doc
-from classla.models.common.utils import unsort
+from classla.models.common.utils import fold_pretrained_projection, unsort
 from classla.models.srl.data import DataLoader
 from classla.models.srl.trainer import Trainer
 from classla.pipeline._constants import *
 from classla.pipeline.processor import UDProcessor, register_processor
 
-from classla.models.common.pretrain import Pretrain
+from classla.models.common.pretrain import load_shared_pretrain
 
 logger = logging.getLogger('classla')
 
@@ -25,12 +25,17 @@ class SRLProcessor(UDProcessor):
 
     def _set_up_model(self, config, use_gpu):
         # get pretrained word vectors
-        self._pretrain = Pretrain(config['pretrain_path']) if 'pretrain_path' in config else None
+        self._pretrain = load_shared_pretrain(config['pretrain_path']) if 'pretrain_path' in config else None
 
         arg = {}
 
         # set up trainer
-        self._trainer = Trainer(args=arg, pretrain=self.pretrain, model_file=config['model_path'], use_cuda=use_gpu)
+        self._trainer = Trainer(args=arg, pretrain=self.pretrain, model_file=config['model_path'], use_cuda=use_gpu, inference=True)
+
+        # fold the projection of the pretrained embeddings into the embedding table
+        fold_pretrained = config.get('fold_pretrained', 'auto')
+        if fold_pretrained:
+            fold_pretrained_projection(self._trainer.model, force=fold_pretrained != 'auto')
 
     def predetermined_punctuations(self, seq):
         """ Determine if punctuation is already assigned by tokenizer. """
@@ -70,6 +70,10 @@ class TokenizeProcessor(UDProcessor):
 
         return CoNLL.conll2dict(input_str=input_src, generate_raw_text=True)
 
+    def bulk_process(self, docs):
+        """ Tokenize each of the texts on its own, as the inputs are raw text rather than Documents. """
+        return [self.process(doc) for doc in docs]
+
     def process(self, document):
         assert isinstance(document, str) or (self.config.get('pretokenized') or self.config.get('no_ssplit', False)), \
             "If neither 'pretokenized' or 'no_ssplit' option is enabled, the input to the TokenizerProcessor must be a string."
@@ -0,0 +1,24 @@
+"""
+This script saves the inflectional lexicon of tagger models (.pt) to the compact memory-mappable lexicon format, written
+next to the model file.  The tagger and the lemmatizer use this file automatically when it is present, so the lexicon
+is shared between processes through the OS page cache and no lookup dictionaries are built at start-up.
+"""
+
+import argparse
+
+from classla.models.pos.lexicon import convert_lexicon
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert the inflectional lexicon of tagger models to the memory-mappable format.")
+    parser.add_argument('filenames', nargs='+', help='Tagger .pt files with an inflectional lexicon.')
+    args = parser.parse_args()
+    return args
+
+def main():
+    args = parse_args()
+    for filename in args.filenames:
+        lexicon_file = convert_lexicon(filename)
+        print("Converted the lexicon of {} to {}.".format(filename, lexicon_file))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""
+This script converts pretrain files saved with torch (.pt) to the memory-mapped format: a raw .npy embedding matrix
+plus a vocab file, written next to the original file.  Pretrain loads the new format automatically when it is present,
+so worker processes share the embedding matrix through the OS page cache instead of each unpickling a private copy.
+"""
+
+import argparse
+
+import numpy as np
+
+from classla.models.common.pretrain import convert_to_mmap
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert .pt pretrain files to the memory-mapped format.")
+    parser.add_argument('filenames', nargs='+', help='Pretrain .pt files to convert.')
+    parser.add_argument('--dtype', default='float32', choices=['float32', 'float16'],
+                        help='Type of the saved matrix. float16 halves the file, but is converted to float32 on load '
+                             'and then no longer shared between processes.')
+    args = parser.parse_args()
+    return args
+
+def main():
+    args = parse_args()
+    for filename in args.filenames:
+        emb_file, vocab_file = convert_to_mmap(filename, dtype=np.dtype(args.dtype))
+        print("Converted {} to {} and {}.".format(filename, emb_file, vocab_file))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Throughput benchmark of AsyncPipeline
+
+Sends --num_requests single-sentence requests with at most --concurrency of them in flight, and compares the
+throughput with calling the pipeline serially on every request.
+"""
+
+import argparse
+import asyncio
+import time
+
+import classla
+from classla.resources.common import DEFAULT_MODEL_DIR
+
+EXAMPLE_SENTENCES = ["France Prešeren je bil rojen v Vrbi.", "Danes je poznan kot največji slovenski pesnik.",
+                     "Študiral je na Dunaju."]
+
+
+async def run_requests(nlp, texts, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(text):
+        async with semaphore:
+            return await nlp.aprocess(text)
+
+    return await asyncio.gather(*[request(text) for text in texts])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--models_dir', help='location of models files | default: ~/classla_resources',
+                        default=DEFAULT_MODEL_DIR)
+    parser.add_argument('-l', '--lang', help='Language of the pipeline', default='sl')
+    parser.add_argument('-p', '--processors', help='Processors of the pipeline', default='tokenize,pos,lemma,depparse')
+    parser.add_argument('--num_requests', type=int, default=1000, help='Number of requests')
+    parser.add_argument('--concurrency', type=int, default=64, help='Largest number of requests in flight')
+    parser.add_argument('--max_latency', type=float, default=0.01, help='Batching window in seconds')
+    parser.add_argument('--max_tokens', type=int, default=5000, help='Token threshold of a batch')
+    parser.add_argument('-c', '--cpu', action='store_true', help='Use cpu as the device.')
+    args = parser.parse_args()
+
+    texts = [EXAMPLE_SENTENCES[i % len(EXAMPLE_SENTENCES)] for i in range(args.num_requests)]
+    pipeline = classla.Pipeline(args.lang, dir=args.models_dir, processors=args.processors, use_gpu=(not args.cpu))
+
+    start = time.time()
+    for text in texts:
+        pipeline(text)
+    serial = time.time() - start
+    print(f'serial:\t{serial:.2f}s\t{len(texts) / serial:.1f} requests/s')
+
+    nlp = classla.AsyncPipeline(pipeline, max_latency=args.max_latency, max_tokens=args.max_tokens)
+    start = time.time()
+    asyncio.run(run_requests(nlp, texts, args.concurrency))
+    batched = time.time() - start
+    nlp.close()
+    print(f'async:\t{batched:.2f}s\t{len(texts) / batched:.1f} requests/s\t({serial / batched:.1f}x)')
@@ -0,0 +1,44 @@
+"""
+Benchmark of Chu-Liu-Edmonds decoding of dependency trees by sentence length
+
+Decodes random score matrices that prefer a random tree, with noise that makes the greedy heads form cycles and
+multiple roots in some of the sentences, and reports the time per sentence for each sentence length.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from classla.models.common.chuliu_edmonds import chuliu_edmonds_one_root
+
+
+def random_scores(rng, length, noise):
+    """ Scores of a parser that prefers a random tree """
+    heads = [0] + [rng.integers(0, i) if i > 1 else 0 for i in range(1, length)]
+    order = rng.permutation(length - 1) + 1
+    scores = rng.normal(scale=noise, size=(length, length))
+    for dep, head in enumerate(heads[1:], start=1):
+        head = 0 if head == 0 else order[head - 1]
+        scores[order[dep - 1], head] += 1.0
+    return scores.astype(np.float32)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lengths', type=int, nargs='+', default=[5, 10, 20, 50, 100, 200],
+                        help='Sentence lengths, including the root')
+    parser.add_argument('--sentences', type=int, default=200, help='Number of sentences per length')
+    parser.add_argument('--noise', type=float, default=0.4, help='Standard deviation of the noise added to the scores')
+    parser.add_argument('--seed', type=int, default=1234, help='Random seed')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print('length\tms/sentence')
+    for length in args.lengths:
+        score_matrices = [random_scores(rng, length, args.noise) for _ in range(args.sentences)]
+        start = time.time()
+        for scores in score_matrices:
+            chuliu_edmonds_one_root(scores)
+        elapsed = time.time() - start
+        print(f'{length}\t{elapsed / args.sentences * 1000:.3f}')
@@ -0,0 +1,72 @@
+"""
+Microbenchmark of decoding composite predictions (UFeats, and XPOS where it is composite) with CompositeVocab
+
+Decodes the same randomly drawn predictions, a Zipf-distributed sample of a fixed number of distinct feature bundles,
+without the cache of id2unit, with the cache one word at a time, and with unmap_many, and reports the time per
+million tokens.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import torch
+
+from classla.models.common.vocab import CompositeVocab
+from classla.models.pos.vocab import MultiVocab
+from classla.resources.common import DEFAULT_MODEL_DIR
+
+
+def sample_predictions(vocab, tokens, distinct, seed):
+    """ Rows of part ids drawn from distinct random bundles with Zipf-distributed frequencies """
+    rng = np.random.default_rng(seed)
+    bundles = np.stack([rng.integers(2, n, size=distinct) if n > 2 else np.full(distinct, 2) for n in vocab.lens()], axis=1)
+    # leave most parts of a bundle empty, as in real feature bundles
+    bundles[rng.random(bundles.shape) < 0.7] = 2
+    frequencies = 1.0 / np.arange(1, distinct + 1)
+    return bundles[rng.choice(distinct, size=tokens, p=frequencies / frequencies.sum())]
+
+
+def benchmark(name, vocab, predictions):
+    per_million = 1e6 / len(predictions)
+
+    # the predictions of the tagger come as an array, so its conversion to lists is part of decoding one word at a time
+    start = time.time()
+    expected = [vocab.parts2unit(row) for row in predictions.tolist()]
+    uncached = time.time() - start
+
+    vocab._id2unit_cache.clear()
+    start = time.time()
+    cached = [vocab.id2unit(row) for row in predictions.tolist()]
+    cached_time = time.time() - start
+
+    vocab._id2unit_cache.clear()
+    start = time.time()
+    many = vocab.unmap_many(predictions)
+    many_time = time.time() - start
+
+    assert expected == cached == many
+    print(f'{name}\t{uncached * per_million:.2f}\t{cached_time * per_million:.2f}\t{many_time * per_million:.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--models_dir', help='location of models files | default: ~/classla_resources',
+                        default=DEFAULT_MODEL_DIR)
+    parser.add_argument('-l', '--lang', help='Language of the POS model', default='sl')
+    parser.add_argument('--package', help='Package of the POS model, found at <models_dir>/<lang>/pos/<package>.pt',
+                        default='standard')
+    parser.add_argument('--tokens', type=int, default=1000000, help='Number of decoded tokens')
+    parser.add_argument('--distinct', type=int, default=500, help='Number of distinct feature bundles')
+    parser.add_argument('--seed', type=int, default=1234, help='Random seed')
+    args = parser.parse_args()
+
+    model_path = os.path.join(args.models_dir, args.lang, 'pos', args.package + '.pt')
+    checkpoint = torch.load(model_path, lambda storage, loc: storage, weights_only=False)
+    vocab = MultiVocab.load_state_dict(checkpoint['vocab'])
+
+    print('vocab\tuncached s/1M\tid2unit s/1M\tunmap_many s/1M')
+    for name in ['xpos', 'feats']:
+        if isinstance(vocab[name], CompositeVocab):
+            benchmark(name, vocab[name], sample_predictions(vocab[name], args.tokens, args.distinct, args.seed))
@@ -0,0 +1,85 @@
+"""
+Benchmark of the batching of the dependency parser
+
+Parses the sentences of a CoNLL-U file, optionally with a few long sentences added to skew the length distribution,
+and reports the time, the padding of the batches and the peak memory of the process.  The peak memory only grows
+during a process, so compare the batching options in separate runs, e.g. without and with --max_batch_arcs, or with
+--window_size for parsing the long sentences in windows.
+"""
+
+import argparse
+import os
+import resource
+import time
+
+import torch
+
+from classla.models.common import utils
+from classla.models.common.doc import Document
+from classla.models.common.pretrain import Pretrain
+from classla.models.depparse.data import DataLoader
+from classla.models.depparse.trainer import Trainer
+from classla.resources.common import DEFAULT_MODEL_DIR
+from classla.utils.conll import CoNLL
+
+
+def add_long_sentences(sentences, number, length):
+    """ Add sentences of the given length, made by joining the words of the first sentences """
+    words = [dict(word) for sentence in sentences for word in sentence]
+    for i in range(number):
+        long_sentence = [dict(words[(i * length + j) % len(words)], id=(j + 1,)) for j in range(length)]
+        sentences.append(long_sentence)
+    return sentences
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--models_dir', help='location of models files | default: ~/classla_resources',
+                        default=DEFAULT_MODEL_DIR)
+    parser.add_argument('-l', '--lang', help='Language of the models', default='sl')
+    parser.add_argument('--package', help='Package of the models, found at <models_dir>/<lang>/<processor>/<package>.pt',
+                        default='standard')
+    parser.add_argument('--input_file', required=True, help='CoNLL-U file to parse')
+    parser.add_argument('--batch_size', type=int, default=5000, help='Batch size in words')
+    parser.add_argument('--max_batch_arcs', type=int, default=None, help='Limit of the padded number of arcs of a batch')
+    parser.add_argument('--window_size', type=int, default=None, help='Parse the sentences longer than this in windows')
+    parser.add_argument('--window_overlap', type=int, default=None, help='Overlap of the windows')
+    parser.add_argument('--long_sentences', type=int, default=0, help='Number of long sentences to add')
+    parser.add_argument('--long_length', type=int, default=300, help='Length of the added long sentences')
+    parser.add_argument('--threads', type=int, default=torch.get_num_threads(), help='Torch threads')
+    args = parser.parse_args()
+    torch.set_num_threads(args.threads)
+
+    pretrain = Pretrain(os.path.join(args.models_dir, args.lang, 'pretrain', args.package + '.pt'))
+    trainer = Trainer(pretrain=pretrain, model_file=os.path.join(args.models_dir, args.lang, 'depparse', args.package + '.pt'),
+                      inference=True)
+
+    sentences, metasentences = CoNLL.conll2dict(input_file=args.input_file)
+    sentences = add_long_sentences(sentences, args.long_sentences, args.long_length)
+    doc = Document(sentences)
+
+    start = time.time()
+    batches = DataLoader(doc, args.batch_size, trainer.args, pretrain, vocab=trainer.vocab, evaluation=True,
+                         sort_during_eval=True, max_batch_arcs=args.max_batch_arcs, window_size=args.window_size,
+                         window_overlap=args.window_overlap)
+    preds = []
+    scores = []
+    for i, batch in enumerate(batches):
+        if batches.window_flags is None:
+            preds += trainer.predict(batch)
+        else:
+            batch_preds, batch_scores = trainer.predict(batch, score_sentences=batches.window_flags[i])
+            preds += batch_preds
+            scores += batch_scores
+    if batches.window_flags is not None:
+        preds = batches.join_window_preds(utils.unsort(preds, batches.data_orig_idx),
+                                          utils.unsort(scores, batches.data_orig_idx))
+    elapsed = time.time() - start
+
+    stats = batches.padding_stats()
+    print(f"batches\t{stats['batches']}")
+    print(f"word efficiency\t{stats['word_efficiency']:.3f}")
+    print(f"arc efficiency\t{stats['arc_efficiency']:.3f}")
+    print(f"largest batch arcs\t{stats['max_batch_arcs']}")
+    print(f"seconds\t{elapsed:.2f}")
+    print(f"peak RSS MB\t{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}")
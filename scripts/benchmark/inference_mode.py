@@ -0,0 +1,82 @@
+"""
+Memory and latency benchmark of inference-only model loading
+
+Loads the pos, lemma and depparse trainers once as for training (with optimizers and gradient tracking) and once in
+inference mode, and reports the resident memory after loading, the peak memory and the time of annotating the same
+document with both.  Every configuration runs in a fresh process, so the memory numbers do not influence each other.
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+
+import torch
+
+from classla.models.common.doc import Document
+from classla.models.common.pretrain import Pretrain
+from classla.models.depparse.data import DataLoader as DepparseDataLoader
+from classla.models.depparse.trainer import Trainer as DepparseTrainer
+from classla.models.lemma.data import DataLoader as LemmaDataLoader
+from classla.models.lemma.trainer import Trainer as LemmaTrainer
+from classla.models.pos.data import DataLoader as POSDataLoader
+from classla.models.pos.trainer import Trainer as POSTrainer
+from classla.resources.common import DEFAULT_MODEL_DIR
+from classla.utils.conll import CoNLL
+
+
+def rss_mb():
+    """ Current resident memory of this process in MB """
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def run(args, inference, results):
+    torch.set_num_threads(args['threads'])
+    pretrain = Pretrain(args['pretrain_path'])
+    pos = POSTrainer(args={'lemma_pretag': False}, pretrain=pretrain, model_file=args['pos_model_path'], inference=inference)
+    lemma = LemmaTrainer(args={'pos_model_path': args['pos_model_path'], 'pos_lemma_pretag': False},
+                         model_file=args['lemma_model_path'], inference=inference)
+    depparse = DepparseTrainer(pretrain=pretrain, model_file=args['depparse_model_path'], inference=inference)
+    loaded = rss_mb()
+
+    sentences, metasentences = CoNLL.conll2dict(input_file=args['input_file'])
+    start = time.time()
+    for _ in range(args['repeats']):
+        doc = Document(sentences, metasentences=metasentences)
+        for b in POSDataLoader(doc, 5000, pos.args, pretrain, vocab=pos.vocab, evaluation=True):
+            pos.predict(b)
+        for b in LemmaDataLoader(doc, 5000, lemma.args, vocab=lemma.vocab, evaluation=True):
+            lemma.predict(b, 1)
+        for b in DepparseDataLoader(doc, 5000, depparse.args, pretrain, vocab=depparse.vocab, evaluation=True):
+            depparse.predict(b)
+    elapsed = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    results.put((loaded, peak, elapsed))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--models_dir', help='location of models files | default: ~/classla_resources',
+                        default=DEFAULT_MODEL_DIR)
+    parser.add_argument('-l', '--lang', help='Language of the models', default='sl')
+    parser.add_argument('--package', help='Package of the models, found at <models_dir>/<lang>/<processor>/<package>.pt',
+                        default='standard')
+    parser.add_argument('--input_file', required=True, help='CoNLL-U file to annotate')
+    parser.add_argument('--repeats', type=int, default=3, help='Number of times the input is annotated')
+    parser.add_argument('--threads', type=int, default=torch.get_num_threads(), help='Torch threads')
+    args = vars(parser.parse_args())
+    for processor in ['pos', 'lemma', 'depparse']:
+        args[f'{processor}_model_path'] = os.path.join(args['models_dir'], args['lang'], processor, args['package'] + '.pt')
+    args['pretrain_path'] = os.path.join(args['models_dir'], args['lang'], 'pretrain', args['package'] + '.pt')
+
+    ctx = multiprocessing.get_context('spawn')
+    print('mode\tloaded MB\tpeak MB\tseconds')
+    for inference in (False, True):
+        results = ctx.Queue()
+        process = ctx.Process(target=run, args=(args, inference, results))
+        process.start()
+        loaded, peak, elapsed = results.get()
+        process.join()
+        print(f"{'inference' if inference else 'training'}\t{loaded:.0f}\t{peak:.0f}\t{elapsed:.2f}")
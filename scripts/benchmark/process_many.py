@@ -0,0 +1,55 @@
+"""
+Scaling benchmark of Pipeline.process_many
+
+Annotates the same list of documents with 1, 2, 4, ... up to --max_workers worker processes and reports the
+throughput and the speedup relative to a single process.  Documents are read from --input_file (one document per
+paragraph, separated by empty lines) or built by repeating an example text.
+"""
+
+import argparse
+import os
+import time
+
+import classla
+from classla.resources.common import DEFAULT_MODEL_DIR
+
+EXAMPLE_DOC = "France Prešeren je bil rojen v Vrbi. Danes je poznan kot največji slovenski pesnik. Študiral je na Dunaju."
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--models_dir', help='location of models files | default: ~/classla_resources',
+                        default=DEFAULT_MODEL_DIR)
+    parser.add_argument('-l', '--lang', help='Language of the pipeline', default='sl')
+    parser.add_argument('-p', '--processors', help='Processors of the pipeline', default='tokenize,pos,lemma,depparse')
+    parser.add_argument('--input_file', help='Documents to annotate, separated by empty lines', default=None)
+    parser.add_argument('--num_docs', type=int, default=2000, help='Number of documents when no input file is given')
+    parser.add_argument('--max_workers', type=int, default=os.cpu_count(), help='Largest number of workers to try')
+    parser.add_argument('--batch_size', type=int, default=50, help='Documents sent to a worker at once')
+    parser.add_argument('--worker_threads', type=int, default=1, help='Torch threads of every worker')
+    args = parser.parse_args()
+
+    if args.input_file:
+        with open(args.input_file) as f:
+            docs = [doc.strip() for doc in f.read().split('\n\n') if doc.strip()]
+    else:
+        docs = [EXAMPLE_DOC] * args.num_docs
+    num_words = sum(len(doc.split()) for doc in docs)
+
+    nlp = classla.Pipeline(args.lang, dir=args.models_dir, processors=args.processors, use_gpu=False)
+
+    n_workers = []
+    n = 1
+    while n < args.max_workers:
+        n_workers.append(n)
+        n *= 2
+    n_workers.append(args.max_workers)
+
+    print(f'{len(docs)} documents, {num_words} whitespace separated words')
+    print('workers\tseconds\twords/s\tspeedup')
+    baseline = None
+    for n in n_workers:
+        start = time.time()
+        nlp.process_many(docs, n_workers=n, batch_size=args.batch_size, worker_threads=args.worker_threads)
+        elapsed = time.time() - start
+        baseline = baseline or elapsed
+        print(f'{n}\t{elapsed:.2f}\t{num_words / elapsed:.0f}\t{baseline / elapsed:.2f}')
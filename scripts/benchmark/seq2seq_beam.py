@@ -0,0 +1,52 @@
+"""
+Benchmark of seq2seq lemmatization with beam sizes 1, 3 and 5
+
+Lemmatizes the words of a CoNLL-U file with the seq2seq model of the lemmatizer and reports the time and the number
+of words per second for each beam size.  The dictionary lookups of the lemmatizer are skipped, so that every word is
+decoded by the model.
+"""
+
+import argparse
+import os
+import time
+
+import torch
+
+from classla.models.common.doc import Document
+from classla.models.lemma.data import DataLoader
+from classla.models.lemma.trainer import Trainer
+from classla.resources.common import DEFAULT_MODEL_DIR
+from classla.utils.conll import CoNLL
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--models_dir', help='location of models files | default: ~/classla_resources',
+                        default=DEFAULT_MODEL_DIR)
+    parser.add_argument('-l', '--lang', help='Language of the models', default='sl')
+    parser.add_argument('--package', help='Package of the models, found at <models_dir>/<lang>/<processor>/<package>.pt',
+                        default='standard')
+    parser.add_argument('--input_file', required=True, help='CoNLL-U file to lemmatize')
+    parser.add_argument('--batch_size', type=int, default=5000, help='Batch size in words')
+    parser.add_argument('--beam_sizes', type=int, nargs='+', default=[1, 3, 5], help='Beam sizes to compare')
+    parser.add_argument('--threads', type=int, default=torch.get_num_threads(), help='Torch threads')
+    args = parser.parse_args()
+    torch.set_num_threads(args.threads)
+
+    pos_model_path = os.path.join(args.models_dir, args.lang, 'pos', args.package + '.pt')
+    lemma_model_path = os.path.join(args.models_dir, args.lang, 'lemma', args.package + '.pt')
+    trainer = Trainer(args={'pos_model_path': pos_model_path, 'pos_lemma_pretag': False}, model_file=lemma_model_path,
+                      inference=True)
+
+    sentences, metasentences = CoNLL.conll2dict(input_file=args.input_file)
+    doc = Document(sentences, metasentences=metasentences)
+    batches = list(DataLoader(doc, args.batch_size, trainer.args, vocab=trainer.vocab, evaluation=True))
+    num_words = sum(batch[0].size(0) for batch in batches)
+
+    print('beam\tseconds\twords/s')
+    for beam_size in args.beam_sizes:
+        start = time.time()
+        for batch in batches:
+            trainer.predict(batch, beam_size)
+        elapsed = time.time() - start
+        print(f'{beam_size}\t{elapsed:.2f}\t{num_words / elapsed:.0f}')
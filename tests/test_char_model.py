@@ -0,0 +1,68 @@
+"""
+Tests for the character model, which encodes each word type of a batch once and can cache the representations
+"""
+
+import pytest
+import torch
+
+from classla.models.common.data import sort_word_types
+from tests.test_utils import build_tagger_and_batch, run_tagger
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+def test_sort_word_types():
+    types, word_type_idx = sort_word_types([[4, 5], [6], [4, 5], [7, 8, 9], [6]])
+    assert types == [[7, 8, 9], [4, 5], [6]]
+    assert [types[i] for i in word_type_idx] == [[4, 5], [6], [4, 5], [7, 8, 9], [6]]
+
+def test_char_model_word_types():
+    """
+    Encoding each word type of a batch once must give the same output as encoding every word
+    """
+    torch.manual_seed(1234)
+    model, batch, train_batch = build_tagger_and_batch(transformed_dim=5, emb_dim=7, return_train_batch=True)
+    # the words of the sentences repeat, so the evaluation batch holds fewer words for the char model
+    assert batch[9] is None and train_batch[13] is None
+    assert len(batch[2]) < len(train_batch[2])
+    expected = run_tagger(model, train_batch)
+    for prediction, expected_prediction in zip(run_tagger(model, batch), expected):
+        assert torch.equal(prediction, expected_prediction)
+
+def test_char_model_cache():
+    """
+    Cached character representations must give the same output, and the cache must respect its size
+    """
+    torch.manual_seed(1234)
+    model, batch = build_tagger_and_batch(transformed_dim=5, emb_dim=7)
+    expected = run_tagger(model, batch)
+    num_types = len(batch[2])
+
+    model.charmodel.enable_cache(max_entries=2)
+    for _ in range(2):
+        for prediction, expected_prediction in zip(run_tagger(model, batch), expected):
+            assert torch.allclose(prediction, expected_prediction)
+    stats = model.charmodel.cache_stats()
+    assert stats['entries'] == 2
+    assert stats['hits'] + stats['misses'] == 2 * num_types
+
+    model.charmodel.enable_cache(max_entries=100)
+    run_tagger(model, batch)
+    run_tagger(model, batch)
+    stats = model.charmodel.cache_stats()
+    assert stats['entries'] == num_types
+    assert stats['hits'] == stats['misses'] == num_types
+    assert stats['hit_rate'] == 0.5
+
+    # reloading the weights invalidates the cache, and so does training
+    state = {name: value + 0.1 if name.startswith('charmodel.') else value for name, value in model.state_dict().items()}
+    model.load_state_dict(state)
+    assert model.charmodel.cache_stats()['entries'] == 0
+    cached = run_tagger(model, batch)
+    model.charmodel.disable_cache()
+    for prediction, expected_prediction in zip(cached, run_tagger(model, batch)):
+        assert torch.allclose(prediction, expected_prediction)
+
+    model.charmodel.enable_cache(max_entries=100)
+    run_tagger(model, batch)
+    model.train()
+    assert model.charmodel.cache_stats()['entries'] == 0
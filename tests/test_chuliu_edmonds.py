@@ -0,0 +1,48 @@
+"""
+Tests for the Chu-Liu-Edmonds decoding of dependency trees
+"""
+
+import numpy as np
+import pytest
+
+import classla.models.common.chuliu_edmonds as chuliu_edmonds
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+def random_scores(rng, length, noise):
+    """ Scores of a parser that prefers a random tree, with noise that makes the greedy heads form cycles """
+    heads = [0] + [rng.integers(0, i) if i > 1 else 0 for i in range(1, length)]
+    order = rng.permutation(length - 1) + 1
+    scores = rng.normal(scale=noise, size=(length, length))
+    for dep, head in enumerate(heads[1:], start=1):
+        head = 0 if head == 0 else order[head - 1]
+        scores[order[dep - 1], head] += 1.0
+    return scores.astype(np.float32)
+
+def test_find_cycles():
+    rng = np.random.default_rng(1234)
+    for _ in range(500):
+        tree = rng.integers(0, 12, size=12)
+        expected = chuliu_edmonds.tarjan(tree)
+        cycles = chuliu_edmonds.find_cycles(tree)
+        assert len(cycles) == len(expected)
+        for cycle, expected_cycle in zip(cycles, expected):
+            assert np.array_equal(cycle, expected_cycle)
+
+@pytest.mark.parametrize('noise', [0.3, 1.0, 3.0])
+def test_same_trees_as_tarjan(monkeypatch, noise):
+    """
+    Decoding must give the same trees as with the recursive tarjan
+    """
+    rng = np.random.default_rng(1234)
+    score_matrices = [random_scores(rng, length, noise) for length in rng.integers(2, 40, size=100)]
+    trees = [chuliu_edmonds.chuliu_edmonds_one_root(scores) for scores in score_matrices]
+    multi_root_trees = [chuliu_edmonds.chuliu_edmonds(scores.copy()) for scores in score_matrices]
+
+    monkeypatch.setattr(chuliu_edmonds, 'find_cycles', chuliu_edmonds.tarjan)
+    for scores, tree, multi_root_tree in zip(score_matrices, trees, multi_root_trees):
+        assert np.array_equal(tree, chuliu_edmonds.chuliu_edmonds_one_root(scores))
+        assert np.array_equal(multi_root_tree, chuliu_edmonds.chuliu_edmonds(scores.copy()))
+        # a single root, no cycles
+        assert np.count_nonzero(tree[1:] == 0) == 1
+        assert not chuliu_edmonds.find_cycles(tree)
@@ -2,7 +2,7 @@
 Test some pieces of the depparse dataloader
 """
 import pytest
-from classla.models.depparse.data import data_to_batches
+from classla.models.depparse.data import data_to_batches, padded_arcs, padding_counts, padding_stats
 
 pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
 
@@ -57,6 +57,41 @@ def test_data_to_batches_eval_mode():
     batched_data = data_to_batches(data, batch_size=5, eval_mode=True, sort_during_eval=False, max_sentence_size=3)
     check_batches(batched_data[0], [1, 4, 1], ['A', 'B', 'C'])
 
+def test_data_to_batches_max_batch_arcs():
+    """
+    Tests limiting the padded number of arcs of a batch, which grows with the square of its longest sentence
+    """
+    assert padded_arcs(2, 3) == 32
+
+    # the word budget alone would put all of the sentences in one batch
+    data = make_fake_data(2, 2, 2, 2)
+    batched_data = data_to_batches(data, batch_size=100, eval_mode=True, sort_during_eval=True, max_sentence_size=None, max_batch_arcs=20)
+    check_batches(batched_data[0], [4, 4], ['D', 'C', 'B', 'A'])
+
+    # a long sentence gets a batch of its own, the short ones are batched together
+    data = make_fake_data(2, 9, 2, 2)
+    batched_data = data_to_batches(data, batch_size=100, eval_mode=True, sort_during_eval=True, max_sentence_size=None, max_batch_arcs=30)
+    check_batches(batched_data[0], [9, 6], ['B', 'D', 'C', 'A'])
+
+    # unsorted, a longer sentence raises the padded size of the batches so far
+    data = make_fake_data(2, 2, 4, 1)
+    batched_data = data_to_batches(data, batch_size=100, eval_mode=True, sort_during_eval=False, max_sentence_size=None, max_batch_arcs=60)
+    check_batches(batched_data[0], [4, 5], ['A', 'B', 'C', 'D'])
+
+    # the word budget still applies
+    data = make_fake_data(2, 2, 2, 2)
+    batched_data = data_to_batches(data, batch_size=5, eval_mode=True, sort_during_eval=True, max_sentence_size=None, max_batch_arcs=1000)
+    check_batches(batched_data[0], [4, 4], ['D', 'C', 'B', 'A'])
+
+def test_padding_stats():
+    batches = [make_fake_data(4, 2), make_fake_data(1)]
+    counts = padding_counts(batches)
+    assert counts == {'batches': 2, 'sentences': 3, 'words': 7, 'padded_words': 9,
+                      'arcs': 25 + 9 + 4, 'padded_arcs': 50 + 4, 'max_batch_arcs': 50}
+    stats = padding_stats(counts)
+    assert stats['word_efficiency'] == pytest.approx(7 / 9)
+    assert stats['arc_efficiency'] == pytest.approx(38 / 54)
+
 if __name__ == '__main__':
     test_data_to_batches()
 
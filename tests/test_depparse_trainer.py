@@ -0,0 +1,156 @@
+"""
+Tests for the prediction of the depparse trainer
+"""
+
+import numpy as np
+import pytest
+import torch
+
+from classla.models.common import utils
+from classla.models.common.doc import Document
+from classla.models.common.pretrain import Pretrain, PretrainedWordVocab
+from classla.models.depparse.data import DataLoader
+from classla.models.depparse.trainer import Trainer, unpack_batch
+from tests.test_depparse_windows import check_tree
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+def build_trainer_and_batches(multi_root=False, num_sentences=30):
+    """
+    Build a small randomly initialized parser, batches of sentences of different lengths for it and its pretrain
+    """
+    rng = np.random.default_rng(1234)
+    words = ['unban', 'mox', 'opal', 'jace', 'ruby', 'sapphire']
+    deprels = ['root', 'nsubj', 'obj', 'amod', 'acl_relcl']
+    sentences = []
+    for length in rng.integers(1, 25, size=num_sentences):
+        sentences.append([{'id': (i + 1,), 'text': words[rng.integers(len(words))], 'lemma': 'x', 'upos': 'NOUN',
+                           'xpos': 'NN', 'feats': 'Number=Sing', 'head': int(rng.integers(0, i + 1)),
+                           'deprel': deprels[rng.integers(len(deprels))]} for i in range(length)])
+    doc = Document(sentences)
+
+    pretrain = Pretrain()
+    pretrain._vocab = PretrainedWordVocab(words[:4], lower=True)
+    pretrain._emb = rng.standard_normal((len(pretrain._vocab), 7)).astype(np.float32)
+
+    args = {'shorthand': 'en_ewt', 'word_emb_dim': 8, 'tag_emb_dim': 4, 'char': True, 'char_emb_dim': 4,
+            'char_hidden_dim': 6, 'char_num_layers': 1, 'char_dropout': 0, 'char_rec_dropout': 0, 'pretrain': True,
+            'transformed_dim': 5, 'hidden_dim': 10, 'num_layers': 1, 'deep_biaff_hidden_dim': 12,
+            'composite_deep_biaff_hidden_dim': 12, 'dropout': 0.5, 'rec_dropout': 0, 'word_dropout': 0.3,
+            'distance': True, 'linearization': True, 'multi_root': multi_root}
+    vocab = DataLoader(doc, 100, args, pretrain).vocab
+    torch.manual_seed(1234)
+    trainer = Trainer(args=args, vocab=vocab, pretrain=pretrain, inference=True)
+    batches = DataLoader(doc, 100, args, pretrain, vocab=vocab, evaluation=True, sort_during_eval=True)
+    return trainer, batches, pretrain
+
+@pytest.mark.parametrize('pool', ['thread', 'process'])
+@pytest.mark.parametrize('multi_root', [False, True])
+def test_decode_workers(pool, multi_root):
+    """
+    Decoding the trees with a pool of workers must give the same parses, in the same order, as decoding them one by one
+    """
+    trainer, batches, pretrain = build_trainer_and_batches(multi_root)
+    expected = [trainer.predict(b) for b in batches]
+    trainer.set_decode_workers(3, pool)
+    try:
+        assert [trainer.predict(b) for b in batches] == expected
+    finally:
+        trainer.shutdown_decode_workers()
+
+def test_decode_workers_shutdown():
+    """
+    A single worker decodes in the calling thread, and the pool of more workers starts again after a shutdown
+    """
+    trainer, batches, pretrain = build_trainer_and_batches()
+    assert trainer.decode_pool == 'thread'
+    trainer.set_decode_workers(1)
+    expected = [trainer.predict(b) for b in batches]
+    assert trainer._decode_executor is None
+
+    trainer.set_decode_workers(2)
+    assert [trainer.predict(b) for b in batches] == expected
+    assert trainer._decode_executor is not None
+    trainer.shutdown_decode_workers()
+    assert trainer._decode_executor is None
+    assert [trainer.predict(b) for b in batches] == expected
+    trainer.shutdown_decode_workers()
+
+def test_predict_deprels():
+    """
+    The heads and deprels of a batch must match those picked word by word from the scores of the parser
+    """
+    trainer, batches, pretrain = build_trainer_and_batches()
+    for b in batches:
+        inputs, orig_idx, word_orig_idx, sentlens, wordlens, word_type_idx = unpack_batch(b, False)
+        with torch.no_grad():
+            _, preds = trainer.model(*inputs, word_orig_idx, sentlens, wordlens, word_type_idx)
+        head_seqs = trainer.decode_heads(preds[0], sentlens)
+        expected = [[[int(h), trainer.vocab['deprel'].id2unit(preds[1][i][j+1][h])] for j, h in enumerate(hs)]
+                    for i, hs in enumerate(head_seqs)]
+
+        pred_tokens = trainer.predict(b, unsort=False)
+        assert pred_tokens == expected
+        assert all(type(head) is int for sentence in pred_tokens for head, _ in sentence)
+
+def test_set_dependencies():
+    sentences = [[{'id': (1,), 'text': 'Obama'}, {'id': (2,), 'text': 'spoke'}, {'id': (3,), 'text': 'today'}]]
+    doc = Document(sentences)
+    sentence = doc.sentences[0]
+    sentence.set_dependencies([[2, 'nsubj'], [0, 'root'], [2, 'obl']])
+    assert [(word.head, word.deprel) for word in sentence.words] == [(2, 'nsubj'), (0, 'root'), (2, 'obl')]
+    assert [(head.id, deprel, word.id) for head, deprel, word in sentence.dependencies] == [(2, 'nsubj', 1), (0, 'root', 2), (2, 'obl', 3)]
+    expected = sentence.dependencies_string()
+    sentence.build_dependencies()
+    assert sentence.dependencies_string() == expected
+
+def test_predict_with_scores():
+    """
+    The scores of the flagged sentences must come with the same predictions, which are their best scored arcs
+    """
+    trainer, batches, pretrain = build_trainer_and_batches()
+    for b in batches:
+        expected = trainer.predict(b)
+        flags = [i % 2 == 0 for i in range(len(expected))]
+        pred_tokens, scores = trainer.predict(b, score_sentences=flags)
+        assert pred_tokens == expected
+        for flag, sentence, sentence_scores in zip(flags, pred_tokens, scores):
+            if not flag:
+                assert sentence_scores is None
+                continue
+            arc_scores, arc_deprels = sentence_scores
+            assert arc_scores.shape == arc_deprels.shape == (len(sentence), len(sentence) + 1)
+            assert (arc_scores <= 0).all()
+            for i, (head, deprel) in enumerate(sentence):
+                assert arc_deprels[i, head] == deprel
+
+def predict_windows(trainer, windowed):
+    preds, scores = [], []
+    for i, b in enumerate(windowed):
+        batch_preds, batch_scores = trainer.predict(b, score_sentences=windowed.window_flags[i])
+        preds += batch_preds
+        scores += batch_scores
+    preds = utils.unsort(preds, windowed.data_orig_idx)
+    scores = utils.unsort(scores, windowed.data_orig_idx)
+    # only the windows of the split sentences are scored
+    assert [s is not None for s in scores] == [len(windows) > 1 for windows in windowed.sentence_windows for _ in windows]
+    return windowed.join_window_preds(preds, scores)
+
+def test_window_preds():
+    """
+    Parsing in windows must give a tree for every sentence, and the same trees when the windows are the sentences
+    """
+    trainer, batches, pretrain = build_trainer_and_batches()
+    expected = utils.unsort([p for b in batches for p in trainer.predict(b)], batches.data_orig_idx)
+
+    windowed = DataLoader(batches.doc, 100, trainer.args, pretrain, vocab=trainer.vocab, evaluation=True,
+                          sort_during_eval=True, window_size=30)
+    assert predict_windows(trainer, windowed) == expected
+
+    windowed = DataLoader(batches.doc, 100, trainer.args, pretrain, vocab=trainer.vocab, evaluation=True,
+                          sort_during_eval=True, window_size=8, window_overlap=3)
+    assert len(windowed.sentence_windows) == len(expected)
+    trees = predict_windows(trainer, windowed)
+    for tree, sentence in zip(trees, expected):
+        assert len(tree) == len(sentence)
+        check_tree(tree)
@@ -0,0 +1,124 @@
+"""
+Tests for parsing long sentences in overlapping windows
+"""
+
+import numpy as np
+import pytest
+
+from classla.models.depparse.windows import FALLBACK_DEPREL, dependents, split_windows, join_windows
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+def check_tree(tree):
+    """ The heads must form a tree with a single root """
+    assert sum(head == 0 for head, _ in tree) == 1
+    for i in range(1, len(tree) + 1):
+        seen = set()
+        while i != 0:
+            assert i not in seen
+            seen.add(i)
+            i = tree[i - 1][0]
+
+def window_preds(heads, root_scores=None, arcs=None):
+    """
+    Predictions and scores of a window with the given heads, scored -1 against -10 for the other arcs unless root_scores
+    or arcs, which maps (word, head) of the window to (score, deprel), give them.  The arcs are labeled root and dep.
+    """
+    n = len(heads)
+    arc_scores = np.full((n, n + 1), -10.0)
+    arc_scores[np.arange(n), heads] = -1.0
+    if root_scores is not None:
+        arc_scores[:, 0] = root_scores
+    arc_deprels = np.array([['root'] + ['dep'] * n] * n, dtype=object)
+    for (i, head), (score, deprel) in (arcs or {}).items():
+        arc_scores[i, head] = score
+        arc_deprels[i, head] = deprel
+    predictions = [[head, arc_deprels[i, head]] for i, head in enumerate(heads)]
+    return predictions, (arc_scores, arc_deprels)
+
+def join(windows, *preds):
+    return join_windows(windows, [p for p, _ in preds], [s for _, s in preds])
+
+def test_split_windows():
+    assert split_windows(5, 10) == [(0, 5)]
+    assert split_windows(10, 10) == [(0, 10)]
+    assert split_windows(20, 8, 2) == [(0, 8), (6, 14), (12, 20)]
+    # the last window is moved back to end with the sentence
+    assert split_windows(17, 8, 2) == [(0, 8), (6, 14), (9, 17)]
+    # a quarter of the window by default
+    assert split_windows(20, 8) == [(0, 8), (6, 14), (12, 20)]
+    with pytest.raises(ValueError):
+        split_windows(20, 8, 8)
+
+def test_join_windows():
+    # two windows of a chain of 12 words, each rooted at its first word
+    windows = [(0, 8), (4, 12)]
+    tree = join(windows, window_preds([0, 1, 2, 3, 4, 5, 6, 7], root_scores=[-1.0] + [-5.0] * 7),
+                window_preds([0, 1, 2, 3, 4, 5, 6, 7], root_scores=[-2.0] + [-5.0] * 7))
+    check_tree(tree)
+    assert [head for head, _ in tree] == [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]
+
+def test_join_windows_roots():
+    # words 0-2 take their heads from the first window, words 3-5 from the second one
+    windows = [(0, 4), (2, 6)]
+    tree = join(windows, window_preds([2, 0, 2, 3], root_scores=[-5.0, -1.0, -5.0, -5.0]),
+                window_preds([4, 3, 0, 3], root_scores=[-5.0, -5.0, -2.0, -5.0], arcs={(2, 1): (-3.0, 'other')}))
+    check_tree(tree)
+    # the more likely root becomes the root, the root of the second window takes its best other head
+    assert tree == [[2, 'dep'], [0, 'root'], [2, 'dep'], [5, 'dep'], [3, 'other'], [5, 'dep']]
+
+def test_join_windows_no_root():
+    # neither window attaches a word it is responsible for to the root
+    windows = [(0, 4), (2, 6)]
+    tree = join(windows, window_preds([4, 4, 4, 0], root_scores=[-5.0, -2.0, -5.0, -1.0]),
+                window_preds([0, 1, 1, 1], root_scores=[-1.0, -5.0, -3.0, -5.0]))
+    check_tree(tree)
+    assert tree[1] == [0, 'root']
+    # words 3 and 4 make a cycle, which only word 3 can leave
+    assert tree[2] == [2, 'dep']
+
+def test_join_windows_cycles():
+    # the windows disagree on the arc between words 3 and 4, which makes a cycle
+    windows = [(0, 4), (2, 6)]
+    tree = join(windows, window_preds([0, 1, 4, 3], arcs={(2, 4): (-3.0, 'dep'), (2, 2): (-4.0, 'obj')}),
+                window_preds([0, 1, 2, 2]))
+    check_tree(tree)
+    assert tree[0] == [0, 'root']
+    # the dependents of the cycle cannot become heads, so word 3 takes its best head outside of them, with its deprel
+    assert tree[2] == [2, 'obj']
+    assert tree[3] == [3, 'dep']
+
+def test_join_windows_cycle_choice():
+    # words 0-3 take their heads from the first window, words 4-7 from the second one, which makes a cycle of the
+    # words 4 and 5 that is broken at the word that loses the least probability
+    windows = [(0, 6), (2, 8)]
+    tree = join(windows, window_preds([0, 1, 2, 5, 4, 5], arcs={(3, 2): (-6.0, 'obl')}),
+                window_preds([0, 1, 2, 3, 3, 3], arcs={(2, 1): (-1.5, 'conj')}))
+    check_tree(tree)
+    assert tree[3] == [5, 'dep']
+    assert tree[4] == [3, 'conj']
+
+def test_join_windows_cycle_other_window():
+    # word 4 takes its head from the second window, but the first window scores a better replacement for its arc
+    windows = [(0, 4), (2, 6)]
+    tree = join(windows, window_preds([0, 1, 4, 2], arcs={(3, 2): (-1.5, 'conj')}), window_preds([0, 1, 2, 2]))
+    check_tree(tree)
+    assert tree[2] == [4, 'dep']
+    assert tree[3] == [2, 'conj']
+
+def test_join_windows_cycle_fallback():
+    # the extra root of the third window makes a cycle of the words 6 and 7, and all words of their windows depend
+    # on it, so the cycle is attached to the root with the fallback deprel instead of the label of the dropped arc
+    windows = [(0, 4), (2, 6), (4, 8)]
+    tree = join(windows, window_preds([0, 1, 4, 1]), window_preds([0, 3, 4, 1]),
+                window_preds([2, 3, 0, 3], root_scores=[-10.0, -10.0, -5.0, -10.0],
+                             arcs={(1, 3): (-1.0, 'obj'), (2, 2): (-2.0, 'nmod')}))
+    check_tree(tree)
+    assert tree[0] == [0, 'root']
+    assert tree[6] == [6, 'nmod']
+    assert tree[5] == [1, FALLBACK_DEPREL]
+
+def test_dependents():
+    # words 2 and 3 make a cycle with 4 and 5 depending on it, and words 6 and 7 another one
+    heads = [0, 3, 2, 3, 4, 7, 6]
+    assert dependents(heads, [2, 3]) == {2, 3, 4, 5}
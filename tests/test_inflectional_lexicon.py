@@ -0,0 +1,209 @@
+"""
+Tests for the inflectional lexicon shared by the tagger and the lemmatizer
+"""
+import concurrent.futures
+import os
+
+import pytest
+import torch
+
+from classla.models.pos import lexicon
+from classla.models.pos.postprocessor import SloveneInflectionalLexiconProcessor, DefaultPostprocessor
+from classla.models.pos.trainer import Trainer as PosTrainer
+from classla.models.pos.vocab import WordVocab, FeatureVocab, MultiVocab
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+ENTRIES = [('hiša', 'Ncfsn', 'NOUN', 'Case=Nom|Gender=Fem|Number=Sing', 'hiša'),
+           ('hiše', 'Ncfsg', 'NOUN', 'Case=Gen|Gender=Fem|Number=Sing', 'hiša'),
+           ('hiše', 'Ncfpn', 'NOUN', 'Case=Nom|Gender=Fem|Number=Plur', 'hiša'),
+           ('je', 'Va-r3s-n', 'AUX', 'Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin', 'biti'),
+           ('je', 'Va-r3s-n', 'AUX', 'Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin', 'jesti'),
+           ('je', 'Pp3fsa--y', 'PRON', 'Case=Acc|Gender=Fem|Number=Sing|Person=3|PronType=Prs|Variant=Short', 'on')]
+
+@pytest.fixture
+def model_file(tmp_path):
+    filename = str(tmp_path / 'tagger.pt')
+    torch.save({'dicts': ENTRIES}, filename)
+    lexicon.clear_lexicons()
+    yield filename
+    lexicon.clear_lexicons()
+
+def test_lemma_lookup(model_file):
+    lookup = PosTrainer.load_inflectional_lexicon(model_file)
+    # the first entry of a (form, xpos) pair gives the lemma
+    assert lookup == {('hiša', 'Ncfsn'): 'hiša', ('hiše', 'Ncfsg'): 'hiša', ('hiše', 'Ncfpn'): 'hiša',
+                      ('je', 'Va-r3s-n'): 'biti', ('je', 'Pp3fsa--y'): 'on'}
+
+def test_shared_lexicon(model_file, monkeypatch):
+    registered = lexicon.register_lexicon(model_file, list(ENTRIES))
+    assert list(registered) == ENTRIES
+
+    # the registered lexicon is used instead of reading the model file again
+    def fail_load(*args, **kwargs):
+        raise AssertionError("The model file should not be read again")
+    with monkeypatch.context() as m:
+        m.setattr(torch, 'load', fail_load)
+        assert lexicon.load_lexicon(model_file) is registered
+        assert PosTrainer.load_inflectional_lexicon(model_file) is registered.lemma_lookup()
+
+    # a modified model file is loaded again
+    os.utime(model_file, (0, 0))
+    assert lexicon.load_lexicon(model_file) is not registered
+
+def old_hypothesis_dictionaries(entries, xpos_vocab, upos_vocab):
+    """
+    The hypothesis dictionaries as they were built from the lexicon entries before the compact lexicon
+    """
+    xpos, xpos_fallback, upos, upos_fallback, feats = {}, {}, {}, {}, {}
+    for key in entries:
+        (xpos if key[1] in xpos_vocab else xpos_fallback).setdefault(key[0].lower(), []).append(key[1])
+        (upos if key[2] in upos_vocab else upos_fallback).setdefault((key[0].lower(), key[1]), []).append(key[2])
+        feats.setdefault((key[0].lower(), key[1], key[2]), []).append(key[3].replace(' ', '|') if key[3] else '_')
+    return xpos, xpos_fallback, upos, upos_fallback, feats
+
+@pytest.mark.parametrize('saved', [False, True])
+def test_compact_lexicon(tmp_path, saved):
+    entries = ENTRIES + [('Hiši', 'Ncfsl', 'NOUN', '', 'hiša')]
+    lex = lexicon.Lexicon.from_entries(entries)
+    if saved:
+        filename = str(tmp_path / 'tagger.lexicon')
+        lex.save(filename)
+        lex = lexicon.Lexicon.load(filename)
+    assert list(lex) == entries
+    assert lex.string_id('hiša') >= 0 and lex.string(lex.string_id('hiša')) == 'hiša'
+    assert lex.string_id('miza') == -1 and lex.string_id(None) == -1
+
+    xpos_vocab = {'Ncfsn', 'Ncfsg', 'Va-r3s-n', 'Ncfsl'}
+    upos_vocab = {'NOUN', 'AUX'}
+    views = [lex.hypothesis_view((lexicon.FORM,), lexicon.XPOS, accept=lambda x: x in xpos_vocab),
+             lex.hypothesis_view((lexicon.FORM,), lexicon.XPOS, accept=lambda x: x not in xpos_vocab),
+             lex.hypothesis_view((lexicon.FORM, lexicon.XPOS), lexicon.UPOS, accept=lambda x: x in upos_vocab),
+             lex.hypothesis_view((lexicon.FORM, lexicon.XPOS), lexicon.UPOS, accept=lambda x: x not in upos_vocab),
+             lex.hypothesis_view((lexicon.FORM, lexicon.XPOS, lexicon.UPOS), lexicon.FEATS,
+                                 convert=lambda x: x.replace(' ', '|') if x else '_')]
+    for view, expected in zip(views, old_hypothesis_dictionaries(entries, xpos_vocab, upos_vocab)):
+        assert dict(view) == expected
+        for key in expected:
+            assert view[key] == expected[key]
+    assert views[0]['je'] == ['Va-r3s-n', 'Va-r3s-n']
+    assert views[1]['je'] == ['Pp3fsa--y']
+    assert 'miza' not in views[0] and ('je', 'Ncfsn') not in views[2]
+    # keys are lowercased forms
+    assert 'Hiši' not in views[0] and views[0]['hiši'] == ['Ncfsl']
+
+    lookup = lex.lemma_lookup()
+    assert lookup[('Hiši', 'Ncfsl')] == 'hiša'
+    assert ('hiši', 'Ncfsl') not in lookup and ('je', None) not in lookup
+    assert len(lookup) == 6
+
+def test_none_fields():
+    """
+    Missing values of the entries are stored as '_', and empty feats still give '_'
+    """
+    lex = lexicon.Lexicon.from_entries([('Pes', 'Ncmsn', 'NOUN', None, 'pes'), ('psa', 'Ncmsg', None, None, None)])
+    assert list(lex) == [('Pes', 'Ncmsn', 'NOUN', '_', 'pes'), ('psa', 'Ncmsg', '_', '_', '_')]
+    feats = lex.hypothesis_view((lexicon.FORM, lexicon.XPOS, lexicon.UPOS), lexicon.FEATS,
+                                convert=lambda x: x.replace(' ', '|') if x else '_')
+    assert feats[('pes', 'Ncmsn', 'NOUN')] == ['_']
+    assert lex.lemma_lookup()[('Pes', 'Ncmsn')] == 'pes'
+
+def test_lemma_lookup_cache(monkeypatch):
+    lookup = lexicon.Lexicon.from_entries(ENTRIES).lemma_lookup()
+    assert lookup.get(('je', 'Va-r3s-n')) == 'biti'
+    assert lookup.get(('miza', 'Ncfsn')) is None
+    # both found and missing words are answered from the cache
+    monkeypatch.setattr(lookup, '_lookup', None)
+    assert ('je', 'Va-r3s-n') in lookup and lookup[('je', 'Va-r3s-n')] == 'biti'
+    assert ('miza', 'Ncfsn') not in lookup and lookup.get(('miza', 'Ncfsn'), 'x') == 'x'
+
+def test_lexicon_file(model_file, monkeypatch):
+    lexicon_file = lexicon.convert_lexicon(model_file)
+    assert lexicon_file == model_file[:-3] + '.lexicon'
+
+    # the lexicon file is used without reading the model file
+    def fail_load(*args, **kwargs):
+        raise AssertionError("The model file should not be read")
+    with monkeypatch.context() as m:
+        m.setattr(torch, 'load', fail_load)
+        lex = lexicon.load_lexicon(model_file)
+    assert list(lex) == ENTRIES
+    assert lexicon.register_lexicon(model_file, None) is lex
+
+def test_stale_lexicon_file(model_file, monkeypatch, caplog):
+    lexicon.convert_lexicon(model_file)
+    # replacing the model leaves the lexicon file of the old model behind
+    torch.save({'dicts': ENTRIES[:2]}, model_file)
+    with caplog.at_level('WARNING', logger='classla'):
+        lex = lexicon.load_lexicon(model_file)
+    assert list(lex) == ENTRIES[:2]
+    assert 'does not match the model' in caplog.text
+
+    lexicon.clear_lexicons()
+    assert list(lexicon.register_lexicon(model_file, ENTRIES[:2])) == ENTRIES[:2]
+
+    # after converting it again the lexicon file is used
+    lexicon.clear_lexicons()
+    lexicon.convert_lexicon(model_file)
+    assert lexicon.load_lexicon(model_file).source == lexicon.model_fingerprint(model_file)
+
+def test_shared_lemma_cache():
+    """
+    Lookups from many threads must not fail while the shared cache is cleared
+    """
+    lookup = lexicon.Lexicon.from_entries(ENTRIES).lemma_lookup()
+    keys = [('je', 'Va-r3s-n'), ('hiše', 'Ncfpn'), ('miza', 'Ncfsn')]
+    expected = [lookup.get(key) for key in keys]
+
+    def look_up(_):
+        return [[lookup.get(key) for key in keys] for _ in range(2000)]
+
+    lookup.CACHE_SIZE = 2
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        for results in executor.map(look_up, range(8)):
+            assert all(result == expected for result in results)
+
+def build_vocab():
+    data = [[['hiša', 'NOUN', 'Ncfsn', 'Case=Nom|Gender=Fem|Number=Sing'],
+             ['je', 'AUX', 'Va-r3s-n', 'Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin'],
+             ['hiše', 'NOUN', 'Ncfsg', 'Case=Gen|Gender=Fem|Number=Sing'],
+             ['v', 'ADP', 'Sl', '_'],
+             ['.', 'PUNCT', 'Z', '_']]]
+    return MultiVocab({'upos': WordVocab(data, idx=1),
+                       'xpos': WordVocab(data, idx=2),
+                       'feats': FeatureVocab(data, idx=3)})
+
+def test_constrained_decoding():
+    """
+    Tags are restricted to the lexicon for known words and to open classes for the other words
+    """
+    vocab = build_vocab()
+    xpos_vocab = vocab['xpos']
+    processor = SloveneInflectionalLexiconProcessor(ENTRIES, vocab, None, pos_lemma_pretag=True)
+    words = [['hiše', 'je', 'miza', 'xyz'], ['hiša']]
+
+    # the tagger prefers the adposition tag everywhere, then Ncfsn, then Ncfsg
+    xpos_scores = torch.zeros(2, 4, len(xpos_vocab))
+    xpos_scores[:, :, xpos_vocab['Sl']] = 3
+    xpos_scores[:, :, xpos_vocab['Ncfsn']] = 2
+    xpos_scores[:, :, xpos_vocab['Ncfsg']] = 1
+    xpos_preds = processor.process_xpos(xpos_scores, words)
+    # hiše: best of its lexicon tags, je: the only lexicon tag known to the tagger, other words: best open class tag
+    assert xpos_preds == [['Ncfsg', 'Va-r3s-n', 'Ncfsn', 'Ncfsn'], ['Ncfsn']]
+
+    upos_scores = torch.zeros(2, 4, len(vocab['upos']))
+    upos_scores[:, :, vocab['upos']['PUNCT']] = 2
+    upos_scores[:, :, vocab['upos']['ADP']] = 1
+    upos_preds = processor.process_upos(upos_scores, words, xpos_preds)
+    # punctuation is a closed class when the tokenizer tags it
+    assert upos_preds == [['NOUN', 'AUX', 'ADP', 'ADP'], ['NOUN']]
+
+    feats_preds = [torch.full((2, 4, 1), 1, dtype=torch.long) for _ in vocab['feats'].lens()]
+    feats_preds = processor.process_feats(feats_preds, words, xpos_preds, upos_preds)
+    assert feats_preds[0][0] == 'Case=Gen|Gender=Fem|Number=Sing'
+    assert feats_preds[1][0] == 'Case=Nom|Gender=Fem|Number=Sing'
+
+    # without a lexicon only the closed classes are excluded
+    default = DefaultPostprocessor(None, vocab, None, pos_lemma_pretag=True)
+    xpos_scores[0, 0, xpos_vocab['Z']] = 5
+    assert default.process_xpos(xpos_scores, words) == [['Sl'] * 4, ['Sl']]
@@ -4,6 +4,9 @@ Basic testing of lemmatization
 
 import pytest
 import classla
+from classla.models.lemma import trainer as lemma_trainer
+from classla.models.lemma.cache import LemmaCache
+from classla.pipeline.lemma_processor import LemmaProcessor
 
 from tests import *
 
@@ -49,3 +52,57 @@ def test_full_lemmatizer():
         word_lemma_pairs += [f"{w.text} {w.lemma}"]
     assert EN_DOC_LEMMATIZER_MODEL_GOLD == "\n".join(word_lemma_pairs)
 
+def test_unique_pairs():
+    pairs = [('Joe', 'NNP'), ('was', 'VBD'), ('Joe', 'NNP'), ('joe', 'NNP'), ('was', 'VBD'), ('Joe', 'NN')]
+    skip = [False, True, False, False, False, False]
+    seq2seq_skip, pair_lemmas = LemmaProcessor.unique_pairs(pairs, skip)
+    assert seq2seq_skip == [False, True, True, False, False, False]
+    assert pair_lemmas == {('Joe', 'NNP'): None, ('joe', 'NNP'): None, ('was', 'VBD'): None, ('Joe', 'NN'): None}
+
+    # pairs that are already known are not left for the model
+    seq2seq_skip, pair_lemmas = LemmaProcessor.unique_pairs(pairs, skip, {('was', 'VBD'): 'be'}.get)
+    assert seq2seq_skip == [False, True, True, False, True, False]
+    assert pair_lemmas[('was', 'VBD')] == 'be'
+
+def test_lemma_cache(tmp_path):
+    filename = str(tmp_path / 'lemmas.json')
+    cache = LemmaCache(2, filename)
+    cache.put(('Joe', 'NNP', 'abc', 1), 'Joe')
+    cache.put(('was', 'VBD', 'abc', 1), 'be')
+    assert cache.get(('Joe', 'NNP', 'abc', 1)) == 'Joe'
+    assert cache.get(('Joe', 'NNP', 'def', 1)) is None
+    # the least recently used pair is dropped
+    cache.put(('born', 'VBN', 'abc', 1), 'bear')
+    assert cache.get(('was', 'VBD', 'abc', 1)) is None
+    assert cache.stats() == {'entries': 2, 'hits': 1, 'misses': 2, 'hit_rate': 1 / 3}
+
+    cache.save()
+    loaded = LemmaCache(5, filename)
+    assert len(loaded) == 2
+    assert loaded.get(('born', 'VBN', 'abc', 1)) == 'bear'
+    assert loaded.get(('Joe', 'NNP', 'abc', 1)) == 'Joe'
+
+def test_replace_lemma_cache(tmp_path, monkeypatch):
+    """
+    Only the current lemma cache of a trainer is saved at exit, so a replaced cache cannot overwrite it
+    """
+    handlers = []
+    monkeypatch.setattr(lemma_trainer.atexit, 'register', handlers.append)
+    monkeypatch.setattr(lemma_trainer.atexit, 'unregister', lambda handler: handlers.remove(handler))
+    filename = str(tmp_path / 'lemmas.json')
+    trainer = lemma_trainer.Trainer.__new__(lemma_trainer.Trainer)
+    trainer.model_file = None
+    trainer._fingerprint = 'abc'
+    trainer.lemma_cache = None
+
+    trainer.enable_lemma_cache(5, filename)
+    trainer.cache_lemmas([('Joe', 'NNP')], ['Joe'], 1)
+    trainer.enable_lemma_cache(5, filename)
+    # the replaced cache was saved and read by the new one
+    assert trainer.cached_lemma(('Joe', 'NNP'), 1) == 'Joe'
+    trainer.cache_lemmas([('was', 'VBD')], ['be'], 1)
+    assert handlers == [trainer.lemma_cache.save]
+
+    for handler in reversed(handlers):
+        handler()
+    assert len(LemmaCache(5, filename)) == 2
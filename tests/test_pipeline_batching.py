@@ -0,0 +1,136 @@
+"""
+Tests for processing many documents with a pipeline, run with a small pipeline which needs no models
+"""
+
+import asyncio
+import multiprocessing
+
+import pytest
+
+from classla.models.common import doc
+from classla.pipeline._constants import *
+from classla.pipeline.async_pipeline import AsyncPipeline
+from classla.pipeline.core import Pipeline
+from classla.pipeline.executor import PipelinedExecutor
+from classla.pipeline.processor import UDProcessor
+from classla.pipeline.tokenize_processor import TokenizeProcessor
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+class LengthProcessor(UDProcessor):
+    """ A stand-in for a tagger, which tags every word with its length and counts the calls of process """
+
+    PROVIDES_DEFAULT = set([POS])
+    REQUIRES_DEFAULT = set([TOKENIZE])
+
+    def _set_up_model(self, config, use_gpu):
+        self.calls = 0
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def process(self, document):
+        self.calls += 1
+        document.set([doc.XPOS], [str(len(text)) for text in document.get([doc.TEXT])])
+        return document
+
+def build_pipeline():
+    """ A pipeline of the whitespace tokenizer and the LengthProcessor """
+    pipeline = Pipeline.__new__(Pipeline)
+    pipeline.processors = {}
+    pipeline.load_list = [[TOKENIZE, 'standard', None], [POS, 'standard', None]]
+    pipeline.use_gpu = False
+    pipeline.processors[TOKENIZE] = TokenizeProcessor({'library': 'obeliks', 'pretokenized': True, 'lang': 'sl'}, pipeline, False)
+    pipeline.processors[POS] = LengthProcessor({'lemma_pretag': False}, pipeline, False)
+    return pipeline
+
+TEXTS = ['a bb ccc\ndddd ee', 'f gg', 'hhh i\nj\nkk']
+
+def check_docs(docs):
+    assert [[[word.text for word in sentence.words] for sentence in d.sentences] for d in docs] == \
+        [[sentence.split() for sentence in text.split('\n')] for text in TEXTS]
+    for d in docs:
+        assert all(word.xpos == str(len(word.text)) for word in d.iter_words())
+
+def test_tokenize_bulk_process():
+    pipeline = build_pipeline()
+    docs = pipeline.processors[TOKENIZE].bulk_process(TEXTS)
+    assert all(isinstance(d, doc.Document) for d in docs)
+    assert [len(d.sentences) for d in docs] == [2, 1, 3]
+
+def test_stream():
+    pipeline = build_pipeline()
+    docs = list(pipeline.stream(TEXTS, batch_size=2))
+    check_docs(docs)
+    # the tagger processes each chunk of documents at once
+    assert pipeline.processors[POS].calls == 2
+
+@pytest.mark.parametrize('n_workers', [1, 2])
+def test_process_many(n_workers):
+    pipeline = build_pipeline()
+    docs = pipeline.process_many(TEXTS, n_workers=n_workers, batch_size=1)
+    check_docs(docs)
+
+def test_process_many_threads(monkeypatch):
+    """ The workers run a single torch thread unless told otherwise """
+    threads = []
+
+    class LoggingPool:
+        def __init__(self, n_workers, initializer, initargs):
+            threads.append(initargs)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def imap(self, function, chunks):
+            return map(function, chunks)
+
+    context = multiprocessing.get_context('fork')
+    monkeypatch.setattr(context, 'Pool', LoggingPool)
+    pipeline = build_pipeline()
+    check_docs(pipeline.process_many(TEXTS, n_workers=2, batch_size=1))
+    check_docs(pipeline.process_many(TEXTS, n_workers=2, batch_size=1, worker_threads=3))
+    assert threads == [(1,), (3,)]
+
+@pytest.mark.parametrize('batch_size', [1, 2])
+def test_pipelined_executor(batch_size):
+    pipeline = build_pipeline()
+    executor = PipelinedExecutor(pipeline, max_queue_size=1, batch_size=batch_size)
+    assert executor.stage_names == [TOKENIZE, POS]
+    docs = list(executor.process(TEXTS))
+    check_docs(docs)
+
+def test_close():
+    pipeline = build_pipeline()
+    with pipeline as nlp:
+        check_docs([nlp(text) for text in TEXTS])
+    assert pipeline.processors[POS].closed
+
+def test_async_pipeline():
+    pipeline = build_pipeline()
+
+    async def annotate(texts):
+        async with AsyncPipeline(pipeline, max_latency=0.05) as nlp:
+            return await asyncio.gather(*[nlp.aprocess(text) for text in texts])
+
+    check_docs(asyncio.run(annotate(TEXTS)))
+    # the documents were tagged together
+    assert pipeline.processors[POS].calls == 1
+
+def test_async_pipeline_close():
+    """ Closing the pipeline must process the documents that are still waiting for their batch """
+    pipeline = build_pipeline()
+
+    async def annotate(texts):
+        nlp = AsyncPipeline(pipeline, max_latency=60)
+        tasks = [asyncio.ensure_future(nlp.aprocess(text)) for text in texts]
+        # let the documents join the waiting batch
+        await asyncio.sleep(0)
+        await nlp.close()
+        return await asyncio.gather(*tasks)
+
+    check_docs(asyncio.run(annotate(TEXTS)))
@@ -51,3 +51,56 @@ def test_resave_pretrain():
         check_pretrain(pt2)
     finally:
         os.unlink(test_pt_file.name)
+
+def write_tiny_pretrain(directory):
+    """
+    Write the tiny vectors used above to a text file and convert them to a pretrain file in directory
+    """
+    vec_file = os.path.join(directory, 'tiny_emb.txt')
+    with open(vec_file, 'w') as fout:
+        fout.write('3 4\nunban 1 2 3 4\nmox 5 6 7 8\nopal 9 10 11 12\n')
+    pt_file = os.path.join(directory, 'tiny_emb.pt')
+    pretrain.Pretrain(filename=pt_file, vec_filename=vec_file).load()
+    return pt_file
+
+def test_shared_pretrain(tmp_path):
+    pt_file = write_tiny_pretrain(str(tmp_path))
+    pretrain.clear_shared_pretrains()
+    try:
+        pt = pretrain.load_shared_pretrain(pt_file)
+        # a different path to the same file resolves to the same instance
+        pt2 = pretrain.load_shared_pretrain(os.path.join(str(tmp_path), '.', 'tiny_emb.pt'))
+        assert pt is pt2
+        check_pretrain(pt)
+
+        report = pretrain.shared_pretrain_report()
+        assert len(report) == 1
+        assert report[0]['requests'] == 2
+        assert report[0]['size'] >= pt.emb.nbytes
+        assert report[0]['saved'] == report[0]['size']
+
+        # a modified file is loaded again
+        os.utime(pt_file, (0, 0))
+        pt3 = pretrain.load_shared_pretrain(pt_file)
+        assert pt3 is not pt
+        check_pretrain(pt3)
+        assert len(pretrain.shared_pretrain_report()) == 1
+    finally:
+        pretrain.clear_shared_pretrains()
+
+def test_mmap_pretrain(tmp_path):
+    pt_file = write_tiny_pretrain(str(tmp_path))
+    emb_file, vocab_file = pretrain.convert_to_mmap(pt_file)
+    assert os.path.exists(emb_file) and os.path.exists(vocab_file)
+
+    # the torch file is no longer needed once converted
+    os.remove(pt_file)
+    pt = pretrain.Pretrain(pt_file)
+    check_pretrain(pt)
+    assert isinstance(pt.emb, np.memmap)
+    assert pt.vocab.unit2id('MOX') == pt.vocab.unit2id('mox')
+
+    pretrain.save_mmap(pt_file, pt.vocab, pt.emb, dtype=np.float16)
+    pt = pretrain.Pretrain(pt_file)
+    check_pretrain(pt)
+    assert pt.emb.dtype == np.float32
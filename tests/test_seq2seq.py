@@ -0,0 +1,141 @@
+"""
+Tests for decoding with the seq2seq model of the lemmatizer and MWT expander
+"""
+
+import pytest
+import torch
+
+import classla.models.common.seq2seq_constant as constant
+from classla.models.common import utils
+from classla.models.common.beam import Beam
+from classla.models.common.seq2seq_model import Seq2SeqModel
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+def build_model(attn_type='soft', pos=False, max_dec_len=12):
+    """
+    Build a small randomly initialized Seq2SeqModel in evaluation mode
+    """
+    args = {'vocab_size': 12, 'emb_dim': 6, 'hidden_dim': 8, 'num_layers': 1, 'dropout': 0.0, 'max_dec_len': max_dec_len,
+            'attn_type': attn_type, 'pos': pos, 'pos_dim': 3, 'pos_vocab_size': 5}
+    model = Seq2SeqModel(args)
+    # sharpen the random predictions, so that the examples finish at different steps
+    with torch.no_grad():
+        for p in model.parameters():
+            p.mul_(6)
+    return utils.prepare_for_inference(model)
+
+def build_batch(batch_size=40, max_len=6):
+    lens = sorted(torch.randint(1, max_len + 1, (batch_size,)).tolist(), reverse=True)
+    src = torch.full((batch_size, lens[0]), constant.PAD_ID, dtype=torch.long)
+    for i, length in enumerate(lens):
+        src[i, :length] = torch.randint(4, 12, (length,))
+    return src, src.eq(constant.PAD_ID)
+
+def predict_with_beam_objects(model, src, src_mask, beam_size):
+    """
+    Beam search with one Beam per example, stepped one example at a time
+    """
+    enc_inputs = model.embedding(src)
+    batch_size = enc_inputs.size(0)
+    src_lens = list(src_mask.data.eq(constant.PAD_ID).long().sum(1))
+    h_in, (hn, cn) = model.encode(enc_inputs, src_lens)
+    h_in = h_in.data.repeat(beam_size, 1, 1)
+    src_mask = src_mask.repeat(beam_size, 1)
+    hn = hn.data.repeat(beam_size, 1)
+    cn = cn.data.repeat(beam_size, 1)
+    beam = [Beam(beam_size) for _ in range(batch_size)]
+
+    for i in range(model.max_dec_len):
+        dec_inputs = torch.stack([b.get_current_state() for b in beam]).t().contiguous().view(-1, 1)
+        log_probs, (hn, cn) = model.decode(model.embedding(dec_inputs), hn, cn, h_in, src_mask)
+        log_probs = log_probs.view(beam_size, batch_size, -1).transpose(0, 1).contiguous()
+        done = 0
+        for b in range(batch_size):
+            done += beam[b].advance(log_probs.data[b])
+            for e in (hn, cn):
+                br, d = e.size()
+                s = e.contiguous().view(beam_size, br // beam_size, d)[:, b]
+                s.data.copy_(s.data.index_select(0, beam[b].get_current_origin()))
+        if done == batch_size:
+            break
+
+    all_hyp = []
+    for b in range(batch_size):
+        _, ks = beam[b].sort_best()
+        all_hyp.append([i.item() for i in utils.prune_hyp(beam[b].get_hyp(ks[0]))])
+    return all_hyp
+
+def predict_greedy_full_batch(model, src, src_mask):
+    """
+    Greedy decoding of the whole batch until every example is finished
+    """
+    enc_inputs = model.embedding(src)
+    batch_size = enc_inputs.size(0)
+    src_lens = list(src_mask.data.eq(constant.PAD_ID).long().sum(1))
+    h_in, (hn, cn) = model.encode(enc_inputs, src_lens)
+    dec_inputs = model.embedding(model.SOS_tensor).expand(batch_size, 1, -1)
+    output_seqs = [[] for _ in range(batch_size)]
+    done = [False] * batch_size
+    for _ in range(model.max_dec_len):
+        log_probs, (hn, cn) = model.decode(dec_inputs, hn, cn, h_in, src_mask)
+        _, preds = log_probs.squeeze(1).max(1, keepdim=True)
+        dec_inputs = model.embedding(preds)
+        for i, token in enumerate(preds.squeeze(1).tolist()):
+            if not done[i]:
+                if token == constant.EOS_ID:
+                    done[i] = True
+                else:
+                    output_seqs[i].append(token)
+        if all(done):
+            break
+    return output_seqs
+
+@pytest.mark.parametrize('attn_type', ['soft', 'mlp', 'linear', 'deep'])
+def test_projected_context(attn_type):
+    """
+    Decoding with the context projections computed once must give the same output as computing them at every step
+    """
+    torch.manual_seed(1234)
+    model = build_model(attn_type)
+    src, src_mask = build_batch()
+    with torch.no_grad():
+        h_in, (hn, cn) = model.encode(model.embedding(src), list(src_mask.eq(constant.PAD_ID).long().sum(1)))
+        dec_inputs = model.embedding(torch.randint(4, 12, (src.size(0), 1)))
+        projected_ctx = model.decoder.project_context(h_in)
+        if attn_type in ('mlp', 'deep'):
+            assert projected_ctx.shape == h_in.shape
+        expected, (expected_hn, _) = model.decode(dec_inputs, hn, cn, h_in, src_mask)
+        log_probs, (step_hn, _) = model.decode(dec_inputs, hn, cn, h_in, src_mask, projected_ctx)
+    assert torch.allclose(log_probs, expected, atol=1e-6)
+    assert torch.allclose(step_hn, expected_hn)
+
+@pytest.mark.parametrize('attn_type', ['soft', 'mlp', 'linear', 'deep'])
+def test_greedy_decoding(attn_type):
+    """
+    Dropping the finished examples from the decoder must not change the output of greedy decoding
+    """
+    torch.manual_seed(1234)
+    model = build_model(attn_type)
+    src, src_mask = build_batch()
+    with torch.no_grad():
+        expected = predict_greedy_full_batch(model, src, src_mask)
+        hyps, _ = model.predict(src, src_mask, beam_size=1)
+    assert hyps == expected
+    assert len(set(len(hyp) for hyp in hyps)) > 1
+
+@pytest.mark.parametrize('attn_type', ['soft', 'mlp', 'linear', 'deep'])
+@pytest.mark.parametrize('beam_size', [2, 3, 5])
+def test_batched_beam_search(attn_type, beam_size):
+    """
+    The batched beam search must find the same hypotheses as stepping a Beam per example
+    """
+    torch.manual_seed(1234)
+    model = build_model(attn_type)
+    src, src_mask = build_batch()
+    with torch.no_grad():
+        expected = predict_with_beam_objects(model, src, src_mask, beam_size)
+        hyps, _ = model.predict(src, src_mask, beam_size=beam_size)
+    assert hyps == expected
+    # the examples stop at different lengths, some of them at max_dec_len
+    assert len(set(len(hyp) for hyp in hyps)) > 1
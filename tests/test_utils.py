@@ -1,9 +1,15 @@
 import tempfile
 
+import numpy as np
 import pytest
+import torch
 
 import classla
 import classla.models.common.utils as utils
+from classla.models.common.doc import Document
+from classla.models.common.pretrain import Pretrain, PretrainedWordVocab
+from classla.models.pos.data import DataLoader
+from classla.models.pos.model import Tagger
 from tests import *
 
 pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
@@ -75,3 +81,63 @@ def test_wordvec_type():
         with pytest.raises(FileNotFoundError):
             utils.get_wordvec_file(wordvec_dir=temp_dir, shorthand='en_foo')
 
+
+def build_tagger_and_batch(transformed_dim, emb_dim, return_train_batch=False):
+    """
+    Build a small randomly initialized Tagger and a batch of data for it
+    """
+    words = ['unban', 'mox', 'opal', 'jace']
+    sentences = [[{'id': (i + 1,), 'text': word, 'upos': 'NOUN', 'xpos': 'NN', 'feats': 'Number=Sing'}
+                  for i, word in enumerate(words[:length])] for length in (4, 2, 3)]
+    doc = Document(sentences)
+
+    pretrain = Pretrain()
+    pretrain._vocab = PretrainedWordVocab(words[:3], lower=True)
+    pretrain._emb = np.random.randn(len(pretrain._vocab), emb_dim).astype(np.float32)
+
+    args = {'shorthand': 'en_ewt', 'word_emb_dim': 8, 'tag_emb_dim': 4, 'char': True, 'char_emb_dim': 4,
+            'char_hidden_dim': 6, 'char_num_layers': 1, 'char_dropout': 0, 'char_rec_dropout': 0,
+            'pretrain': True, 'transformed_dim': transformed_dim, 'hidden_dim': 10, 'num_layers': 1,
+            'deep_biaff_hidden_dim': 12, 'composite_deep_biaff_hidden_dim': 12,
+            'dropout': 0.5, 'rec_dropout': 0, 'word_dropout': 0.3}
+    train_batch = DataLoader(doc, 10, args, pretrain)
+    vocab = train_batch.vocab
+    batch = DataLoader(doc, 10, args, pretrain, vocab=vocab, evaluation=True)
+    model = Tagger(args, vocab, emb_matrix=pretrain.emb, share_hid=False)
+    utils.prepare_for_inference(model)
+    if return_train_batch:
+        return model, batch[0], train_batch[0]
+    return model, batch[0]
+
+def run_tagger(model, batch):
+    word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, orig_idx, word_orig_idx, sentlens, wordlens, word_string, word_type_idx = batch
+    with torch.no_grad():
+        _, preds = model(word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, word_orig_idx, sentlens, wordlens, word_string, word_type_idx=word_type_idx)
+    return preds
+
+def test_fold_pretrained_projection():
+    """
+    Folding the projection of the pretrained embeddings into the table must not change the output
+    """
+    torch.manual_seed(1234)
+    model, batch = build_tagger_and_batch(transformed_dim=5, emb_dim=7)
+    expected = run_tagger(model, batch)
+
+    assert utils.fold_pretrained_projection(model) == ['pretrained_emb']
+    assert model.pretrained_emb.weight.shape == (len(model.pretrained_emb.weight), 5)
+    assert isinstance(model.trans_pretrained, torch.nn.Identity)
+    for expected_pred, pred in zip(expected, run_tagger(model, batch)):
+        assert torch.allclose(expected_pred, pred, atol=1e-6)
+
+def test_fold_pretrained_projection_larger():
+    """
+    A projection to more dimensions is only folded when forced
+    """
+    torch.manual_seed(1234)
+    model, batch = build_tagger_and_batch(transformed_dim=9, emb_dim=7)
+    expected = run_tagger(model, batch)
+
+    assert utils.fold_pretrained_projection(model) == []
+    assert utils.fold_pretrained_projection(model, force=True) == ['pretrained_emb']
+    for expected_pred, pred in zip(expected, run_tagger(model, batch)):
+        assert torch.allclose(expected_pred, pred, atol=1e-6)
@@ -0,0 +1,62 @@
+"""
+Tests for decoding composite units with CompositeVocab
+"""
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+import torch
+
+from classla.models.common.vocab import CompositeVocab, VOCAB_PREFIX
+from classla.models.pos.vocab import FeatureVocab, XPOSVocab
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+FEATS = ['Case=Nom|Gender=Fem|Number=Sing', 'Case=Gen|Gender=Fem|Number=Sing', '_',
+         'Mood=Ind|Number=Sing|Person=3|Tense=Pres|VerbForm=Fin', 'Case=Acc|Number=Plur']
+
+XPOS = ['Ncfsn', 'Ncfsg', 'Va-r3s-n', 'Z']
+
+def build_vocab(units):
+    return FeatureVocab([[[unit] for unit in units]], idx=0)
+
+def build_xpos_vocab(units):
+    id2unit = OrderedDict()
+    for unit in units:
+        for i, part in enumerate(unit):
+            id2unit.setdefault(i, list(VOCAB_PREFIX))
+            if part not in id2unit[i]:
+                id2unit[i].append(part)
+    unit2id = {k: {w: i for i, w in enumerate(id2unit[k])} for k in id2unit}
+    return XPOSVocab.load_state_dict({'lang': '', 'idx': 0, 'cutoff': 0, 'lower': False,
+                                      '_unit2id': unit2id, '_id2unit': id2unit, 'sep': '', 'keyed': False})
+
+@pytest.mark.parametrize('vocab_builder, units', [(build_vocab, FEATS), (build_xpos_vocab, XPOS)])
+def test_unmap_many(vocab_builder, units):
+    vocab = vocab_builder(units)
+    ids = [vocab.unit2id(unit) for unit in units] * 3
+    expected = [vocab.parts2unit(row) for row in ids]
+    assert [vocab.id2unit(row) for row in ids] == expected
+    assert vocab.unmap_many(np.array(ids)) == expected
+    assert vocab.unmap_many(torch.tensor(ids)) == expected
+    assert vocab.unmap_many(np.zeros((0, len(vocab.lens())), dtype=np.int64)) == []
+
+def test_unmap_many_wide():
+    """
+    Rows whose part ids do not fit in a single integer key
+    """
+    units = ['F%d=%d' % (i, j) for i in range(40) for j in range(3)]
+    vocab = build_vocab(units + ['|'.join('F%d=1' % i for i in range(40))])
+    ids = np.random.default_rng(0).integers(2, 6, size=(100, len(vocab.lens())))
+    assert vocab.unmap_many(ids) == [vocab.parts2unit(row) for row in ids.tolist()]
+
+def test_id2unit_cache(monkeypatch):
+    vocab = build_vocab(FEATS)
+    monkeypatch.setattr(CompositeVocab, 'CACHE_SIZE', 2)
+    for unit in FEATS:
+        assert vocab.id2unit(vocab.unit2id(unit)) == unit
+        assert len(vocab._id2unit_cache) <= 2
+    # the cache is not part of the saved state
+    assert '_id2unit_cache' not in vocab.state_dict()
+    loaded = FeatureVocab.load_state_dict(vocab.state_dict())
+    assert loaded.unmap([vocab.unit2id(unit) for unit in FEATS]) == FEATS
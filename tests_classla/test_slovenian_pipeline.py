@@ -2,10 +2,14 @@
 Basic testing of the English pipeline
 """
 
+import asyncio
+
 import pytest
 import classla
 from classla.utils.conll import CoNLL
 
+from classla.pipeline.executor import PipelinedExecutor
+
 from tests_classla import *
 
 
@@ -126,10 +130,15 @@ SL_DOC_CONLLU_GOLD = """
 
 
 @pytest.fixture(scope="module")
-def processed_doc():
+def pipeline():
+    """ Full Slovenian pipeline """
+    return classla.Pipeline(dir=TEST_MODELS_DIR)
+
+
+@pytest.fixture(scope="module")
+def processed_doc(pipeline):
     """ Document created by running full Slovenian pipeline on a few sentences """
-    nlp = classla.Pipeline(dir=TEST_MODELS_DIR)
-    return nlp(SL_DOC)
+    return pipeline(SL_DOC)
 
 
 def test_text(processed_doc):
@@ -151,3 +160,40 @@ def test_words(processed_doc):
 def test_dependency_parse(processed_doc):
     assert "\n\n".join([sent.dependencies_string() for sent in processed_doc.sentences]) == \
            SL_DOC_DEPENDENCY_PARSES_GOLD
+
+
+def test_stream(pipeline):
+    docs = list(pipeline.stream([SL_DOC, "Danes je lep dan.", SL_DOC], batch_size=2))
+    assert len(docs) == 3
+    assert docs[0].to_conll() == SL_DOC_CONLLU_GOLD
+    assert docs[1].to_conll() == pipeline("Danes je lep dan.").to_conll()
+    assert docs[2].to_conll() == SL_DOC_CONLLU_GOLD
+
+
+def test_process_many(pipeline):
+    docs = pipeline.process_many([SL_DOC, "Danes je lep dan.", SL_DOC], n_workers=2, batch_size=1)
+    assert len(docs) == 3
+    assert docs[0].to_conll() == SL_DOC_CONLLU_GOLD
+    assert docs[1].text == "Danes je lep dan."
+    assert docs[2].to_conll() == SL_DOC_CONLLU_GOLD
+
+
+def test_pipelined_executor(pipeline):
+    executor = PipelinedExecutor(pipeline, max_queue_size=1)
+    docs = list(executor.process([SL_DOC, "Danes je lep dan.", SL_DOC]))
+    assert len(docs) == 3
+    assert docs[0].to_conll() == SL_DOC_CONLLU_GOLD
+    assert docs[2].to_conll() == SL_DOC_CONLLU_GOLD
+    assert set(executor.max_queue_depths()) == set(executor.stage_names + ['output'])
+    assert all(depth <= 1 for depth in executor.max_queue_depths().values())
+
+
+def test_async_pipeline(pipeline):
+    async def annotate(texts):
+        async with classla.AsyncPipeline(pipeline, max_latency=0.05) as nlp:
+            return await asyncio.gather(*[nlp.aprocess(text) for text in texts])
+
+    docs = asyncio.run(annotate([SL_DOC, "Danes je lep dan.", SL_DOC]))
+    assert len(docs) == 3
+    assert docs[0].to_conll() == SL_DOC_CONLLU_GOLD
+    assert docs[2].to_conll() == SL_DOC_CONLLU_GOLD